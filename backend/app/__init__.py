@@ -0,0 +1,70 @@
+import os
+import time
+
+
+def create_app(db_path=None):
+    """
+    Build the Flask API.
+
+    Serve it with `python run.py` (WSGI) or `python run.py --asgi` (see
+    asgi.py). db_path defaults to config.DB_NAME. The BLE scanner starts
+    here, so the first /scan already has a table to return; the live feed
+    and the emotion model start on first use.
+    """
+    # Imported here so `backend.app.<module>` imports from the BLE scripts don't pull in Flask
+    from flask import Flask, Response, g, request
+    from flask_cors import CORS
+
+    from backend.app.config import DB_NAME
+    from backend.app.database.connection import get_connection
+    from backend.app.routes.alert_routes import alert_routes
+    from backend.app.routes.device_routes import device_routes
+    from backend.app.routes.emotion_routes import emotion_routes
+    from backend.app.routes.health_routes import health_routes
+    from backend.app.routes.vitals_routes import vitals_routes
+    from backend.app.services.ble_scanner import BackgroundWatchScanner
+    from backend.app.services.emotion_ml import EmotionService
+    from backend.app.services.live_stream import LiveFeed
+    from backend.app.services.metrics import ALERT_QUEUE_DEPTH, CONTENT_TYPE, HTTP_REQUEST_SECONDS, REGISTRY
+
+    app = Flask(__name__)
+    app.config["DB_NAME"] = db_path or DB_NAME
+    CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["X-Next-Cursor"])
+
+    # One poller shared by every /stream client
+    app.extensions["live_feed"] = LiveFeed(app.config["DB_NAME"])
+    # Scans continuously in the background; /scan only reads its cached table
+    app.extensions["watch_scanner"] = BackgroundWatchScanner().start()
+    # Batches /emotion requests from concurrent clients; the model loads on the first one
+    app.extensions["emotion_service"] = EmotionService()
+
+    for blueprint in (device_routes, vitals_routes, alert_routes, health_routes, emotion_routes):
+        app.register_blueprint(blueprint)
+
+    def queued_alerts():
+        with get_connection(app.config["DB_NAME"]) as conn:
+            return conn.execute("SELECT COUNT(*) FROM alerts WHERE status = 'Queued'").fetchone()[0]
+
+    # The outbox runs in the BLE process; read its queue depth from the shared database
+    ALERT_QUEUE_DEPTH.track(os.path.abspath(app.config["DB_NAME"]), queued_alerts)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_latency(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            # Label by route pattern, not path, so /connect/<device_id> is one series
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            HTTP_REQUEST_SECONDS.labels(request.method, route, response.status_code).observe(
+                time.perf_counter() - started)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Prometheus metrics of this process (the BLE supervisor serves its own on SUPERVISOR_METRICS_PORT)."""
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+    return app
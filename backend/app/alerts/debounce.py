@@ -0,0 +1,151 @@
+import threading
+import time
+
+COOLDOWN_SECONDS = 60  # Minimum time between two alerts for the same device and rule
+MAX_TRACKED_MESSAGES = 10_000  # Free-form message keys kept before old ones are pruned
+
+
+class AlertRule:
+    """
+    A threshold rule with hysteresis.
+
+    An episode starts when the value crosses `threshold` and only ends once it
+    comes back past `clear_threshold`, so a signal hovering around the
+    threshold does not start a new episode on every sample.
+    """
+
+    def __init__(self, name, label, threshold, clear_threshold, above=True, unit="", inclusive=False):
+        self.name = name
+        self.label = label
+        self.threshold = threshold
+        self.clear_threshold = clear_threshold
+        self.above = above
+        self.unit = unit
+        self.inclusive = inclusive  # also trigger at the threshold itself
+
+    def triggered(self, value):
+        if self.inclusive:
+            return value >= self.threshold if self.above else value <= self.threshold
+        return value > self.threshold if self.above else value < self.threshold
+
+    def cleared(self, value):
+        return value <= self.clear_threshold if self.above else value >= self.clear_threshold
+
+    def worse(self, value, peak):
+        return value > peak if self.above else value < peak
+
+
+class _Episode:
+    __slots__ = ("started_at", "last_sent_at", "peak", "samples")
+
+    def __init__(self, now, value):
+        self.started_at = now
+        self.last_sent_at = now
+        self.peak = value
+        self.samples = 1
+
+
+class AlertDebouncer:
+    """
+    Per-device, per-rule debouncing and coalescing of alerts.
+
+    observe() is fed every sample for a rule. The first triggering sample
+    produces an alert; while the episode lasts, further triggers are merged
+    and at most one escalation ("HR > 120 for 45s, peak 151 BPM") is produced
+    per cooldown window. allow() applies the same cooldown to free-form
+    messages such as "Watch removed!".
+    """
+
+    def __init__(self, rules=(), cooldown=COOLDOWN_SECONDS):
+        self.rules = {rule.name: rule for rule in rules}
+        self.cooldown = cooldown
+        self.episodes = {}
+        self.open = {}  # device_id -> names of the rules with an episode in progress
+        self.messages = {}
+        self.stats = {"observed": 0, "sent": 0, "suppressed": 0}
+        self._lock = threading.Lock()
+
+    def observe(self, device_id, rule_name, value, now=None, rule=None):
+        """
+        Feed one sample. Returns the alert message to send, or None.
+
+        rule overrides the rule registered under rule_name, e.g. a per-device
+        threshold from the rule engine.
+        """
+        rule = self.rules[rule_name] if rule is None else rule
+        now = time.time() if now is None else now
+        key = (device_id, rule_name)
+        with self._lock:
+            self.stats["observed"] += 1
+            episode = self.episodes.get(key)
+
+            if episode is None:
+                if not rule.triggered(value):
+                    return None
+                self.episodes[key] = _Episode(now, value)
+                self.open.setdefault(device_id, set()).add(rule_name)
+                self.stats["sent"] += 1
+                return f"{rule.label}: {value}{rule.unit}"
+
+            if rule.cleared(value):
+                del self.episodes[key]
+                self._close(device_id, rule_name)
+                return None
+
+            episode.samples += 1
+            if rule.worse(value, episode.peak):
+                episode.peak = value
+            if now - episode.last_sent_at < self.cooldown:
+                self.stats["suppressed"] += 1
+                return None
+
+            episode.last_sent_at = now
+            self.stats["sent"] += 1
+            duration = int(now - episode.started_at)
+            return f"{rule.label} for {duration}s, peak {episode.peak}{rule.unit}"
+
+    def close(self, device_id, rule_name):
+        """End a rule's episode for a device without an alert, e.g. once the rule is removed."""
+        with self._lock:
+            if self.episodes.pop((device_id, rule_name), None) is not None:
+                self._close(device_id, rule_name)
+
+    def _close(self, device_id, rule_name):
+        names = self.open[device_id]
+        names.discard(rule_name)
+        if not names:
+            del self.open[device_id]
+
+    def open_rules(self, device_id):
+        """Names of the rules with an episode in progress for a device."""
+        with self._lock:
+            return tuple(self.open.get(device_id, ()))
+
+    def allow(self, key, message, now=None):
+        """
+        Rate-limit a free-form message by key.
+
+        Returns the message to send (annotated with how many repeats were
+        merged into it), or None while the key is cooling down.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self.messages.get(key)
+            if entry is not None and now - entry[0] < self.cooldown:
+                entry[1] += 1
+                self.stats["suppressed"] += 1
+                return None
+
+            repeats = entry[1] if entry is not None else 0
+            if len(self.messages) >= MAX_TRACKED_MESSAGES:
+                self._prune(now)
+            self.messages[key] = [now, 0]
+            self.stats["sent"] += 1
+            if repeats:
+                return f"{message} (repeated {repeats} more times)"
+            return message
+
+    def _prune(self, now):
+        expired = [key for key, entry in self.messages.items() if now - entry[0] >= self.cooldown]
+        for key in expired:
+            del self.messages[key]
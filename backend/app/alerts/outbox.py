@@ -0,0 +1,241 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from backend.app.database.connection import connect
+from backend.app.services.metrics import ALERT_QUEUE_DEPTH, ALERTS_ENQUEUED, SMS_SEND_SECONDS
+
+STATUS_QUEUED = "Queued"
+STATUS_SENT = "Sent"
+STATUS_FAILED = "Failed"
+
+WORKERS = 2
+MAX_ATTEMPTS = 5
+BASE_BACKOFF = 2.0  # seconds, doubled after every failed attempt
+MAX_BACKOFF = 300.0
+IDLE_POLL_INTERVAL = 1.0  # seconds a worker waits for new alerts before re-checking retries
+ENQUEUE_TIMEOUT = 0.2  # seconds enqueue() waits for the write lock before handing the alert to a worker
+
+
+# Bumped on every insert and status change, so the live feed can tail changes (see services/live_stream.py)
+NEXT_REVISION = "(SELECT COALESCE(MAX(revision), 0) + 1 FROM alerts)"
+
+INSERT_ALERT = (
+    "INSERT INTO alerts (message, timestamp, status, attempts, next_attempt_at, revision) "
+    f"VALUES (?, ?, ?, 0, ?, {NEXT_REVISION})"
+)
+
+
+def create_alerts_table(conn):
+    """Create the alerts table, adding the outbox columns to older databases."""
+    with conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                message TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                status TEXT NOT NULL
+            )
+        ''')
+        columns = [col[1] for col in conn.execute("PRAGMA table_info(alerts)")]
+        if "attempts" not in columns:
+            conn.execute("ALTER TABLE alerts ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        if "next_attempt_at" not in columns:
+            conn.execute("ALTER TABLE alerts ADD COLUMN next_attempt_at REAL")
+        if "last_error" not in columns:
+            conn.execute("ALTER TABLE alerts ADD COLUMN last_error TEXT")
+        if "revision" not in columns:
+            conn.execute("ALTER TABLE alerts ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_status_due ON alerts(status, next_attempt_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_revision ON alerts(revision)")
+
+
+class AlertOutbox:
+    """
+    Durable, asynchronous alert dispatch.
+
+    enqueue() writes the alert to the alerts table with status "Queued" and
+    returns immediately; it never talks to the SMS provider. Worker threads
+    pick up due rows, call provider.send(message) and move the row to "Sent",
+    or back to "Queued" with exponential backoff, or to "Failed" once
+    MAX_ATTEMPTS is reached. Rows left "Queued" by a previous run are sent on
+    start-up, so alerts survive a restart.
+
+    enqueue() is called from BLE notification handlers, so it has its own
+    connection and lock, and waits at most ENQUEUE_TIMEOUT for SQLite. If the
+    database is busy for longer, the alert is kept in memory and a worker
+    stores it; it is only lost if the process exits before that.
+
+    A worker claims an alert through the in-memory `_in_flight` set, which
+    only coordinates the threads of one process. Run one outbox per
+    database: two processes sharing it would both send the same alert.
+    """
+
+    def __init__(self, db_path, provider, workers=WORKERS, max_attempts=MAX_ATTEMPTS,
+                 base_backoff=BASE_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.db_path = db_path
+        self.provider = provider
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.stats = {"queued": 0, "sent": 0, "failed": 0, "retried": 0, "last_send_ms": 0.0}
+        self._conn = connect(db_path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        # enqueue() never waits behind the workers or the queue depth scrape
+        self._enqueue_conn = connect(db_path, check_same_thread=False, timeout=ENQUEUE_TIMEOUT)
+        self._enqueue_lock = threading.Lock()
+        self._deferred = deque()  # rows enqueue() could not store in time, written by a worker
+        self._in_flight = set()
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._threads = []
+        self.setup_table()
+
+    def setup_table(self):
+        """Create the alerts table, adding the outbox columns to older databases."""
+        with self._db_lock:
+            create_alerts_table(self._conn)
+
+    @property
+    def queue_depth(self):
+        with self._db_lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM alerts WHERE status = ?", (STATUS_QUEUED,)
+            ).fetchone()[0]
+
+    def start(self):
+        """Start the worker threads."""
+        if self._threads:
+            return self
+        # Keyed by database, so the API's reading of the same table is not counted twice
+        ALERT_QUEUE_DEPTH.track(os.path.abspath(self.db_path), lambda: self.queue_depth)
+        self._stopping = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"alert-outbox-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """Stop the workers. Alerts still queued stay in the table for the next run."""
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._store_deferred()
+
+    def enqueue(self, message):
+        """
+        Store an alert in the outbox and return its id without sending it.
+
+        Returns None if the database stayed busy for ENQUEUE_TIMEOUT; a worker
+        then stores the alert.
+        """
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        row = (message, timestamp, STATUS_QUEUED, time.time())
+        try:
+            with self._enqueue_lock, self._enqueue_conn:
+                alert_id = self._enqueue_conn.execute(INSERT_ALERT, row).lastrowid
+        except sqlite3.OperationalError as e:
+            print(f"Database busy, alert handed to the outbox workers: {str(e)}")
+            self._deferred.append(row)
+            alert_id = None
+        self.stats["queued"] += 1
+        ALERTS_ENQUEUED.inc()
+        with self._wakeup:
+            self._wakeup.notify()
+        return alert_id
+
+    def _store_deferred(self):
+        """Write the alerts enqueue() could not store, waiting for the lock as long as needed."""
+        while self._deferred:
+            try:
+                row = self._deferred.popleft()
+            except IndexError:
+                return  # another worker took the last one
+            try:
+                with self._db_lock, self._conn:
+                    self._conn.execute(INSERT_ALERT, row)
+            except sqlite3.Error as e:
+                print(f"Error storing a deferred alert, will retry: {str(e)}")
+                self._deferred.appendleft(row)
+                return
+
+    def _claim(self):
+        """
+        Reserve the oldest due alert for this worker.
+
+        Returns (alert, None), or (None, seconds to wait) when nothing is due yet.
+        """
+        now = time.time()
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT id, message, attempts FROM alerts WHERE status = ? AND next_attempt_at <= ? "
+                "ORDER BY id LIMIT ?",
+                (STATUS_QUEUED, now, len(self._in_flight) + 1)
+            ).fetchall()
+            for row in rows:
+                if row[0] not in self._in_flight:
+                    self._in_flight.add(row[0])
+                    return row, None
+            next_due = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM alerts WHERE status = ? AND next_attempt_at > ?",
+                (STATUS_QUEUED, now)
+            ).fetchone()[0]
+        if next_due is None:
+            return None, IDLE_POLL_INTERVAL
+        return None, min(IDLE_POLL_INTERVAL, next_due - now)
+
+    def _backoff(self, attempts):
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _deliver(self, alert_id, message, attempts):
+        started = time.perf_counter()
+        try:
+            self.provider.send(message)
+        except Exception as e:
+            SMS_SEND_SECONDS.labels("error").observe(time.perf_counter() - started)
+            attempts += 1
+            error = str(e)
+            if attempts >= self.max_attempts:
+                status, next_attempt_at = STATUS_FAILED, None
+                self.stats["failed"] += 1
+                print(f"Error sending alert {alert_id}, giving up after {attempts} attempts: {error}")
+            else:
+                status, next_attempt_at = STATUS_QUEUED, time.time() + self._backoff(attempts)
+                self.stats["retried"] += 1
+                print(f"Error sending alert {alert_id} (attempt {attempts}), retrying: {error}")
+        else:
+            SMS_SEND_SECONDS.labels("sent").observe(time.perf_counter() - started)
+            attempts += 1
+            status, next_attempt_at, error = STATUS_SENT, None, None
+            self.stats["sent"] += 1
+            self.stats["last_send_ms"] = (time.perf_counter() - started) * 1000
+            print(f"ALERT SENT: {message}")
+
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "UPDATE alerts SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, "
+                f"revision = {NEXT_REVISION} WHERE id = ?",
+                (status, attempts, next_attempt_at, error, alert_id)
+            )
+            self._in_flight.discard(alert_id)
+
+    def _run(self):
+        while not self._stopping:
+            if self._deferred:
+                self._store_deferred()
+            alert, wait = self._claim()
+            if alert is None:
+                with self._wakeup:
+                    self._wakeup.wait(wait)
+                continue
+            self._deliver(*alert)
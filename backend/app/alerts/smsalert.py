@@ -1,13 +1,14 @@
 import time
 import random  # Simulating smartwatch data
-from twilio.rest import Client  # Twilio for SMS alerts
 import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from backend.app.services.geolocation import get_device_location
+from backend.app.services.twilio_services import TwilioSmsProvider
+from backend.app.alerts.outbox import AlertOutbox
+from backend.app.alerts.debounce import AlertDebouncer
+from backend.app.config import DB_NAME
+from backend.app.services.rules import rule_engine
 
-import sqlite3
-from datetime import datetime
 # from backend.app.database import get_db, Alert  # Assuming you have a database module
 
 # Twilio Credentials (replace with actual credentials)
@@ -16,62 +17,88 @@ TWILIO_AUTH_TOKEN = "892207d06a1b391a0e2de56621bca088"
 TWILIO_PHONE = "+19207179504"
 EMERGENCY_CONTACT = "+917416918937"
 
-DB_NAME = "D:/women-safety-system/scripts/smartwatch_data.db"
-
-# Function to send alert
-
-# Database connection
-conn = sqlite3.connect(DB_NAME)
-cursor = conn.cursor()
-
-# Create table if it doesn't exist
-cursor.execute('''
-    CREATE TABLE IF NOT EXISTS alerts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        message TEXT NOT NULL,
-        timestamp TEXT NOT NULL,
-        status TEXT NOT NULL
-    )
-''')
-conn.commit()
-
-def send_alert(message):
-    client = Client(TWILIO_SID, TWILIO_AUTH_TOKEN)
-
-    try:
-        client.messages.create(
-            body=message,
-            from_=TWILIO_PHONE,
-            to=EMERGENCY_CONTACT
-        )
-        status = "Sent"
-    except Exception as e:
-        print(f"Error sending alert: {e}")
-        status = "Failed"
-
-    # Store alert in the database
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cursor.execute("INSERT INTO alerts (message, timestamp, status) VALUES (?, ?, ?)", (message, timestamp, status))
-    conn.commit()
-
-    print(f"ALERT SENT: {message}")
-    
-    
-    # print(f"Location: {location_link}")
-    
-    # Store alert in the database
-    # db = get_db()
-    # new_alert = Alert(message=message, latitude=latitude, longitude=longitude)
-    # db.add(new_alert)
-    # db.commit()
-
-# Threshold values
-HR_THRESHOLD_HIGH = 140
-HR_THRESHOLD_LOW = 50
-SPO2_THRESHOLD = 90
-STEP_THRESHOLD = 50  # Sudden increase
+# Alerts are written to the outbox (alerts table) and sent by background workers
+_outbox = None
+
+# Kinds of free-form alerts, the cooldown key of send_alert() together with the device
+WATCH_REMOVED = "watch_removed"
+
+
+def get_outbox():
+    """Return the process-wide alert outbox, starting its workers on first use."""
+    global _outbox
+    if _outbox is None:
+        provider = TwilioSmsProvider(TWILIO_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE, EMERGENCY_CONTACT)
+        _outbox = AlertOutbox(DB_NAME, provider).start()
+    return _outbox
+
+
+def set_outbox(outbox):
+    """Use a different outbox, e.g. one with a stub SMS provider for load tests."""
+    global _outbox
+    _outbox = outbox
+
+
+def send_alert(message, device_id=None, kind=None):
+    """
+    Queue an alert for delivery. Returns immediately; the SMS is sent in the background.
+
+    Alerts of the same kind (e.g. WATCH_REMOVED) for the same device are
+    coalesced within the cooldown window, whatever details such as the
+    location link the message carries; without a kind, identical messages
+    are. Returns the outbox id, or None if the alert was suppressed.
+    """
+    message = alert_debouncer.allow((device_id, kind or message), message)
+    if message is None:
+        return None
+    return _enqueue(message)
+
+
+def check_rules(device_id, evaluation):
+    """
+    Pass the alert rules of one evaluated sample (RuleEngine.evaluate) through the debouncer.
+
+    Call this for every sample, not only when a rule fires: the rules with an
+    episode in progress for the device are fed too, so the debouncer can see
+    the value recover and close the episode. Episodes of rules that a reload
+    or a per-device override has removed or disabled are closed here, as no
+    sample will ever feed them again. Returns the outbox ids queued.
+    """
+    rules = evaluation.alerts
+    open_rules = alert_debouncer.open_rules(device_id)
+    if open_rules:
+        firing = {rule.name for rule in rules}
+        rules = rules + [evaluation.rules[name] for name in open_rules
+                         if name not in firing and name in evaluation.rules]
+        # A rule missing here may only be limited to another source; close it only if it is off everywhere
+        stale = [name for name in open_rules if name not in evaluation.rules]
+        if stale:
+            enabled = rule_engine.enabled_rules(device_id)
+            for name in stale:
+                if name not in enabled:
+                    alert_debouncer.close(device_id, name)
+    alert_ids = []
+    for rule in rules:
+        value = evaluation.values.get(rule.signal)
+        if value is None:
+            continue
+        message = alert_debouncer.observe(device_id, rule.name, value, rule=rule.alert_rule)
+        if message is not None:
+            alert_ids.append(_enqueue(message))
+    return alert_ids
+
+
+def _enqueue(message):
+    alert_id = get_outbox().enqueue(message)
+    print(f"ALERT QUEUED ({alert_id if alert_id is not None else 'deferred'}): {message}")
+    return alert_id
+
 WATCH_TIMEOUT = 10  # Seconds without data = watch removed
 
+# Thresholds live in the rule file (backend/app/rules.json, see services/rules.py);
+# the debouncer gets each rule with the sample that fired it
+alert_debouncer = AlertDebouncer()
+
 # Simulated smartwatch data (Replace this with real sensor data)
 def get_smartwatch_data():
     return {
@@ -83,34 +110,21 @@ def get_smartwatch_data():
 
 # Monitoring function
 def monitor_smartwatch():
-    last_steps = 0
+    previous = {"steps": 0}
     last_watch_time = time.time()
     
     while True:
         data = get_smartwatch_data()
         print(f"Smartwatch Data: {data}")
 
-        # Heart Rate check
-        if data["heart_rate"] > HR_THRESHOLD_HIGH :
-            send_alert(f"⚠️ High Heart Rate Detected! HR: {data['heart_rate']} BPM")
-
-        if data["heart_rate"] < HR_THRESHOLD_LOW:
-            send_alert(f"⚠️ Low Heart Rate Detected! HR: {data['heart_rate']} BPM")
-
-        # SpO2 check
-        if data["spo2"] < SPO2_THRESHOLD:
-            send_alert(f"⚠️ Low Oxygen Level! SpO2: {data['spo2']}%")
-
-        # Step Count check
-        if data["steps"] - last_steps > STEP_THRESHOLD:
-            send_alert(f"⚠️ Sudden running detected! Steps: {data['steps']}")
-
-        last_steps = data["steps"]
+        # Heart rate, SpO2 and step jump rules
+        check_rules(None, rule_engine.evaluate(data, source="monitor", previous=previous))
+        previous = data
 
         # Watch removal detection
         if not data["watch_worn"]:
             if time.time() - last_watch_time > WATCH_TIMEOUT:
-                send_alert("⚠️ Watch removed! Possible danger.")
+                send_alert("⚠️ Watch removed! Possible danger.", kind=WATCH_REMOVED)
         else:
             last_watch_time = time.time()
 
@@ -0,0 +1,249 @@
+"""
+ASGI server mode for the API: `python run.py --asgi`, or
+`uvicorn --factory backend.app.asgi:create_asgi_app`.
+
+The endpoints that wait on something other than SQLite are served natively
+on the event loop: /stream holds no thread per client, and /scan and
+/connect await the background scanner's BLE loop. Every other request is
+passed to the Flask app on a bounded thread pool, so database queries never
+stall the loop and never wait behind BLE work or open streams.
+"""
+import asyncio
+import io
+import json
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from backend.app.services.ble_scanner import FIND_TIMEOUT
+from backend.app.services.live_stream import parse_event_id
+from backend.app.services.metrics import HTTP_REQUEST_SECONDS
+
+WSGI_WORKERS = 32  # threads running Flask requests
+CORS_HEADERS = [(b"access-control-allow-origin", b"*")]
+
+
+class _RequestBody(io.RawIOBase):
+    """wsgi.input that pulls the request body from the ASGI receive channel as Flask reads it."""
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._buffer = b""
+        self._more = True
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self._buffer and self._more:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message["type"] == "http.disconnect":
+                self._more = False
+                break
+            self._buffer = message.get("body", b"")
+            self._more = message.get("more_body", False)
+        count = min(len(target), len(self._buffer))
+        target[:count] = self._buffer[:count]
+        self._buffer = self._buffer[count:]
+        return count
+
+
+def wsgi_environ(scope, body):
+    """WSGI environ for an ASGI http scope."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    if "CONTENT_LENGTH" not in environ:
+        # Chunked upload: let Flask read until the body ends
+        environ["wsgi.input_terminated"] = True
+    return environ
+
+
+class AsgiApp:
+    """ASGI application serving the streaming and BLE endpoints natively and the rest through Flask."""
+
+    def __init__(self, flask_app, workers=WSGI_WORKERS):
+        self.flask_app = flask_app
+        self.live_feed = flask_app.extensions["live_feed"]
+        self.watch_scanner = flask_app.extensions["watch_scanner"]
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="wsgi")
+        # (method, path pattern, metrics route label, handler)
+        self.routes = [
+            ("GET", re.compile(r"/stream"), "/stream", self.stream_updates),
+            ("GET", re.compile(r"/scan"), "/scan", self.scan_devices),
+            ("POST", re.compile(r"/connect/(?P<device_id>[^/]+)"), "/connect/<device_id>", self.connect_device),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        for method, pattern, route, handler in self.routes:
+            match = pattern.fullmatch(scope["path"])
+            if match and scope["method"] == method:
+                started = time.perf_counter()
+                status = await handler(scope, receive, send, **match.groupdict())
+                HTTP_REQUEST_SECONDS.labels(method, route, status).observe(time.perf_counter() - started)
+                return
+        await self.call_flask(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # Flask ------------------------------------------------------------------
+
+    async def call_flask(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        environ = wsgi_environ(scope, io.BufferedReader(_RequestBody(receive, loop)))
+        await loop.run_in_executor(self.executor, self._run_wsgi, environ, send, loop)
+
+    def _run_wsgi(self, environ, send, loop):
+        """Run one Flask request on a worker thread, forwarding the response to the event loop."""
+        def forward(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["start"] = {
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+            }
+            return write
+
+        def write(data):
+            if "start" in response:
+                forward(response.pop("start"))
+            if data:
+                forward({"type": "http.response.body", "body": data, "more_body": True})
+
+        body = self.flask_app(environ, start_response)
+        try:
+            for chunk in body:
+                write(chunk)
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+        write(b"")
+        forward({"type": "http.response.body", "body": b""})
+
+    # Native endpoints ---------------------------------------------------------
+
+    @staticmethod
+    async def send_json(send, status, payload):
+        body = json.dumps(payload).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+                       + CORS_HEADERS,
+        })
+        await send({"type": "http.response.body", "body": body})
+        return status
+
+    async def scan_devices(self, scope, receive, send):
+        """/scan without holding a thread while ?fresh= waits."""
+        self.watch_scanner.start()
+        fresh = parse_qs(scope["query_string"].decode()).get("fresh")
+        if fresh is None:
+            return await self.send_json(send, 200, self.watch_scanner.devices())
+        try:
+            return await self.send_json(send, 200, await self.watch_scanner.fresh_devices_async(float(fresh[0])))
+        except ValueError:
+            return await self.send_json(send, 400, {"error": "fresh must be a number of seconds"})
+
+    async def connect_device(self, scope, receive, send, device_id):
+        """/connect awaiting the lookup on the scanner's BLE loop."""
+        try:
+            device = await asyncio.wait_for(asyncio.wrap_future(self.watch_scanner.find(device_id)),
+                                            FIND_TIMEOUT + 5)
+        except Exception as e:
+            return await self.send_json(send, 500, {"error": str(e)})
+        if device is None:
+            return await self.send_json(send, 404, {"error": "Device not found"})
+        return await self.send_json(send, 200, {"message": f"Successfully connected to {device['name']}"})
+
+    async def stream_updates(self, scope, receive, send):
+        """/stream as an async generator; ends when the client disconnects."""
+        query = parse_qs(scope["query_string"].decode())
+        headers = dict(scope["headers"])
+        device_id = query.get("device_id", [None])[0]
+        last_event_id = headers.get(b"last-event-id", b"").decode() or query.get("last_event_id", [None])[0]
+        if last_event_id:
+            try:
+                parse_event_id(last_event_id)
+            except ValueError:
+                return await self.send_json(send, 400, {"error": f"Invalid event id: {last_event_id}"})
+
+        stream = self.live_feed.astream(device_id, last_event_id)
+
+        async def pump():
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/event-stream; charset=utf-8"), (b"cache-control", b"no-cache"),
+                            (b"x-accel-buffering", b"no")] + CORS_HEADERS,
+            })
+            try:
+                async for chunk in stream:
+                    await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+            finally:
+                # Unsubscribes from the live feed, also when cancelled mid-send
+                await stream.aclose()
+            await send({"type": "http.response.body", "body": b""})
+
+        async def disconnected():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        tasks = [asyncio.ensure_future(pump()), asyncio.ensure_future(disconnected())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        return 200
+
+
+def create_asgi_app(db_path=None, workers=WSGI_WORKERS):
+    from backend.app import create_app
+    return AsgiApp(create_app(db_path), workers)
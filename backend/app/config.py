@@ -0,0 +1,20 @@
+import os
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# SQLite database shared by the ingestion scripts and the Flask API.
+# Override with the SMARTWATCH_DB environment variable.
+DB_NAME = os.environ.get("SMARTWATCH_DB", os.path.join(BASE_DIR, "scripts", "smartwatch_data.db"))
+
+# Directory for the binary archive of raw BLE notifications (see
+# database/raw_archive.py). Unset disables the archive.
+RAW_ARCHIVE_DIR = os.environ.get("SMARTWATCH_RAW_ARCHIVE") or None
+
+# GATT services and characteristics discovered per watch (services/gatt_cache.py)
+GATT_CACHE_FILE = os.environ.get("SMARTWATCH_GATT_CACHE", os.path.join(BASE_DIR, "scripts", "gatt_cache.json"))
+
+# Declarative alert thresholds and classifiers (services/rules.py), re-read when the file changes
+RULES_FILE = os.environ.get("SMARTWATCH_RULES", os.path.join(BASE_DIR, "backend", "app", "rules.json"))
+
+# Emotion classifier weights (services/emotion_ml.py), written by scripts/train_emotion_model.py
+EMOTION_MODEL_FILE = os.environ.get("SMARTWATCH_EMOTION_MODEL", os.path.join(BASE_DIR, "backend", "app", "emotion_model.json"))
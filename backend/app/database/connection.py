@@ -0,0 +1,112 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from backend.app.config import DB_NAME
+
+MAX_CONNECTIONS = 16
+BUSY_TIMEOUT = 30  # seconds to wait for a lock held by another writer
+
+# Applied to every connection handed out by this module
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA cache_size=-16000",  # 16 MB
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+def configure(conn):
+    """Apply the shared pragmas to a connection and return it."""
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def connect(db_path=DB_NAME, check_same_thread=True, timeout=BUSY_TIMEOUT):
+    """Open a dedicated, pre-configured connection (for long-lived background threads)."""
+    conn = sqlite3.connect(db_path, timeout=timeout, check_same_thread=check_same_thread)
+    return configure(conn)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of pre-configured SQLite connections.
+
+    A connection is used by one thread at a time: connection() hands the
+    calling thread an idle connection (opening one if fewer than
+    max_connections exist, otherwise waiting) and takes it back afterwards.
+    Nested connection() calls in the same thread reuse the same connection.
+    """
+
+    def __init__(self, db_path=DB_NAME, max_connections=MAX_CONNECTIONS):
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.max_connections:
+                self._opened += 1
+                return connect(self.db_path, check_same_thread=False)
+        return self._idle.get(timeout=BUSY_TIMEOUT)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success and rolls back on error."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._idle.put(conn)
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=DB_NAME):
+    """Return the process-wide pool for a database file."""
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = _pools[db_path] = ConnectionPool(db_path)
+        return pool
+
+
+def get_connection(db_path=DB_NAME):
+    """Shortcut for `get_pool(db_path).connection()`."""
+    return get_pool(db_path).connection()
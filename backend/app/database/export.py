@@ -0,0 +1,229 @@
+"""
+Streaming bulk export of sensor_data as CSV, Parquet or Arrow IPC.
+
+Rows are read oldest first in chunks of CHUNK_SIZE with keyset pagination
+on (timestamp, id), borrowing a pooled connection per chunk, and each
+chunk is encoded and handed on before the next one is read. Memory use is
+one chunk however large the export is, no read transaction stays open
+while a slow client drains the output, and the same generator feeds both
+the /export endpoint and scripts/export_data.py.
+
+Parquet and Arrow need pyarrow (`pip install pyarrow`); CSV does not.
+"""
+import csv
+import io
+import logging
+import time
+
+from backend.app.database.connection import get_connection
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ("id", "timestamp", "heart_rate", "step_count", "battery_level", "device_id", "emotion")
+CHUNK_SIZE = 10_000  # rows read, encoded and sent at a time
+MAX_CHUNK_SIZE = 100_000
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+EXTENSIONS = {"csv": "csv", "parquet": "parquet", "arrow": "arrows"}
+
+
+class ExportFormatError(ValueError):
+    """Unknown export format, or pyarrow is missing for Parquet and Arrow."""
+
+
+class ExportStats:
+    """Rows and bytes streamed by one export, and how long it took."""
+
+    def __init__(self, format):
+        self.format = format
+        self.rows = 0
+        self.chunks = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    @property
+    def seconds(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self):
+        seconds = self.seconds
+        return (f"{self.rows} rows in {self.chunks} chunks, {self.bytes / 1e6:.1f} MB of {self.format} "
+                f"in {seconds:.2f}s ({self.rows_per_second:,.0f} rows/s, "
+                f"{self.bytes / 1e6 / seconds if seconds > 0 else 0:.1f} MB/s)")
+
+
+def iter_chunks(db_path, device_id=None, start=None, end=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield lists of sensor_data rows (EXPORT_COLUMNS), oldest first.
+
+    `start` is inclusive and `end` exclusive, in the stored
+    'YYYY-MM-DD HH:MM:SS' format. Each chunk is an index range scan
+    starting after the last row of the previous one.
+    """
+    chunk_size = max(1, min(int(chunk_size), MAX_CHUNK_SIZE))
+    clauses, params = [], []
+    if device_id is not None:
+        clauses.append("device_id = ?")
+        params.append(device_id)
+    if start is not None:
+        clauses.append("timestamp >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("timestamp < ?")
+        params.append(end)
+    query = (f"SELECT {', '.join(EXPORT_COLUMNS)} FROM sensor_data "
+             f"WHERE {' AND '.join(clauses + ['(timestamp, id) > (?, ?)'])} "
+             f"ORDER BY timestamp, id LIMIT ?")
+
+    # Sorts before every stored timestamp, so the first chunk starts at the beginning
+    last = ("", 0)
+    while True:
+        with get_connection(db_path) as conn:
+            rows = conn.execute(query, params + [*last, chunk_size]).fetchall()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        last = (rows[-1][1], rows[-1][0])
+
+
+def _csv_stream(chunks, stats):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        stats.rows += len(rows)
+        stats.chunks += 1
+        stats.bytes += len(data)
+        yield data
+    data = buffer.getvalue().encode()
+    if data:
+        # Only the header is left over when nothing matched
+        stats.bytes += len(data)
+        yield data
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ExportFormatError("Parquet and Arrow exports need pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+class _Drain:
+    """Write-only file that pyarrow writes into and the export empties after every chunk."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def _arrow_schema(pa):
+    # Timestamps are IST wall-clock time as stored, so they carry no time zone
+    return pa.schema([
+        ("id", pa.int64()),
+        ("timestamp", pa.timestamp("s")),
+        ("heart_rate", pa.int32()),
+        ("step_count", pa.int64()),
+        ("battery_level", pa.int32()),
+        ("device_id", pa.string()),
+        ("emotion", pa.string()),
+    ])
+
+
+def _record_batch(pa, schema, rows):
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        if field.name == "timestamp":
+            arrays.append(pa.compute.strptime(pa.array(values, pa.string()), format="%Y-%m-%d %H:%M:%S",
+                                              unit="s", error_is_null=True))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _arrow_stream(chunks, stats, pa):
+    schema = _arrow_schema(pa)
+    sink = _Drain()
+    output = pa.PythonFile(sink, mode="w")
+    if stats.format == "parquet":
+        # One row group per chunk, so each chunk can be sent as soon as it is encoded
+        writer = pa.parquet.ParquetWriter(output, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(output, schema)
+    try:
+        for rows in chunks:
+            writer.write_batch(_record_batch(pa, schema, rows))
+            data = sink.drain()
+            stats.rows += len(rows)
+            stats.chunks += 1
+            stats.bytes += len(data)
+            if data:
+                yield data
+    finally:
+        writer.close()
+    data = sink.drain()
+    stats.bytes += len(data)
+    yield data
+
+
+def stream_export(db_path, format="csv", device_id=None, start=None, end=None, chunk_size=CHUNK_SIZE, stats=None):
+    """
+    Generator of the encoded export, chunk by chunk.
+
+    Raises ExportFormatError right away (not on first iteration) for an
+    unknown format or a missing pyarrow. Pass an ExportStats to read the
+    throughput afterwards; it is also logged when the export finishes.
+    """
+    if format not in CONTENT_TYPES:
+        raise ExportFormatError(f"Unknown export format {format!r}, expected one of {', '.join(CONTENT_TYPES)}")
+    pa = _pyarrow() if format != "csv" else None
+    stats = stats if stats is not None else ExportStats(format)
+    chunks = iter_chunks(db_path, device_id, start, end, chunk_size)
+    stream = _csv_stream(chunks, stats) if pa is None else _arrow_stream(chunks, stats, pa)
+
+    def run():
+        stats.started = time.perf_counter()
+        yield from stream
+        stats.finished = time.perf_counter()
+        logger.info(f"Export finished: {stats.summary()}")
+
+    return run()
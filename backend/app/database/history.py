@@ -0,0 +1,86 @@
+import base64
+from datetime import datetime
+
+import pytz
+
+IST = pytz.timezone('Asia/Kolkata')
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+HISTORY_COLUMNS = "id, timestamp, heart_rate, step_count, battery_level, device_id, emotion"
+
+
+def ensure_history_indexes(conn):
+    """
+    Create the indexes used by fetch_history.
+
+    SQLite appends the rowid (our `id`) to every index key, so these also
+    cover the (timestamp, id) tie-breaker used for keyset pagination.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sensor_data_timestamp ON sensor_data(timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sensor_data_device_timestamp ON sensor_data(device_id, timestamp)")
+    conn.commit()
+
+
+def parse_timestamp(value):
+    """
+    Normalise an ISO-8601 timestamp to the 'YYYY-MM-DD HH:MM:SS' IST format stored in sensor_data.
+
+    A timestamp with an offset is converted to IST; one without is taken to be IST already.
+    """
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(IST)
+    return timestamp.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def encode_cursor(timestamp, row_id):
+    return base64.urlsafe_b64encode(f"{timestamp}|{row_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (timestamp, id) from a cursor. Raises ValueError if it is malformed."""
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return timestamp, int(row_id)
+    except (UnicodeDecodeError, ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def fetch_history(conn, device_id=None, start=None, end=None, cursor=None, limit=DEFAULT_LIMIT):
+    """
+    Fetch one page of sensor_data, newest first.
+
+    Uses keyset (seek) pagination on (timestamp, id): the cursor is the last
+    row of the previous page, so every page is an index range scan of `limit`
+    rows no matter how deep it is or how large the table grows.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    clauses, params = [], []
+    if device_id is not None:
+        clauses.append("device_id = ?")
+        params.append(device_id)
+    if start is not None:
+        clauses.append("timestamp >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("timestamp < ?")
+        params.append(end)
+    if cursor is not None:
+        clauses.append("(timestamp, id) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = conn.execute(
+        f"SELECT {HISTORY_COLUMNS} FROM sensor_data {where} ORDER BY timestamp DESC, id DESC LIMIT ?",
+        params + [limit + 1]
+    ).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    return rows, next_cursor
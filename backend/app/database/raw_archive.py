@@ -0,0 +1,269 @@
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import uuid as uuidlib
+from datetime import datetime, timezone
+
+# Segment file: 8-byte magic, then records of
+#   int64 timestamp (microseconds since the epoch, UTC)
+#   16 bytes device id (address without colons, ASCII, zero-padded)
+#   uint16 characteristic slot (index into the segment's UUID table)
+#   uint16 payload length
+# followed by the raw payload bytes. The first record of a characteristic in
+# a segment is preceded by a definition record (slot DEFINE_UUID) whose
+# payload is the new slot and the full 128-bit UUID, so vendor UUIDs are kept
+# as losslessly as Bluetooth base ones. Version 1 segments stored 16-bit
+# assigned numbers in the slot field and are still read.
+MAGIC = b"WSRAW\x00\x02\x00"
+MAGIC_V1 = b"WSRAW\x00\x01\x00"
+HEADER = struct.Struct("<q16sHH")
+DEFINITION = struct.Struct("<H16s")
+DEFINE_UUID = 0xFFFF
+BUFFER_SIZE = 64 * 1024  # bytes collected before a write
+FLUSH_INTERVAL = 1.0  # seconds; buffered records are written at least this often
+SEGMENT_FORMAT = "raw-%Y%m%d-%H.bin"  # one segment per UTC hour
+SEGMENT_PREFIX = len("raw-YYYYMMDD-HH")
+
+
+def uuid_bytes(characteristic_uuid):
+    """The 16 bytes of a characteristic UUID; anything that is not a UUID is stored as the nil UUID."""
+    try:
+        return uuidlib.UUID(str(characteristic_uuid)).bytes
+    except ValueError:
+        return bytes(16)
+
+
+def full_uuid(characteristic):
+    return f"0000{characteristic:04x}-0000-1000-8000-00805f9b34fb"
+
+
+def encode_device_id(address):
+    return address.replace(":", "").encode("ascii", "replace")[:16]
+
+
+def decode_device_id(raw):
+    device_id = raw.rstrip(b"\x00").decode("ascii", "replace")
+    if len(device_id) == 12:
+        return ":".join(device_id[i:i + 2] for i in range(0, 12, 2))
+    return device_id
+
+
+def segment_name(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(SEGMENT_FORMAT)
+
+
+def scan_segment(path):
+    """
+    Length of the intact prefix of a segment and its UUID table ({uuid bytes: slot}).
+
+    The length is 0 if the file is empty or not a current-version archive.
+    """
+    slots = {}
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return 0, slots
+        offset = len(MAGIC)
+        size = os.fstat(f.fileno()).st_size
+        while offset + HEADER.size <= size:
+            f.seek(offset)
+            _, _, slot, length = HEADER.unpack(f.read(HEADER.size))
+            if offset + HEADER.size + length > size:
+                break
+            if slot == DEFINE_UUID and length == DEFINITION.size:
+                defined, raw_uuid = DEFINITION.unpack(f.read(length))
+                slots[raw_uuid] = defined
+            offset += HEADER.size + length
+        return offset, slots
+
+
+class RawArchiveWriter:
+    """
+    Append-only archive of raw GATT notifications.
+
+    Records are packed into an in-memory buffer and written with one call
+    per BUFFER_SIZE bytes, to a new segment file every hour. A background
+    thread also writes the buffer every FLUSH_INTERVAL seconds, so a watch
+    that goes quiet does not leave its last records in memory. Appending
+    costs one struct pack and no system call, so it is safe to call from
+    every notification handler.
+    """
+
+    def __init__(self, directory, buffer_size=BUFFER_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.directory = directory
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.records = 0
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._file = None
+        self._slots = {}
+        self._segment_start = self._segment_end = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="raw-archive-flush", daemon=True)
+        self._thread.start()
+
+    def append(self, device_id, characteristic_uuid, payload, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            if not self._segment_start <= timestamp < self._segment_end:
+                self._rotate(timestamp)
+            micros = int(timestamp * 1_000_000)
+            device = encode_device_id(device_id)
+            raw_uuid = uuid_bytes(characteristic_uuid)
+            slot = self._slots.get(raw_uuid)
+            if slot is None:
+                slot = self._slots[raw_uuid] = len(self._slots)
+                self._buffer += HEADER.pack(micros, device, DEFINE_UUID, DEFINITION.size)
+                self._buffer += DEFINITION.pack(slot, raw_uuid)
+            self._buffer += HEADER.pack(micros, device, slot, len(payload))
+            self._buffer += payload
+            self.records += 1
+            if len(self._buffer) >= self.buffer_size:
+                self._write()
+
+    def _rotate(self, timestamp):
+        self._write()
+        if self._file is not None:
+            self._file.close()
+        self._segment_start = timestamp - timestamp % 3600
+        self._segment_end = self._segment_start + 3600
+        path = os.path.join(self.directory, segment_name(timestamp))
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                legacy = f.read(len(MAGIC)) == MAGIC_V1
+            if legacy:
+                # Keep an older-version segment of this hour next to the new one (it sorts first)
+                os.replace(path, path[:-len(".bin")] + "-v1.bin")
+        valid, self._slots = scan_segment(path) if os.path.exists(path) else (0, {})
+        # Unbuffered: the bytearray above is the buffer
+        self._file = open(path, "ab", buffering=0)
+        if valid == 0:
+            self._file.truncate(0)
+            self._file.write(MAGIC)
+        elif valid < self._file.tell():
+            # Cut off a record torn by a crash so new records stay aligned
+            self._file.truncate(valid)
+
+    def _write(self):
+        if self._buffer and self._file is not None:
+            self._file.write(self._buffer)
+            self.bytes_written += len(self._buffer)
+            self._buffer.clear()
+
+    def flush(self):
+        with self._lock:
+            self._write()
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self._stopping.set()
+        with self._lock:
+            self._write()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._segment_start = self._segment_end = 0
+
+
+class RawArchiveReader:
+    """
+    Memory-mapped reader for one segment.
+
+    Payloads are memoryview slices of the mapping, so iterating copies
+    nothing; they are only valid until the reader is closed (copy with
+    bytes() to keep one). A record cut short by a crash ends the segment.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._mmap) if self._mmap is not None else memoryview(b"")
+        magic = bytes(self._view[:len(MAGIC)])
+        if size and magic not in (MAGIC, MAGIC_V1):
+            self.close()
+            raise ValueError(f"{path} is not a raw notification archive")
+        self.legacy = magic == MAGIC_V1
+
+    def __iter__(self):
+        """Yield (timestamp, device_id, characteristic_uuid, payload) in write order."""
+        view = self._view
+        offset = len(MAGIC)
+        end = len(view)
+        unpack_from = HEADER.unpack_from
+        header_size = HEADER.size
+        # A segment holds few distinct devices and characteristics; decode each once
+        devices = {}
+        characteristics = {}
+        while offset + header_size <= end:
+            micros, device, slot, length = unpack_from(view, offset)
+            offset += header_size
+            if offset + length > end:
+                break
+            if slot == DEFINE_UUID and not self.legacy:
+                defined, raw_uuid = DEFINITION.unpack_from(view, offset)
+                characteristics[defined] = str(uuidlib.UUID(bytes=raw_uuid))
+                offset += length
+                continue
+            device_id = devices.get(device)
+            if device_id is None:
+                device_id = devices[device] = decode_device_id(device)
+            uuid = characteristics.get(slot)
+            if uuid is None:
+                # Version 1 stored the 16-bit assigned number of a Bluetooth base UUID
+                uuid = characteristics[slot] = full_uuid(slot)
+            yield micros / 1_000_000, device_id, uuid, view[offset:offset + length]
+            offset += length
+
+    def close(self):
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def segments(directory, start=None, end=None):
+    """Segment paths in time order, optionally limited to hours overlapping [start, end) (epoch seconds)."""
+    first = segment_name(start)[:SEGMENT_PREFIX] if start is not None else None
+    last = segment_name(end)[:SEGMENT_PREFIX] if end is not None else None
+    names = sorted(name for name in os.listdir(directory) if name.startswith("raw-") and name.endswith(".bin"))
+    return [os.path.join(directory, name) for name in names
+            if (first is None or name[:SEGMENT_PREFIX] >= first) and (last is None or name[:SEGMENT_PREFIX] <= last)]
+
+
+def iter_archive(directory, start=None, end=None, device_id=None):
+    """Replay every record in [start, end) across segments, copying payloads to bytes."""
+    for path in segments(directory, start, end):
+        with RawArchiveReader(path) as reader:
+            for timestamp, device, characteristic, view in reader:
+                payload = bytes(view)
+                # Drop the slice now, or the mapping cannot be closed
+                view.release()
+                if start is not None and timestamp < start:
+                    continue
+                if end is not None and timestamp >= end:
+                    break
+                if device_id is not None and device != device_id:
+                    continue
+                yield timestamp, device, characteristic, payload
+
+
+if __name__ == "__main__":
+    # Print an archive directory as timestamp, device, characteristic, hex payload
+    for record_time, record_device, record_uuid, record_payload in iter_archive(sys.argv[1]):
+        print(f"{datetime.fromtimestamp(record_time).isoformat()} {record_device} {record_uuid} {record_payload.hex()}")
@@ -0,0 +1,193 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from backend.app.config import DB_NAME
+from backend.app.database.connection import connect
+
+logger = logging.getLogger(__name__)
+
+IST = pytz.timezone('Asia/Kolkata')
+
+BATCH_SIZE = 1000  # rows deleted per transaction
+BATCH_PAUSE = 0.05  # seconds to sleep between batches so ingestion writers get the lock
+VACUUM_PAGES = 500  # free pages returned to the OS per incremental_vacuum step
+RUN_INTERVAL = 3600  # seconds between scheduled runs
+
+
+class RetentionPolicy:
+    """
+    Delete rows of `table` whose `time_column` is older than `max_age`.
+
+    `tz` is the clock the column is written with: sensor data and its
+    rollups are stamped in IST; tz=None means the server's local time.
+    """
+
+    def __init__(self, table, time_column, max_age, key="rowid", where=None, tz=IST):
+        self.table = table
+        self.time_column = time_column
+        self.max_age = max_age
+        # Column(s) identifying a row; WITHOUT ROWID tables use their primary key
+        self.key = key
+        # Extra condition, e.g. never delete alerts that are still waiting to be sent
+        self.where = where
+        self.tz = tz
+
+
+DEFAULT_POLICIES = [
+    RetentionPolicy("sensor_data", "timestamp", timedelta(days=30)),
+    RetentionPolicy("sensor_rollup_1m", "bucket", timedelta(days=90), key="device_id, bucket"),
+    RetentionPolicy("sensor_rollup_1h", "bucket", timedelta(days=730), key="device_id, bucket"),
+    # Alerts are stamped with the server's local time
+    RetentionPolicy("alerts", "timestamp", timedelta(days=365), where="status != 'Queued'", tz=None),
+]
+
+
+class RetentionEngine:
+    """
+    Applies retention policies in small batches.
+
+    Each batch deletes at most BATCH_SIZE rows in its own short transaction
+    and then sleeps, so the write lock is never held for long and the BLE
+    ingestion writer keeps flushing while old data is purged. Freed pages
+    are handed back with incremental auto-vacuum.
+
+    Progress and totals are kept in `metrics`.
+    """
+
+    def __init__(self, db_path=DB_NAME, policies=None, batch_size=BATCH_SIZE,
+                 batch_pause=BATCH_PAUSE, vacuum_pages=VACUUM_PAGES):
+        self.db_path = db_path
+        self.policies = policies if policies is not None else DEFAULT_POLICIES
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.vacuum_pages = vacuum_pages
+        self.metrics = {
+            "runs": 0,
+            "running": False,
+            "current_table": None,
+            "last_run_at": None,
+            "last_run_seconds": 0.0,
+            "pages_reclaimed": 0,
+            "tables": {},
+        }
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _table_exists(conn, table):
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone() is not None
+
+    @staticmethod
+    def enable_incremental_vacuum(conn):
+        """
+        Switch the database to incremental auto-vacuum.
+
+        Changing the mode needs one full VACUUM, which rewrites the file and
+        blocks writers, so it is only done when explicitly requested.
+        """
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+
+    def _purge(self, conn, policy):
+        table_metrics = self.metrics["tables"].setdefault(
+            policy.table, {"deleted": 0, "last_deleted": 0, "batches": 0, "last_seconds": 0.0}
+        )
+        if not self._table_exists(conn, policy.table):
+            return 0
+
+        # Same name as the /history index on sensor_data, so it is not built twice
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{policy.table}_{policy.time_column} "
+            f"ON {policy.table}({policy.time_column})"
+        )
+        cutoff = (datetime.now(policy.tz) - policy.max_age).strftime('%Y-%m-%d %H:%M:%S')
+        extra = f"AND {policy.where}" if policy.where else ""
+        key = f"({policy.key})" if "," in policy.key else policy.key
+        statement = (
+            f"DELETE FROM {policy.table} WHERE {key} IN ("
+            f"SELECT {policy.key} FROM {policy.table} WHERE {policy.time_column} < ? {extra} LIMIT ?)"
+        )
+
+        started = time.perf_counter()
+        deleted = 0
+        while not self._stop.is_set():
+            with conn:
+                count = conn.execute(statement, (cutoff, self.batch_size)).rowcount
+            deleted += count
+            table_metrics["deleted"] += count
+            table_metrics["batches"] += 1
+            if count < self.batch_size:
+                break
+            time.sleep(self.batch_pause)
+
+        table_metrics["last_deleted"] = deleted
+        table_metrics["last_seconds"] = time.perf_counter() - started
+        logger.info(f"Retention: deleted {deleted} rows from {policy.table} older than {cutoff}")
+        return deleted
+
+    def _reclaim(self, conn):
+        """Return free pages to the filesystem a few at a time (needs incremental auto-vacuum)."""
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return
+        while not self._stop.is_set():
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if free_pages == 0:
+                break
+            # The pragma frees one page per step, so it has to be stepped to completion
+            conn.execute(f"PRAGMA incremental_vacuum({self.vacuum_pages})").fetchall()
+            remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            self.metrics["pages_reclaimed"] += free_pages - remaining
+            if remaining >= free_pages:
+                break
+            time.sleep(self.batch_pause)
+
+    def run_once(self):
+        """Apply every policy once. Returns {table: rows deleted}."""
+        started = time.perf_counter()
+        self.metrics["running"] = True
+        conn = connect(self.db_path)
+        try:
+            deleted = {}
+            for policy in self.policies:
+                self.metrics["current_table"] = policy.table
+                deleted[policy.table] = self._purge(conn, policy)
+            self.metrics["current_table"] = None
+            self._reclaim(conn)
+        finally:
+            conn.close()
+            self.metrics["running"] = False
+            self.metrics["runs"] += 1
+            self.metrics["last_run_at"] = datetime.now().isoformat()
+            self.metrics["last_run_seconds"] = time.perf_counter() - started
+        return deleted
+
+    def start(self, interval=RUN_INTERVAL):
+        """Run the policies every `interval` seconds on a background thread."""
+        if self._thread is not None:
+            return self
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error(f"Retention run failed: {str(e)}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name="retention", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
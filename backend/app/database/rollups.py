@@ -0,0 +1,171 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+from backend.app.database.connection import connect
+
+# Rollup table -> (bucket length in seconds, length of the timestamp prefix that identifies a bucket, suffix)
+RESOLUTIONS = {
+    "1m": ("sensor_rollup_1m", 60, 16, ":00"),
+    "1h": ("sensor_rollup_1h", 3600, 13, ":00:00"),
+}
+DEFAULT_MAX_POINTS = 1000
+
+
+def create_rollup_tables(conn):
+    """Create the per-device minute and hour rollup tables."""
+    for table, _, _, _ in RESOLUTIONS.values():
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                device_id TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                hr_min INTEGER,
+                hr_max INTEGER,
+                hr_sum INTEGER NOT NULL DEFAULT 0,
+                hr_count INTEGER NOT NULL DEFAULT 0,
+                steps INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (device_id, bucket)
+            ) WITHOUT ROWID
+        """)
+    conn.commit()
+
+
+def _step_deltas(samples, last_steps):
+    """
+    Steps taken since the previous sample of the same device.
+
+    step_count is the watch's running total; last_steps carries the last total
+    per device across batches. A lower total means the watch reset its counter,
+    which is not counted as negative steps.
+    """
+    deltas = []
+    for _, _, step_count, _, device_id, _ in samples:
+        delta = 0
+        if step_count is not None:
+            previous = last_steps.get(device_id)
+            if previous is not None and step_count > previous:
+                delta = step_count - previous
+            last_steps[device_id] = step_count
+        deltas.append(delta)
+    return deltas
+
+
+def previous_step_counts(conn, device_ids):
+    """
+    Latest stored step total of each device, to measure a new batch's step deltas from.
+
+    Call it inside the batch's transaction, before the batch is inserted.
+    Reading it from sensor_data keeps the deltas right whichever process
+    stored the previous sample.
+    """
+    last_steps = {}
+    for device_id in device_ids:
+        row = conn.execute(
+            "SELECT step_count FROM sensor_data WHERE device_id = ? AND step_count IS NOT NULL "
+            "ORDER BY timestamp DESC, id DESC LIMIT 1", (device_id,)
+        ).fetchone()
+        if row is not None:
+            last_steps[device_id] = row[0]
+    return last_steps
+
+
+def _aggregate(samples, deltas, prefix, suffix):
+    """Fold samples into {(device_id, bucket): [hr_min, hr_max, hr_sum, hr_count, steps]}."""
+    partials = {}
+    for (timestamp, heart_rate, _, _, device_id, _), delta in zip(samples, deltas):
+        key = (device_id, timestamp[:prefix] + suffix)
+        partial = partials.get(key)
+        if partial is None:
+            partial = partials[key] = [None, None, 0, 0, 0]
+        if heart_rate:
+            partial[0] = heart_rate if partial[0] is None else min(partial[0], heart_rate)
+            partial[1] = heart_rate if partial[1] is None else max(partial[1], heart_rate)
+            partial[2] += heart_rate
+            partial[3] += 1
+        partial[4] += delta
+    return partials
+
+
+def update_rollups(conn, samples, last_steps):
+    """
+    Fold a batch of sensor_data rows into both rollup tables.
+
+    Rows are (timestamp, heart_rate, step_count, battery_level, device_id, emotion),
+    as queued by SensorDataWriter; call this inside the batch's transaction.
+    """
+    deltas = _step_deltas(samples, last_steps)
+    for table, _, prefix, suffix in RESOLUTIONS.values():
+        partials = _aggregate(samples, deltas, prefix, suffix)
+        conn.executemany(f"""
+            INSERT INTO {table} (device_id, bucket, hr_min, hr_max, hr_sum, hr_count, steps)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (device_id, bucket) DO UPDATE SET
+                hr_min = min(coalesce(hr_min, excluded.hr_min), coalesce(excluded.hr_min, hr_min)),
+                hr_max = max(coalesce(hr_max, excluded.hr_max), coalesce(excluded.hr_max, hr_max)),
+                hr_sum = hr_sum + excluded.hr_sum,
+                hr_count = hr_count + excluded.hr_count,
+                steps = steps + excluded.steps
+        """, [key + tuple(partial) for key, partial in partials.items()])
+
+
+def choose_resolution(start, end, max_points=DEFAULT_MAX_POINTS):
+    """Pick the finest rollup whose bucket count over [start, end) stays within max_points."""
+    span = (datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds()
+    for resolution, (_, seconds, _, _) in RESOLUTIONS.items():
+        if span / seconds <= max_points:
+            return resolution
+    return list(RESOLUTIONS)[-1]
+
+
+def fetch_vitals(conn, start, end, device_id=None, max_points=DEFAULT_MAX_POINTS):
+    """
+    Aggregated heart rate and steps over [start, end) from the best-fitting rollup table.
+
+    Returns (resolution, rows) with rows of
+    (device_id, bucket, hr_min, hr_max, hr_mean, hr_count, steps), oldest first.
+    """
+    resolution = choose_resolution(start, end, max_points)
+    table, _, prefix, suffix = RESOLUTIONS[resolution]
+    # Align the range start to its bucket so the first, partial bucket is included
+    params = [start[:prefix] + suffix, end]
+    device_clause = ""
+    if device_id is not None:
+        device_clause = "AND device_id = ?"
+        params.append(device_id)
+    rows = conn.execute(f"""
+        SELECT device_id, bucket, hr_min, hr_max,
+               CASE WHEN hr_count > 0 THEN 1.0 * hr_sum / hr_count END, hr_count, steps
+        FROM {table}
+        WHERE bucket >= ? AND bucket < ? {device_clause}
+        ORDER BY bucket, device_id
+    """, params).fetchall()
+    return resolution, rows
+
+
+def rebuild_rollups(conn, batch_size=50_000):
+    """Recompute both rollup tables from the raw sensor_data table (for existing databases)."""
+    create_rollup_tables(conn)
+    with conn:
+        for table, _, _, _ in RESOLUTIONS.values():
+            conn.execute(f"DELETE FROM {table}")
+
+    last_steps = {}
+    last_id = 0
+    while True:
+        rows = conn.execute("""
+            SELECT id, timestamp, heart_rate, step_count, battery_level, device_id, emotion
+            FROM sensor_data WHERE id > ? ORDER BY id LIMIT ?
+        """, (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        with conn:
+            update_rollups(conn, [row[1:] for row in rows], last_steps)
+
+
+if __name__ == "__main__":
+    db_conn = connect()
+    rebuild_rollups(db_conn)
+    db_conn.close()
+    print("Rollup tables rebuilt from sensor_data.")
@@ -0,0 +1,284 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from backend.app.database.connection import connect
+from backend.app.database.history import ensure_history_indexes
+from backend.app.database.rollups import create_rollup_tables, previous_step_counts, update_rollups
+from backend.app.services.metrics import (
+    DB_BATCH_SECONDS, DB_BATCH_SIZE, DB_QUEUE_DEPTH, DB_SAMPLES_DROPPED, DB_WRITE_ERRORS, NOTIFICATION_TO_COMMIT
+)
+
+# A sample that is already stored is skipped. The NOT EXISTS also matches NULL
+# columns (API readings have no battery level), which UNIQUE treats as distinct.
+INSERT_SENSOR_DATA = """
+    INSERT OR IGNORE INTO sensor_data
+    (timestamp, heart_rate, step_count, battery_level, device_id, emotion)
+    SELECT ?1, ?2, ?3, ?4, ?5, ?6
+    WHERE NOT EXISTS (
+        SELECT 1 FROM sensor_data
+        WHERE timestamp = ?1 AND heart_rate IS ?2 AND step_count IS ?3 AND battery_level IS ?4 AND device_id IS ?5
+    )
+"""
+
+# Matches the sample on the whole unique key, so other samples of the same second keep their label
+UPDATE_EMOTION = """
+    UPDATE sensor_data SET emotion = ?
+    WHERE timestamp = ? AND heart_rate IS ? AND step_count IS ? AND battery_level IS ? AND device_id IS ?
+"""
+
+BATCH_SIZE = 500  # Flush as soon as this many samples are waiting
+FLUSH_INTERVAL = 1.0  # Seconds; flush whatever is waiting at least this often
+MAX_QUEUE = 100_000  # Oldest samples are dropped beyond this (counted in stats)
+RETRY_MAX_DELAY = 30.0  # Seconds; cap on the backoff between failed flushes
+CLOSE_ATTEMPTS = 5  # Flushes tried on close() before the remaining samples are given up
+
+
+def is_busy(error):
+    """Whether a failed write may succeed if retried: the database was locked or busy."""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+def write_samples(conn, rows):
+    """
+    Insert sensor_data rows and fold the new ones into the rollups.
+
+    Call it inside a transaction. A row that repeats a stored sample (same
+    timestamp, values and device) is skipped and not counted again in the
+    rollups. Step deltas start from each device's latest stored total.
+    Returns the number of rows inserted.
+    """
+    last_steps = previous_step_counts(conn, {row[4] for row in rows})
+    inserted = [row for row in rows if conn.execute(INSERT_SENSOR_DATA, row).rowcount]
+    update_rollups(conn, inserted, last_steps)
+    return len(inserted)
+
+
+class SensorDataWriter:
+    """
+    Write-behind writer for the sensor_data table.
+
+    Notification handlers call submit(), which only appends to an in-memory
+    queue. A background thread owns its own SQLite connection (WAL mode) and
+    flushes the queue with executemany in one transaction per batch, either
+    when BATCH_SIZE samples are waiting or every FLUSH_INTERVAL seconds.
+    The minute/hour rollup tables are updated in the same transaction, as
+    are emotion labels that arrive after their sample (submit_emotion).
+
+    A batch whose transaction fails because the database is locked or busy
+    goes back to the front of the queue and is retried with exponential
+    backoff; samples are only lost when the queue overflows max_queue. Any
+    other error is not going to go away on a retry, so the batch is written
+    again one row at a time and the rows that still fail are dropped
+    (counted in stats["rejected"] and db_write_errors).
+    """
+
+    def __init__(self, db_path, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, max_queue=MAX_QUEUE):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = deque(maxlen=max_queue)
+        self.emotion_updates = deque(maxlen=max_queue)
+        self.stats = {
+            "submitted": 0,
+            "written": 0,
+            "emotions_updated": 0,
+            "dropped": 0,
+            "batches": 0,
+            "errors": 0,
+            "rejected": 0,
+            "max_queue_depth": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+        }
+        self._stats_lock = threading.Lock()
+        self._failures = 0
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._flush_lock = threading.Lock()
+        self._conn = None
+        self._thread = None
+        # Created on the first flush: sensor_data may not exist yet when the writer starts
+        self._indexes_ready = False
+
+    @property
+    def queue_depth(self):
+        return len(self.queue)
+
+    def start(self):
+        """Start the background flush thread."""
+        if self._thread is not None:
+            return self
+        self._stopping = False
+        self._conn = connect(self.db_path, check_same_thread=False)
+        create_rollup_tables(self._conn)
+        # Summed over every running writer
+        DB_QUEUE_DEPTH.track(self, lambda: len(self.queue))
+        self._thread = threading.Thread(target=self._run, name="sensor-data-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, timestamp, heart_rate, step_count, battery_level, device_id, emotion):
+        """
+        Queue one sample for writing. Never touches the database.
+
+        Returns the sample's key, to pass to submit_emotion() later.
+        """
+        with self._stats_lock:
+            if len(self.queue) == self.queue.maxlen:
+                self.stats["dropped"] += 1
+                DB_SAMPLES_DROPPED.inc()
+            # The queue time rides along for the notification-to-commit latency metric
+            self.queue.append((timestamp, heart_rate, step_count, battery_level, device_id, emotion,
+                               time.perf_counter()))
+            self.stats["submitted"] += 1
+            depth = len(self.queue)
+            if depth > self.stats["max_queue_depth"]:
+                self.stats["max_queue_depth"] = depth
+        # While the database is failing, the flush thread keeps to its backoff
+        if depth >= self.batch_size and not self._failures:
+            self._wakeup.set()
+        return timestamp, heart_rate, step_count, battery_level, device_id
+
+    def submit_emotion(self, sample, emotion):
+        """Queue a new emotion label for a sample submitted earlier (`sample` is what submit() returned)."""
+        self.emotion_updates.append((emotion, *sample))
+
+    def flush(self):
+        """Write everything that is currently queued. Returns the number of rows written."""
+        with self._flush_lock:
+            # Labels first: a label is only queued after its sample, so the sample is in this batch or an earlier one
+            updates = []
+            while self.emotion_updates:
+                updates.append(self.emotion_updates.popleft())
+            batch = []
+            while self.queue:
+                batch.append(self.queue.popleft())
+            if not batch and not updates:
+                return 0
+
+            if not self._indexes_ready:
+                try:
+                    ensure_history_indexes(self._conn)
+                    self._indexes_ready = True
+                except sqlite3.Error as e:
+                    print(f"Could not create the sensor_data indexes yet: {str(e)}")
+
+            started = time.perf_counter()
+            busy = False
+            try:
+                self._write(batch, updates)
+            except Exception as e:
+                with self._stats_lock:
+                    self.stats["errors"] += 1
+                DB_WRITE_ERRORS.inc()
+                if is_busy(e):
+                    self._failures += 1
+                    print(f"Database busy while flushing {len(batch)} samples, will retry: {str(e)}")
+                    self._requeue(self.emotion_updates, updates)
+                    self._requeue(self.queue, batch)
+                    return 0
+                print(f"Error while flushing {len(batch)} samples, writing them one by one: {str(e)}")
+                batch, updates, busy = self._salvage(batch, updates)
+
+            if not busy:
+                self._failures = 0
+            with self._stats_lock:
+                self.stats["emotions_updated"] += len(updates)
+            if not batch:
+                return 0
+
+            committed = time.perf_counter()
+            for item in batch:
+                NOTIFICATION_TO_COMMIT.observe(committed - item[6])
+            DB_BATCH_SIZE.observe(len(batch))
+            DB_BATCH_SECONDS.observe(committed - started)
+            with self._stats_lock:
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+                self.stats["last_batch_size"] = len(batch)
+                self.stats["last_flush_ms"] = (committed - started) * 1000
+            return len(batch)
+
+    def _write(self, batch, updates):
+        with self._conn:
+            if batch:
+                write_samples(self._conn, [item[:6] for item in batch])
+            if updates:
+                self._conn.executemany(UPDATE_EMOTION, updates)
+
+    def _salvage(self, batch, updates):
+        """
+        Write a batch that failed as a whole one row per transaction, dropping the rows that fail.
+
+        Returns (samples written, labels written, busy). If the database turns
+        busy meanwhile, the rest is requeued and retried with backoff as usual.
+        """
+        written = ([], [])
+        for queue, items, is_sample in ((self.queue, batch, True), (self.emotion_updates, updates, False)):
+            for index, item in enumerate(items):
+                try:
+                    self._write(*(([item], []) if is_sample else ([], [item])))
+                except Exception as e:
+                    if is_busy(e):
+                        self._failures += 1
+                        self._requeue(queue, items[index:])
+                        if is_sample:
+                            self._requeue(self.emotion_updates, updates)
+                        return (*written, True)
+                    print(f"Dropping {'sample' if is_sample else 'emotion label'} {item[:6]}: {str(e)}")
+                    with self._stats_lock:
+                        self.stats["rejected"] += 1
+                    DB_WRITE_ERRORS.inc()
+                    continue
+                written[0 if is_sample else 1].append(item)
+        return (*written, False)
+
+    def _requeue(self, queue, items):
+        """Put a failed batch back in front of anything queued since, dropping its oldest items on overflow."""
+        with self._stats_lock:
+            overflow = len(queue) + len(items) - queue.maxlen
+            if overflow > 0:
+                items = items[overflow:]
+                if queue is self.queue:
+                    self.stats["dropped"] += overflow
+                    DB_SAMPLES_DROPPED.inc(overflow)
+            queue.extendleft(reversed(items))
+
+    def _retry_delay(self):
+        return min(self.flush_interval * 2 ** (self._failures - 1), RETRY_MAX_DELAY)
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self._retry_delay() if self._failures else self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # flush() already dealt with its batch; keep the thread alive for the next one
+                print(f"Unexpected error in the sensor data writer: {str(e)}")
+
+    def close(self):
+        """Stop the background thread and flush whatever is left."""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+        for attempt in range(CLOSE_ATTEMPTS):
+            self.flush()
+            if not self._failures or not (self.queue or self.emotion_updates):
+                break
+            time.sleep(min(0.1 * 2 ** attempt, RETRY_MAX_DELAY))
+        if self.queue:
+            print(f"Giving up on {len(self.queue)} samples after {CLOSE_ATTEMPTS} failed flushes")
+            with self._stats_lock:
+                self.stats["dropped"] += len(self.queue)
+            DB_SAMPLES_DROPPED.inc(len(self.queue))
+            self.queue.clear()
+        self._conn.close()
+        self._conn = None
+        DB_QUEUE_DEPTH.untrack(self)
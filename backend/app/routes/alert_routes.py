@@ -0,0 +1,24 @@
+from flask import Blueprint, current_app, jsonify
+
+from backend.app.database.connection import get_connection
+
+alert_routes = Blueprint('alert_routes', __name__)
+
+
+@alert_routes.route("/api/alerts", methods=["GET"])
+def get_alerts():
+    """Fetch recent alerts from SQLite database."""
+    with get_connection(current_app.config["DB_NAME"]) as conn:
+        alerts = conn.execute(
+            "SELECT id, message, timestamp, status FROM alerts ORDER BY timestamp DESC LIMIT 10"
+        ).fetchall()
+
+    if alerts:
+        return jsonify([{
+            "id": row[0],
+            "message": row[1],
+            "timestamp": row[2],
+            "status": row[3]
+        } for row in alerts])
+
+    return jsonify([])  # Return an empty array instead of 404
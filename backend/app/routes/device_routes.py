@@ -0,0 +1,43 @@
+import logging
+
+from flask import Blueprint, current_app, jsonify, request
+
+from backend.app.services.ble_scanner import FIND_TIMEOUT
+
+device_routes = Blueprint('device_routes', __name__)
+logger = logging.getLogger(__name__)
+
+
+@device_routes.route('/scan', methods=['GET'])
+def scan_devices():
+    """
+    Return nearby smartwatches from the background scanner's cache.
+
+    `?fresh=N` only returns watches heard in the last N seconds. It does not
+    wait, except while the scanner has been running for less than N seconds.
+    """
+    watch_scanner = current_app.extensions["watch_scanner"]
+    try:
+        watch_scanner.start()
+        fresh = request.args.get("fresh")
+        if fresh is not None:
+            return jsonify(watch_scanner.fresh_devices(float(fresh)))
+        return jsonify(watch_scanner.devices())
+    except ValueError:
+        return jsonify({"error": "fresh must be a number of seconds"}), 400
+    except Exception as e:
+        logger.error(f"Scan endpoint error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@device_routes.route('/connect/<device_id>', methods=['POST'])
+def connect_device(device_id):
+    """Look the watch up on the background scanner's event loop (no event loop per request)."""
+    try:
+        device = current_app.extensions["watch_scanner"].find(device_id).result(FIND_TIMEOUT + 5)
+        if device is None:
+            return jsonify({"error": "Device not found"}), 404
+        return jsonify({"message": f"Successfully connected to {device['name']}"})
+    except Exception as e:
+        logger.error(f"Connection error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
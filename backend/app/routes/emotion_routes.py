@@ -0,0 +1,81 @@
+import logging
+from concurrent.futures import TimeoutError
+from datetime import datetime
+
+from flask import Blueprint, current_app, jsonify, request
+
+from backend.app.database.connection import get_connection
+from backend.app.services.emotion_ml import WINDOW_SAMPLES, EmotionServiceBusy
+from backend.app.services.sliding_window import WINDOW_SECONDS
+
+emotion_routes = Blueprint('emotion_routes', __name__)
+logger = logging.getLogger(__name__)
+
+RESULT_TIMEOUT = 1.0  # seconds to wait for the batcher before giving up
+
+
+def carry_steps_forward(step_counts):
+    """
+    Step totals with each missing (NULL) one replaced by the previous total.
+
+    Leading gaps take the first known total, so they add no steps; a NULL
+    read as 0 would turn the next total into a burst of cadence.
+    """
+    total = next((count for count in step_counts if count is not None), 0)
+    filled = []
+    for count in step_counts:
+        if count is not None:
+            total = count
+        filled.append(total)
+    return filled
+
+
+@emotion_routes.route('/emotion/<device_id>', methods=['GET', 'POST'])
+def device_emotion(device_id):
+    """
+    Classify a watch's latest readings with the emotion model.
+
+    Uses the readings of the last 30 seconds before the newest one and
+    returns the label with the class probabilities and the window features.
+    GET only reads; POST also stores the label in the newest reading's
+    emotion column.
+    """
+    db_path = current_app.config["DB_NAME"]
+    with get_connection(db_path) as conn:
+        rows = conn.execute("""
+            SELECT id, timestamp, heart_rate, step_count FROM sensor_data
+            WHERE device_id = ? AND heart_rate IS NOT NULL
+            ORDER BY timestamp DESC, id DESC LIMIT ?
+        """, (device_id, WINDOW_SAMPLES)).fetchall()
+    if not rows:
+        return jsonify({"error": "No readings for this device"}), 404
+
+    rows.reverse()
+    times = [datetime.strptime(row[1], '%Y-%m-%d %H:%M:%S').timestamp() for row in rows]
+    newest = times[-1]
+    first = next(i for i, t in enumerate(times) if t >= newest - WINDOW_SECONDS)
+    rows, times = rows[first:], times[first:]
+
+    emotion_service = current_app.extensions["emotion_service"]
+    try:
+        emotion_service.start()
+        prediction = emotion_service.submit(times, [row[2] for row in rows],
+                                            carry_steps_forward([row[3] for row in rows])).result(RESULT_TIMEOUT)
+    except (EmotionServiceBusy, TimeoutError):
+        return jsonify({"error": "Emotion model is overloaded, try again"}), 503
+
+    if request.method == 'POST':
+        with get_connection(db_path) as conn:
+            conn.execute("UPDATE sensor_data SET emotion = ? WHERE id = ?", (prediction.label, rows[-1][0]))
+            conn.commit()
+
+    return jsonify({
+        "device_id": device_id,
+        "timestamp": rows[-1][1],
+        "samples": len(rows),
+        "emotion": prediction.label,
+        "stored": request.method == 'POST',
+        "confidence": round(prediction.confidence, 3),
+        "probabilities": {label: round(p, 3) for label, p in prediction.probabilities.items()},
+        "features": {name: round(value, 2) for name, value in prediction.features.items()},
+    })
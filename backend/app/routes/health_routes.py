@@ -1,5 +1,7 @@
-from flask import Blueprint, request, jsonify
-from app.services.drastic_change import detect_drastic_change
+from flask import Blueprint, current_app, request, jsonify
+from backend.app.services.draastic_changes import detect_drastic_change
+from backend.app.services.health_batch import BatchFormatError, check_batch, iter_json_objects, store_batch
+from backend.app.database.connection import get_connection
 
 health_routes = Blueprint('health_routes', __name__)
 
@@ -9,10 +11,13 @@ def check_health():
     Endpoint to receive smartwatch data and detect drastic changes.
     Expected JSON format:
     {
+        "device_id": "FB:D8:57:5B:04:32",
         "heart_rate": 110,
         "steps": 4800,
         "spo2": 96
     }
+
+    device_id is optional (or ?device_id=); readings without one share the "default" device.
     """
     data = request.json
 
@@ -20,12 +25,36 @@ def check_health():
     current_heart_rate = data.get("heart_rate")
     current_steps = data.get("steps")
     current_spo2 = data.get("spo2")
+    device_id = data.get("device_id") or request.args.get("device_id", "default")
 
     # Validate input
     if current_heart_rate is None or current_steps is None or current_spo2 is None:
         return jsonify({"error": "Missing health data"}), 400
 
     # Detect drastic changes
-    result = detect_drastic_change(current_heart_rate, current_steps, current_spo2)
+    result = detect_drastic_change(current_heart_rate, current_steps, current_spo2, device_id=device_id)
+
+    return jsonify({"device_id": device_id, "message": result})
+
+@health_routes.route('/check_health/batch', methods=['POST'])
+def check_health_batch():
+    """
+    Bulk version of /check_health for gateways that buffer readings.
+
+    The body is either a JSON array of readings or newline-delimited JSON
+    (one reading per line, Content-Type: application/x-ndjson); it is parsed
+    as it streams in. Readings are checked in order, per device, and every
+    valid one is stored in sensor_data in a single transaction; the devices'
+    previous readings only move once it has committed. Each reading
+    may carry a "timestamp" (ISO-8601); otherwise the time of upload is used.
+    """
+    try:
+        rows, summary, pending = check_batch(iter_json_objects(request.stream))
+    except BatchFormatError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Only borrow a connection once the whole body has been read
+    with get_connection(current_app.config["DB_NAME"]) as conn:
+        store_batch(conn, rows, pending)
 
-    return jsonify({"message": result})
+    return jsonify(summary)
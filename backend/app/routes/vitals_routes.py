@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+
+import pytz
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+
+from backend.app.database.connection import get_connection
+from backend.app.database.export import CHUNK_SIZE, CONTENT_TYPES, EXTENSIONS, ExportFormatError, stream_export
+from backend.app.database.history import DEFAULT_LIMIT, ensure_history_indexes, fetch_history, parse_timestamp
+from backend.app.database.rollups import DEFAULT_MAX_POINTS, create_rollup_tables, fetch_vitals
+from backend.app.services.live_stream import parse_event_id
+
+vitals_routes = Blueprint('vitals_routes', __name__)
+
+IST = pytz.timezone('Asia/Kolkata')  # sensor_data timestamps are stored in IST
+
+# Database paths whose history indexes and rollup tables are known to exist
+_history_indexes_ready = set()
+_rollup_tables_ready = set()
+
+
+@vitals_routes.route('/history', methods=['GET'])
+def get_sensor_data():
+    """
+    Fetch sensor readings, newest first.
+
+    Query parameters (all optional):
+        device_id: only readings from this watch
+        from, to: ISO-8601 time range, `from` inclusive and `to` exclusive
+        limit: page size (default 500)
+        cursor: value of the X-Next-Cursor header from the previous page
+    """
+    try:
+        start = request.args.get("from")
+        end = request.args.get("to")
+        start = parse_timestamp(start) if start else None
+        end = parse_timestamp(end) if end else None
+        limit = int(request.args.get("limit", DEFAULT_LIMIT))
+        cursor = request.args.get("cursor")
+        device_id = request.args.get("device_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    db_path = current_app.config["DB_NAME"]
+    try:
+        with get_connection(db_path) as conn:
+            if db_path not in _history_indexes_ready:
+                ensure_history_indexes(conn)
+                _history_indexes_ready.add(db_path)
+            data, next_cursor = fetch_history(conn, device_id, start, end, cursor, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if data or cursor:
+        response = jsonify([{
+            "timestamp": row[1],
+            "heart_rate": row[2],
+            "step_count": row[3],
+            "battery_level": row[4],
+            "device_id": row[5],
+            "emotion" : row[6]
+        } for row in data])
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response
+    return jsonify({"message": "No data found"}), 404
+
+
+@vitals_routes.route('/vitals', methods=['GET'])
+def get_vitals():
+    """
+    Aggregated heart rate (min/max/mean/count) and steps for charts.
+
+    Query parameters: device_id (optional), from/to (ISO-8601, default: last
+    24 hours) and max_points (default 1000). Reads the minute rollup when it
+    fits in max_points and the hour rollup otherwise.
+    """
+    try:
+        end = request.args.get("to")
+        end = parse_timestamp(end) if end else datetime.now(IST).strftime('%Y-%m-%d %H:%M:%S')
+        start = request.args.get("from")
+        start = parse_timestamp(start) if start else \
+            (datetime.fromisoformat(end) - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+        max_points = int(request.args.get("max_points", DEFAULT_MAX_POINTS))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    db_path = current_app.config["DB_NAME"]
+    with get_connection(db_path) as conn:
+        if db_path not in _rollup_tables_ready:
+            create_rollup_tables(conn)
+            _rollup_tables_ready.add(db_path)
+        resolution, rows = fetch_vitals(conn, start, end, request.args.get("device_id"), max(1, max_points))
+
+    return jsonify({
+        "resolution": resolution,
+        "points": [{
+            "device_id": row[0],
+            "bucket": row[1],
+            "hr_min": row[2],
+            "hr_max": row[3],
+            "hr_mean": row[4],
+            "hr_count": row[5],
+            "steps": row[6],
+        } for row in rows]
+    })
+
+
+@vitals_routes.route('/export', methods=['GET'])
+def export_sensor_data():
+    """
+    Stream sensor readings, oldest first, as a file download.
+
+    Query parameters (all optional):
+        format: csv (default), parquet or arrow (Arrow IPC stream); the last two need pyarrow
+        device_id: only readings from this watch
+        from, to: ISO-8601 time range, `from` inclusive and `to` exclusive
+        chunk_size: rows read and sent at a time (default 10000)
+    """
+    try:
+        export_format = request.args.get("format", "csv")
+        start = request.args.get("from")
+        end = request.args.get("to")
+        start = parse_timestamp(start) if start else None
+        end = parse_timestamp(end) if end else None
+        chunk_size = int(request.args.get("chunk_size", CHUNK_SIZE))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    db_path = current_app.config["DB_NAME"]
+    if db_path not in _history_indexes_ready:
+        with get_connection(db_path) as conn:
+            ensure_history_indexes(conn)
+        _history_indexes_ready.add(db_path)
+    try:
+        body = stream_export(db_path, export_format, request.args.get("device_id"), start, end, chunk_size)
+    except ExportFormatError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return Response(body, content_type=CONTENT_TYPES[export_format], headers={
+        "Content-Disposition": f'attachment; filename="sensor_data.{EXTENSIONS[export_format]}"',
+        "X-Accel-Buffering": "no",
+    })
+
+
+@vitals_routes.route("/stream", methods=["GET"])
+def stream_updates():
+    """
+    Server-Sent Events stream of new sensor readings ("vitals"), alerts ("alert")
+    and alert status changes ("alert_status").
+
+    Optional `device_id` limits vitals to one watch. Reconnecting clients send
+    the Last-Event-ID header (or `last_event_id` parameter) to resume.
+
+    Under WSGI every client holds a worker thread; the ASGI server
+    (backend/app/asgi.py) serves this endpoint on its event loop instead.
+    """
+    device_id = request.args.get("device_id")
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    if last_event_id:
+        try:
+            parse_event_id(last_event_id)
+        except ValueError:
+            return jsonify({"error": f"Invalid event id: {last_event_id}"}), 400
+
+    return Response(
+        stream_with_context(current_app.extensions["live_feed"].stream(device_id, last_event_id)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
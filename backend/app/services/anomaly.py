@@ -0,0 +1,222 @@
+import logging
+import math
+import sqlite3
+import threading
+import time
+
+from backend.app.database.connection import connect, get_connection
+
+logger = logging.getLogger(__name__)
+
+HALF_LIFE = 1800.0  # seconds after which a sample's weight in the baseline has halved
+WARMUP_SAMPLES = 120  # samples a device needs before it is scored
+MAX_GAP = 10.0  # seconds; a longer gap is neither a rate of change nor extra baseline weight
+CLAMP_Z = 3.0  # an excursion moves the baseline as if it were only this many deviations out
+CHECKPOINT_INTERVAL = 60.0  # seconds between writes of changed baselines
+# Standard deviation floors, so a very steady baseline does not turn noise into huge z-scores
+MIN_HEART_RATE_STD = 3.0  # BPM
+MIN_JUMP_STD = 0.5  # BPM per second
+MIN_CADENCE_STD = 5.0  # steps per minute
+
+COLUMNS = ("hr_mean", "hr_var", "jump_mean", "jump_var", "cadence_mean", "cadence_var",
+           "samples", "last_heart_rate", "last_steps", "last_time")
+
+
+def create_baseline_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS anomaly_baselines (
+            device_id TEXT PRIMARY KEY,
+            hr_mean REAL, hr_var REAL,
+            jump_mean REAL, jump_var REAL,
+            cadence_mean REAL, cadence_var REAL,
+            samples INTEGER NOT NULL,
+            last_heart_rate REAL, last_steps INTEGER, last_time REAL
+        ) WITHOUT ROWID
+    """)
+    conn.commit()
+
+
+class Baseline:
+    """
+    Exponentially weighted mean and variance of one device's heart rate,
+    heart rate change per second ("jump") and step cadence, plus the last
+    sample. A fixed few dozen bytes per device, however long it runs.
+    """
+
+    __slots__ = COLUMNS
+
+    def __init__(self, hr_mean=None, hr_var=0.0, jump_mean=None, jump_var=0.0, cadence_mean=None,
+                 cadence_var=0.0, samples=0, last_heart_rate=None, last_steps=None, last_time=None):
+        self.hr_mean = hr_mean
+        self.hr_var = hr_var
+        self.jump_mean = jump_mean
+        self.jump_var = jump_var
+        self.cadence_mean = cadence_mean
+        self.cadence_var = cadence_var
+        self.samples = samples
+        self.last_heart_rate = last_heart_rate
+        self.last_steps = last_steps
+        self.last_time = last_time
+
+    def row(self, device_id):
+        return (device_id, *(getattr(self, column) for column in COLUMNS))
+
+
+def _update(mean, var, value, alpha, min_std):
+    """(z-score of value against the baseline, new mean, new variance)"""
+    if mean is None:
+        return None, value, 0.0
+    std = math.sqrt(var)
+    if std < min_std:
+        std = min_std
+    z = (value - mean) / std
+    # Winsorize, so one excursion cannot drag the baseline along with it
+    if z > CLAMP_Z:
+        value = mean + CLAMP_Z * std
+    elif z < -CLAMP_Z:
+        value = mean - CLAMP_Z * std
+    diff = value - mean
+    increment = alpha * diff
+    return z, mean + increment, (1 - alpha) * (var + diff * increment)
+
+
+class AnomalyDetector:
+    """
+    Per-device anomaly scores from exponentially weighted baselines.
+
+    observe() scores each sample against the device's own history: z-scores
+    of the heart rate, of how fast it changed since the previous sample and
+    of the step cadence, then folds the sample into the baseline. It is O(1)
+    in time and memory per device; what counts as an excursion is decided by
+    the *_z rules in the rule file. Baselines of devices that changed are
+    written to the anomaly_baselines table every CHECKPOINT_INTERVAL seconds
+    and on close(), and loaded again by start(), so a restart does not send
+    every wearer back through the warm-up.
+    """
+
+    def __init__(self, db_path=None, half_life=HALF_LIFE, warmup=WARMUP_SAMPLES,
+                 checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.db_path = db_path
+        self.decay = math.log(2) / half_life
+        self.warmup = warmup
+        self.checkpoint_interval = checkpoint_interval
+        self.baselines = {}
+        self.stats = {"observed": 0, "restored": 0, "checkpoints": 0, "written": 0}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Load the saved baselines and start the checkpoint thread (no-op without a database)."""
+        if self.db_path is None or self._thread is not None:
+            return self
+        with get_connection(self.db_path) as conn:
+            create_baseline_table(conn)
+            self.load(conn)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="anomaly-checkpoint", daemon=True)
+        self._thread.start()
+        return self
+
+    def observe(self, device_id, heart_rate, steps=None, now=None, scores=None):
+        """
+        Score one sample and add it to the device's baseline.
+
+        Writes heart_rate_z, heart_rate_jump_z and cadence_z into scores (a
+        new dict if None) as far as they are known yet, and returns it.
+        """
+        now = time.time() if now is None else now
+        scores = {} if scores is None else scores
+        with self._lock:
+            self.stats["observed"] += 1
+            baseline = self.baselines.get(device_id)
+            if baseline is None:
+                baseline = self.baselines[device_id] = Baseline()
+            self._dirty.add(device_id)
+
+            elapsed = now - baseline.last_time if baseline.last_time is not None else None
+            if elapsed is not None and not 0 < elapsed <= MAX_GAP:
+                elapsed = None
+            # Weight of this sample: longer since the previous one means more decay of the old baseline.
+            # Until the baseline is warm it is a plain running average, so the first samples count fully.
+            alpha = 1 - math.exp(-self.decay * (elapsed if elapsed is not None else 1.0))
+            warm = baseline.samples >= self.warmup
+            if not warm:
+                alpha = max(alpha, 1 / (baseline.samples + 1))
+
+            z, baseline.hr_mean, baseline.hr_var = _update(
+                baseline.hr_mean, baseline.hr_var, heart_rate, alpha, MIN_HEART_RATE_STD)
+            if warm and z is not None:
+                scores["heart_rate_z"] = round(z, 2)
+
+            if elapsed is not None and baseline.last_heart_rate is not None:
+                jump = abs(heart_rate - baseline.last_heart_rate) / elapsed
+                z, baseline.jump_mean, baseline.jump_var = _update(
+                    baseline.jump_mean, baseline.jump_var, jump, alpha, MIN_JUMP_STD)
+                if warm and z is not None:
+                    scores["heart_rate_jump_z"] = round(z, 2)
+
+            # step_count is a running total; a lower total means the counter was reset
+            if (elapsed is not None and steps is not None and baseline.last_steps is not None
+                    and steps >= baseline.last_steps):
+                cadence = (steps - baseline.last_steps) * 60 / elapsed
+                z, baseline.cadence_mean, baseline.cadence_var = _update(
+                    baseline.cadence_mean, baseline.cadence_var, cadence, alpha, MIN_CADENCE_STD)
+                if warm and z is not None:
+                    scores["cadence_z"] = round(z, 2)
+
+            baseline.samples += 1
+            baseline.last_heart_rate = heart_rate
+            if steps is not None:
+                baseline.last_steps = steps
+            baseline.last_time = now
+        return scores
+
+    def load(self, conn):
+        """Replace the in-memory baselines with the saved ones. Returns how many were loaded."""
+        rows = conn.execute(f"SELECT device_id, {', '.join(COLUMNS)} FROM anomaly_baselines").fetchall()
+        with self._lock:
+            self.baselines = {row[0]: Baseline(*row[1:]) for row in rows}
+            self._dirty.clear()
+        self.stats["restored"] = len(rows)
+        return len(rows)
+
+    def checkpoint(self, conn):
+        """Write the baselines that changed since the last checkpoint. Returns the number written."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            rows = [self.baselines[device_id].row(device_id) for device_id in dirty]
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" * (len(COLUMNS) + 1))
+        try:
+            with conn:
+                conn.executemany(f"INSERT OR REPLACE INTO anomaly_baselines VALUES ({placeholders})", rows)
+        except sqlite3.Error:
+            with self._lock:
+                self._dirty |= dirty
+            raise
+        self.stats["checkpoints"] += 1
+        self.stats["written"] += len(rows)
+        return len(rows)
+
+    def _run(self):
+        conn = connect(self.db_path, check_same_thread=False)
+        try:
+            while not self._stop.wait(self.checkpoint_interval):
+                try:
+                    self.checkpoint(conn)
+                except sqlite3.Error as e:
+                    logger.warning(f"Anomaly baseline checkpoint failed, retrying later: {e}")
+            self.checkpoint(conn)
+        finally:
+            conn.close()
+
+    def close(self):
+        """Stop the checkpoint thread after a final checkpoint."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
@@ -0,0 +1,193 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+
+from bleak import BleakScanner
+
+logger = logging.getLogger(__name__)
+
+# Common smartwatch service UUIDs
+WATCH_SERVICES = {
+    "0000180d-0000-1000-8000-00805f9b34fb",  # Heart Rate Service
+    "0000180f-0000-1000-8000-00805f9b34fb",  # Battery Service
+    "0000181c-0000-1000-8000-00805f9b34fb",  # User Data Service
+    "0000181e-0000-1000-8000-00805f9b34fb",  # Step Counter
+}
+WATCH_KEYWORDS = ['watch', 'band', 'mi', 'honor', 'fitbit', 'galaxy']
+
+DEVICE_TTL = 30  # seconds a device stays listed after its last advertisement
+RSSI_SMOOTHING = 0.3  # weight of the newest RSSI reading in the moving average
+MAX_FRESH_WAIT = 10  # upper bound for /scan?fresh=
+RESTART_DELAY = 5  # seconds before restarting a failed scanner
+FIND_TIMEOUT = 10  # seconds to look for a device that is not in the table
+
+
+def is_smartwatch(name, service_uuids=()):
+    """Check if an advertisement looks like a smartwatch (by name keyword or advertised service)."""
+    if name and any(keyword in name.lower() for keyword in WATCH_KEYWORDS):
+        return True
+    return any(uuid.lower() in WATCH_SERVICES for uuid in service_uuids)
+
+
+class BackgroundWatchScanner:
+    """
+    Long-lived BLE scanner that keeps a table of nearby smartwatches.
+
+    Scanning runs continuously on its own thread and event loop. Each
+    advertisement updates the device's smoothed RSSI and last-seen time;
+    devices not heard from for DEVICE_TTL seconds are evicted. Readers get
+    the cached table immediately instead of waiting for a scan.
+
+    Other BLE work (e.g. looking up a device for /connect) is submitted to
+    the same loop, so requests never create an event loop of their own.
+    """
+
+    def __init__(self, ttl=DEVICE_TTL, smoothing=RSSI_SMOOTHING):
+        self.ttl = ttl
+        self.smoothing = smoothing
+        self.table = {}
+        self.started_at = None
+        self.last_error = None
+        self.loop = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._loop_ready = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self.started_at = time.monotonic()
+                self._thread = threading.Thread(target=self._run, name="ble-scanner", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._loop_ready.set()
+        self.loop.run_until_complete(self._scan_forever())
+
+    def submit(self, coro):
+        """Run a coroutine on the scanner's event loop. Returns a concurrent.futures.Future."""
+        self.start()
+        self._loop_ready.wait()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def _scan_forever(self):
+        while True:
+            try:
+                scanner = BleakScanner(detection_callback=self._on_advertisement)
+                await scanner.start()
+                self.last_error = None
+                try:
+                    while True:
+                        await asyncio.sleep(1)
+                        self._evict()
+                finally:
+                    await scanner.stop()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Background scan error: {str(e)}")
+                await asyncio.sleep(RESTART_DELAY)
+
+    def _on_advertisement(self, device, advertisement_data):
+        name = device.name or advertisement_data.local_name
+        if not is_smartwatch(name, advertisement_data.service_uuids):
+            return
+        now = time.monotonic()
+        rssi = advertisement_data.rssi
+        with self._lock:
+            entry = self.table.get(device.address)
+            if entry is None:
+                self.table[device.address] = {
+                    "id": device.address,
+                    "name": name or "Unknown Watch",
+                    "rssi": rssi,
+                    "last_seen": now,
+                }
+            else:
+                entry["rssi"] = round(self.smoothing * rssi + (1 - self.smoothing) * entry["rssi"], 1)
+                entry["last_seen"] = now
+                if name:
+                    entry["name"] = name
+
+    def _evict(self):
+        cutoff = time.monotonic() - self.ttl
+        with self._lock:
+            for address in [a for a, entry in self.table.items() if entry["last_seen"] < cutoff]:
+                del self.table[address]
+
+    def devices(self, max_age=None):
+        """
+        Cached smartwatches, strongest signal first.
+
+        max_age limits the result to devices heard in the last `max_age` seconds.
+        """
+        now = time.monotonic()
+        max_age = self.ttl if max_age is None else min(max_age, self.ttl)
+        with self._lock:
+            entries = [entry for entry in self.table.values() if now - entry["last_seen"] <= max_age]
+            result = [{
+                "id": entry["id"],
+                "name": entry["name"],
+                "rssi": entry["rssi"],
+                "age": round(now - entry["last_seen"], 1),
+            } for entry in entries]
+        return sorted(result, key=lambda d: d["rssi"], reverse=True)
+
+    def _fresh_wait(self, seconds):
+        """
+        Clamp `seconds` to MAX_FRESH_WAIT; return it with how long the scanner
+        still has to run before it has listened for that long.
+
+        The scan is continuous, so this is only non-zero right after start().
+        """
+        seconds = max(0.0, min(float(seconds), MAX_FRESH_WAIT))
+        self.start()
+        return seconds, max(0.0, self.started_at + seconds - time.monotonic())
+
+    def fresh_devices(self, seconds):
+        """
+        Devices heard in the last `seconds` (capped at MAX_FRESH_WAIT).
+
+        Answers from the table without waiting, except until the scanner has
+        been running for `seconds`.
+        """
+        seconds, wait = self._fresh_wait(seconds)
+        if wait:
+            time.sleep(wait)
+        return self.devices(max_age=seconds)
+
+    async def fresh_devices_async(self, seconds):
+        """fresh_devices() for callers on an event loop."""
+        seconds, wait = self._fresh_wait(seconds)
+        if wait:
+            await asyncio.sleep(wait)
+        return self.devices(max_age=seconds)
+
+    def find(self, address, timeout=FIND_TIMEOUT):
+        """
+        Look up a device by address: from the table if it was heard recently,
+        otherwise with a targeted scan on the scanner's loop. Returns a
+        concurrent.futures.Future of {"id", "name"}, or None if not found.
+        """
+        entry = self.get(address)
+        if entry is not None:
+            future = concurrent.futures.Future()
+            future.set_result({"id": entry["id"], "name": entry["name"]})
+            return future
+        return self.submit(self._find_device(address, timeout))
+
+    @staticmethod
+    async def _find_device(address, timeout):
+        device = await BleakScanner.find_device_by_address(address, timeout=timeout)
+        if device is None:
+            return None
+        return {"id": device.address, "name": device.name or "Unknown Watch"}
+
+    def get(self, address):
+        with self._lock:
+            entry = self.table.get(address)
+            return dict(entry) if entry is not None else None
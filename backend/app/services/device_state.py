@@ -0,0 +1,90 @@
+import threading
+import time
+
+SHARDS = 64  # independent locks; concurrent workers only contend on the same shard
+IDLE_TTL = 3600  # seconds before a silent device's state is forgotten
+SWEEP_INTERVAL = 60  # seconds between idle sweeps of a shard
+
+
+class DeviceRecord:
+    """Last reading of one device. __slots__ keeps it to a few dozen bytes."""
+
+    __slots__ = ("heart_rate", "steps", "spo2", "timestamp")
+
+    def __init__(self, heart_rate, steps, spo2, timestamp):
+        self.heart_rate = heart_rate
+        self.steps = steps
+        self.spo2 = spo2
+        self.timestamp = timestamp
+
+
+class _Shard:
+    __slots__ = ("lock", "records", "last_sweep", "evicted")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = {}
+        self.last_sweep = time.monotonic()
+        # Counted per shard, under the shard's lock
+        self.evicted = 0
+
+
+class DeviceStateStore:
+    """
+    Per-device previous readings for drastic change detection.
+
+    Devices are spread over SHARDS dicts, each with its own lock, so Flask
+    worker threads handling different devices rarely wait on each other.
+    Each shard forgets devices idle for longer than idle_ttl, checked at
+    most every SWEEP_INTERVAL seconds while it is being written to.
+    """
+
+    def __init__(self, shards=SHARDS, idle_ttl=IDLE_TTL, sweep_interval=SWEEP_INTERVAL):
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self.shards = [_Shard() for _ in range(shards)]
+
+    def __len__(self):
+        return sum(len(shard.records) for shard in self.shards)
+
+    @property
+    def evicted(self):
+        """Devices forgotten for being idle since the store was created."""
+        return sum(shard.evicted for shard in self.shards)
+
+    def _shard(self, device_id):
+        return self.shards[hash(device_id) % len(self.shards)]
+
+    def get(self, device_id):
+        shard = self._shard(device_id)
+        with shard.lock:
+            return shard.records.get(device_id)
+
+    def swap(self, device_id, heart_rate, steps, spo2, now=None):
+        """Store a device's new reading and return the previous record (None for a new device)."""
+        now = time.monotonic() if now is None else now
+        shard = self._shard(device_id)
+        with shard.lock:
+            previous = shard.records.get(device_id)
+            shard.records[device_id] = DeviceRecord(heart_rate, steps, spo2, now)
+            if now - shard.last_sweep >= self.sweep_interval:
+                self._sweep(shard, now)
+        return previous
+
+    def _sweep(self, shard, now):
+        cutoff = now - self.idle_ttl
+        idle = [device_id for device_id, record in shard.records.items() if record.timestamp < cutoff]
+        for device_id in idle:
+            del shard.records[device_id]
+        shard.evicted += len(idle)
+        shard.last_sweep = now
+        return len(idle)
+
+    def evict_idle(self, now=None):
+        """Forget every device idle for longer than idle_ttl. Returns how many were removed."""
+        now = time.monotonic() if now is None else now
+        removed = 0
+        for shard in self.shards:
+            with shard.lock:
+                removed += self._sweep(shard, now)
+        return removed
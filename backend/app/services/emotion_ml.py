@@ -0,0 +1,257 @@
+"""
+Emotion model served with micro-batching.
+
+Requests from many devices (a window of recent heart rate and step samples
+each) are collected for at most MAX_WAIT seconds or MAX_BATCH requests and
+then classified together: features for the whole batch are computed with a
+few NumPy operations over a (batch, WINDOW_SAMPLES) array, followed by one
+matrix product with the model. The per-request cost of the Python overhead
+is shared by the batch, so throughput rises with load while the added
+latency stays bounded by MAX_WAIT plus one batch.
+
+The model is a softmax regression over standardized window features, read
+once from config.EMOTION_MODEL_FILE (see scripts/train_emotion_model.py).
+"""
+import json
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future
+
+import numpy as np
+
+from backend.app.config import EMOTION_MODEL_FILE
+from backend.app.services.metrics import EMOTION_BATCH_SIZE, EMOTION_LATENCY_SECONDS
+
+WINDOW_SAMPLES = 64  # newest samples of a window used for the features
+MAX_BATCH = 256  # requests classified together at most
+MAX_WAIT = 0.003  # seconds the first request of a batch waits for more to arrive
+MAX_PENDING = 2048  # requests waiting beyond this are refused, which bounds the queueing delay
+
+FEATURES = ("hr_mean", "hr_std", "hr_min", "hr_max", "hr_slope", "rmssd", "cadence")
+
+Prediction = namedtuple("Prediction", ["label", "confidence", "probabilities", "features"])
+
+
+class EmotionServiceBusy(RuntimeError):
+    """More than max_pending requests are waiting; the caller should keep its rule-based label."""
+
+
+def pack_windows(windows, size=WINDOW_SAMPLES):
+    """
+    (times, heart_rates, steps) arrays of shape (len(windows), size).
+
+    Each window is (times, heart_rates, steps) sequences, oldest first; only
+    the newest `size` samples are kept, right-aligned, with NaN padding on
+    the left.
+    """
+    shape = (len(windows), size)
+    times = np.full(shape, np.nan)
+    heart_rates = np.full(shape, np.nan)
+    steps = np.full(shape, np.nan)
+    for row, (window_times, window_heart_rates, window_steps) in enumerate(windows):
+        count = min(len(window_heart_rates), size)
+        if count:
+            times[row, size - count:] = window_times[-count:]
+            heart_rates[row, size - count:] = window_heart_rates[-count:]
+            steps[row, size - count:] = window_steps[-count:]
+    return times, heart_rates, steps
+
+
+def window_features(times, heart_rates, steps):
+    """
+    Feature matrix (batch, len(FEATURES)) from packed windows.
+
+    hr_slope is BPM per second (least squares), rmssd the root mean square
+    of successive differences of the beat intervals implied by the heart
+    rate (ms), cadence steps per minute over the window. Every window needs
+    at least one sample.
+    """
+    valid = ~np.isnan(heart_rates)
+    count = valid.sum(axis=1)
+    hr = np.where(valid, heart_rates, 0.0)
+    hr_mean = hr.sum(axis=1) / count
+    centered = np.where(valid, heart_rates - hr_mean[:, None], 0.0)
+    hr_std = np.sqrt((centered * centered).sum(axis=1) / count)
+    hr_min = np.where(valid, heart_rates, np.inf).min(axis=1)
+    hr_max = np.where(valid, heart_rates, -np.inf).max(axis=1)
+
+    # Times relative to the newest sample keep the sums small
+    t = np.where(valid, times - times[:, -1:], 0.0)
+    t_mean = t.sum(axis=1) / count
+    t_centered = np.where(valid, t - t_mean[:, None], 0.0)
+    t_var = (t_centered * t_centered).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hr_slope = np.where(t_var > 1e-9, (t_centered * centered).sum(axis=1) / t_var, 0.0)
+
+    intervals = 60_000.0 / np.where(valid, heart_rates, np.nan)
+    successive = np.diff(intervals, axis=1)
+    pairs = ~np.isnan(successive)
+    pair_count = pairs.sum(axis=1)
+    squares = np.where(pairs, successive * successive, 0.0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rmssd = np.where(pair_count > 0, np.sqrt(squares / pair_count), 0.0)
+
+    # Windows are right-aligned, so the oldest sample is at size - count
+    first = (heart_rates.shape[1] - count)[:, None]
+    elapsed = times[:, -1] - np.take_along_axis(times, first, axis=1)[:, 0]
+    walked = steps[:, -1] - np.take_along_axis(steps, first, axis=1)[:, 0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # A lower step total means the counter was reset; count no steps rather than negative ones
+        cadence = np.where(elapsed > 0, np.maximum(walked, 0.0) * 60.0 / elapsed, 0.0)
+    cadence = np.nan_to_num(cadence)
+
+    return np.column_stack([hr_mean, hr_std, hr_min, hr_max, hr_slope, rmssd, cadence])
+
+
+class EmotionModel:
+    """Softmax regression over standardized window features."""
+
+    def __init__(self, labels, features, mean, scale, weights, bias):
+        if tuple(features) != FEATURES:
+            raise ValueError(f"Model expects features {features}, this service computes {FEATURES}")
+        self.labels = list(labels)
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.weights = np.asarray(weights, dtype=float)
+        self.bias = np.asarray(bias, dtype=float)
+
+    @classmethod
+    def load(cls, path=EMOTION_MODEL_FILE):
+        with open(path, encoding="utf-8") as f:
+            spec = json.load(f)
+        return cls(spec["labels"], spec["features"], spec["mean"], spec["scale"], spec["weights"], spec["bias"])
+
+    def to_dict(self):
+        return {"labels": self.labels, "features": list(FEATURES), "mean": self.mean.tolist(),
+                "scale": self.scale.tolist(), "weights": self.weights.tolist(), "bias": self.bias.tolist()}
+
+    def predict_proba(self, features):
+        logits = ((features - self.mean) / self.scale) @ self.weights + self.bias
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+class _Request:
+    __slots__ = ("window", "future", "submitted")
+
+    def __init__(self, window):
+        self.window = window
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+class EmotionService:
+    """
+    Micro-batching front of an EmotionModel.
+
+    submit() queues one window and returns a concurrent Future of its
+    Prediction; it never blocks. A single worker thread classifies queued
+    windows in batches. classify() runs one window inline, without batching.
+    """
+
+    def __init__(self, model=None, max_batch=MAX_BATCH, max_wait=MAX_WAIT, max_pending=MAX_PENDING):
+        self._model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self.stats = {"requests": 0, "batches": 0, "refused": 0, "max_batch": 0}
+        self._pending = deque()
+        self._ready = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    @property
+    def model(self):
+        # Loaded on first use, so importing the service costs nothing
+        if self._model is None:
+            self._model = EmotionModel.load()
+        return self._model
+
+    def start(self):
+        with self._ready:
+            if self._thread is not None:
+                return self
+            self.model
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="emotion-batcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, times, heart_rates, steps):
+        """Queue a window (oldest sample first) for classification. Raises EmotionServiceBusy when full."""
+        if not len(heart_rates):
+            raise ValueError("A window needs at least one sample")
+        request = _Request((times, heart_rates, steps))
+        with self._ready:
+            if len(self._pending) >= self.max_pending:
+                self.stats["refused"] += 1
+                raise EmotionServiceBusy(f"{len(self._pending)} emotion requests pending")
+            self._pending.append(request)
+            self.stats["requests"] += 1
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._ready.notify()
+        return request.future
+
+    def classify(self, times, heart_rates, steps):
+        """Classify one window on the calling thread."""
+        return self.classify_batch([(times, heart_rates, steps)])[0]
+
+    def classify_batch(self, windows):
+        """Predictions for many windows in one vectorized pass."""
+        features = window_features(*pack_windows(windows))
+        probabilities = self.model.predict_proba(features)
+        best = probabilities.argmax(axis=1).tolist()
+        labels = self.model.labels
+        # One tolist() per batch rather than per row
+        return [
+            Prediction(labels[index], row[index], dict(zip(labels, row)), dict(zip(FEATURES, feature_row)))
+            for index, row, feature_row in zip(best, probabilities.tolist(), features.tolist())
+        ]
+
+    def _next_batch(self):
+        with self._ready:
+            while not self._pending and not self._stopping:
+                self._ready.wait()
+            if not self._pending:
+                return None
+            # Wait for company until the oldest request has waited max_wait
+            deadline = self._pending[0].submitted + self.max_wait
+            while len(self._pending) < self.max_batch and not self._stopping:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._ready.wait(remaining)
+            count = min(len(self._pending), self.max_batch)
+            return [self._pending.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                predictions = self.classify_batch([request.window for request in batch])
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            EMOTION_BATCH_SIZE.observe(len(batch))
+            done = time.perf_counter()
+            for request, prediction in zip(batch, predictions):
+                EMOTION_LATENCY_SECONDS.observe(done - request.submitted)
+                request.future.set_result(prediction)
+
+    def close(self):
+        """Classify what is still queued, then stop the worker."""
+        with self._ready:
+            if self._thread is None:
+                return
+            self._stopping = True
+            self._ready.notify_all()
+            thread = self._thread
+        thread.join()
+        self._thread = None
@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class GattCache:
+    """
+    Services and characteristics discovered per watch, kept in memory and in a JSON file.
+
+    After the first full discovery of a watch, reconnects ask bleak to
+    resolve only the services that hold the characteristics we use (and on
+    BlueZ to reuse its own discovery), instead of walking the whole GATT
+    table again. path=None keeps the cache in memory only.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _read_file(self):
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable GATT cache {self.path}: {e}")
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = self._read_file() if self.path else {}
+        return self._entries
+
+    def _save(self, address):
+        """
+        Write one watch's change to the file.
+
+        Collector processes each keep their own cache over the same file, so
+        the change is merged into what is on disk now rather than overwriting
+        it with this process's view, and each process writes through its own
+        temporary file.
+        """
+        if not self.path:
+            return
+        entries = self._read_file()
+        if address in self._entries:
+            entries[address] = self._entries[address]
+        else:
+            entries.pop(address, None)
+        # Pick up what other processes learnt meanwhile
+        self._entries.update((key, value) for key, value in entries.items() if key != address)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write GATT cache {self.path}: {e}")
+
+    def get(self, address):
+        """{"services": {service_uuid: {char_uuid: {"handle", "properties"}}}} or None if unknown."""
+        with self._lock:
+            return self._load().get(address)
+
+    def services_for(self, address, characteristic_uuids):
+        """UUIDs of the cached services holding any of the characteristics, or None if unknown."""
+        entry = self.get(address)
+        if entry is None:
+            return None
+        wanted = {uuid.lower() for uuid in characteristic_uuids}
+        services = [service for service, characteristics in entry["services"].items()
+                    if wanted.intersection(characteristics)]
+        # A layout without the characteristics we need is no use; discover again
+        return services or None
+
+    def remember(self, address, services):
+        """Store the layout from a bleak service collection (client.services) after discovery."""
+        if services is None:
+            return
+        layout = {}
+        for service in services:
+            layout[str(service.uuid).lower()] = {
+                str(characteristic.uuid).lower(): {
+                    "handle": characteristic.handle,
+                    "properties": list(characteristic.properties),
+                } for characteristic in service.characteristics
+            }
+        with self._lock:
+            self._load()[address] = {"services": layout}
+            self._save(address)
+
+    def forget(self, address):
+        """Drop a watch's layout, e.g. when a cached characteristic no longer exists after a firmware update."""
+        with self._lock:
+            if self._load().pop(address, None) is not None:
+                self._save(address)
@@ -1,12 +1,127 @@
+import asyncio
+import logging
+import threading
+import time
+
 import geocoder
 
+logger = logging.getLogger(__name__)
+
+LOCATION_TTL = 300  # seconds a fetched location counts as fresh
+REFRESH_INTERVAL = 120  # seconds between background refreshes
+RETRY_INTERVAL = 15  # seconds before retrying a failed lookup
+
+
+class GeocoderIpBackend:
+    """Locates this machine from its public IP (network call, can take seconds)."""
+
+    def __call__(self):
+        g = geocoder.ip('me')  # Retrieves location based on IP
+        if not g.ok:
+            raise RuntimeError("Unable to fetch location")
+        latitude, longitude = g.latlng
+        return {"latitude": latitude, "longitude": longitude}
+
+
+class StaticLocationBackend:
+    """Always returns the same coordinates; for tests and fixed gateways."""
+
+    def __init__(self, latitude, longitude):
+        self.location = {"latitude": latitude, "longitude": longitude}
+
+    def __call__(self):
+        return dict(self.location)
+
+
+class LocationProvider:
+    """
+    Keeps the last known location in memory and refreshes it in the background.
+
+    last_known() never waits on the network, so alerts can be enriched with a
+    location immediately; a stale or missing location only wakes the refresh
+    thread. A backend is any callable returning {"latitude": .., "longitude": ..}
+    or raising on failure.
+    """
+
+    def __init__(self, backend=None, ttl=LOCATION_TTL, refresh_interval=REFRESH_INTERVAL):
+        self.backend = backend or GeocoderIpBackend()
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.location = None
+        self.fetched_at = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the background refresh thread (idempotent)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="location-refresh", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            ok = self.refresh()
+            self._wakeup.wait(self.refresh_interval if ok else RETRY_INTERVAL)
+            self._wakeup.clear()
+
+    def refresh(self):
+        """Fetch the location from the backend now (blocking). Returns True on success."""
+        try:
+            location = self.backend()
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning(f"Location lookup failed: {str(e)}")
+            return False
+        with self._lock:
+            self.location = location
+            self.fetched_at = time.monotonic()
+            self.last_error = None
+        return True
+
+    def is_fresh(self):
+        return self.fetched_at is not None and time.monotonic() - self.fetched_at < self.ttl
+
+    def last_known(self):
+        """The cached location (possibly stale) or None. Never blocks."""
+        if not self.is_fresh():
+            self.start()
+            self._wakeup.set()
+        with self._lock:
+            return dict(self.location) if self.location is not None else None
+
+    def get_location(self):
+        """A fresh location, fetching it if the cache is stale (blocking)."""
+        if not self.is_fresh():
+            self.refresh()
+        with self._lock:
+            if self.location is None:
+                return {"error": self.last_error or "Unable to fetch location"}
+            return dict(self.location)
+
+    async def get_location_async(self):
+        """get_location() without blocking the event loop."""
+        if self.is_fresh():
+            return self.last_known()
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_location)
+
+
+def location_link(location):
+    """Google Maps link for a location dict, or None if it has no coordinates."""
+    if not location or "latitude" not in location:
+        return None
+    return f"https://www.google.com/maps/search/?api=1&query={location['latitude']},{location['longitude']}"
+
+
+# Process-wide provider; swap its backend (e.g. StaticLocationBackend) in tests
+location_provider = LocationProvider()
+
+
 def get_device_location():
     try:
-        g = geocoder.ip('me')  # Retrieves location based on IP
-        if g.ok:
-            latitude, longitude = g.latlng
-            return {"latitude": latitude, "longitude": longitude}
-        else:
-            return {"error": "Unable to fetch location"}
+        return location_provider.get_location()
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
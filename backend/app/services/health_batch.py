@@ -0,0 +1,205 @@
+import codecs
+import json
+import time
+from datetime import datetime
+
+import pytz
+
+from backend.app.database.history import ensure_history_indexes, parse_timestamp
+from backend.app.database.rollups import create_rollup_tables
+from backend.app.database.sensor_writer import write_samples
+from backend.app.services.device_state import DeviceRecord
+from backend.app.services.draastic_changes import NO_CHANGE, detect_drastic_change, device_states
+
+IST = pytz.timezone('Asia/Kolkata')
+
+READ_CHUNK = 64 * 1024  # bytes read from the request body at a time
+MAX_READING_BYTES = 64 * 1024  # a single reading larger than this is rejected
+WHITESPACE = " \t\r\n"
+
+_rollup_tables_ready = False
+
+
+class BatchFormatError(ValueError):
+    """The request body is not a JSON array or newline-delimited JSON of readings."""
+
+
+class PendingStates:
+    """
+    Device states as seen by one batch: the shared store, overlaid with the
+    batch's own readings.
+
+    Readings are compared against the latest earlier reading of their device
+    in the batch, but the shared store only moves on commit(), once the batch
+    has been stored; a batch that fails to store leaves it untouched.
+    """
+
+    def __init__(self, states):
+        self.states = states
+        self.latest = {}
+
+    def swap(self, device_id, heart_rate, steps, spo2, now=None):
+        previous = self.latest.get(device_id)
+        if previous is None:
+            previous = self.states.get(device_id)
+        self.latest[device_id] = DeviceRecord(heart_rate, steps, spo2, time.monotonic() if now is None else now)
+        return previous
+
+    def commit(self):
+        for device_id, record in self.latest.items():
+            self.states.swap(device_id, record.heart_rate, record.steps, record.spo2)
+        self.latest.clear()
+
+
+def iter_json_objects(stream, chunk_size=READ_CHUNK):
+    """
+    Yield readings from a JSON array or NDJSON body, reading it incrementally.
+
+    Only the current reading (and the unread rest of the current chunk) is
+    held in memory, so arbitrarily large uploads are parsed in constant space.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    is_array = None
+    closed = False
+    # In an array: whether the next token must be "," (or "]"), i.e. a reading was just read
+    after_reading = False
+    after_comma = False
+    eof = False
+
+    while not eof:
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + utf8.decode(chunk or b"", final=eof)
+        pos = 0
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                pos += 1
+            if pos == len(buffer):
+                break
+            if closed:
+                raise BatchFormatError("Unexpected data after the closing ]")
+            if is_array is None:
+                is_array = buffer[pos] == "["
+                if is_array:
+                    pos += 1
+                    continue
+            if is_array and buffer[pos] == "]":
+                if after_comma:
+                    raise BatchFormatError("Trailing , before the closing ]")
+                closed = True
+                pos += 1
+                continue
+            if is_array and buffer[pos] == ",":
+                if not after_reading:
+                    raise BatchFormatError("Unexpected , in the JSON array")
+                after_reading, after_comma = False, True
+                pos += 1
+                continue
+            if after_reading:
+                raise BatchFormatError("Missing , between readings in the JSON array")
+            try:
+                reading, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise BatchFormatError(f"Malformed JSON: {e.msg}") from e
+                if len(buffer) - pos > MAX_READING_BYTES:
+                    raise BatchFormatError(f"Reading larger than {MAX_READING_BYTES} bytes") from e
+                break  # the reading continues in the next chunk
+            after_reading, after_comma = bool(is_array), False
+            yield reading
+
+    if is_array and not closed:
+        raise BatchFormatError("JSON array is not closed")
+
+
+def parse_reading(reading):
+    """
+    Validate one reading without touching any device state.
+
+    Returns (sensor_data row, spo2); raises ValueError for an invalid reading.
+    """
+    if not isinstance(reading, dict):
+        raise ValueError("Reading must be a JSON object")
+    heart_rate = reading.get("heart_rate")
+    steps = reading.get("steps")
+    spo2 = reading.get("spo2")
+    if heart_rate is None or steps is None or spo2 is None:
+        raise ValueError("Missing health data")
+    if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in (heart_rate, steps, spo2)):
+        raise ValueError("Health data must be numbers")
+    # sensor_data stores both as INTEGER; 72.0 is fine, 72.5 is not
+    if not all(float(value).is_integer() for value in (heart_rate, steps)):
+        raise ValueError("heart_rate and steps must be whole numbers")
+    heart_rate, steps = int(heart_rate), int(steps)
+    device_id = reading.get("device_id") or "default"
+    timestamp = reading.get("timestamp")
+    timestamp = parse_timestamp(timestamp) if timestamp else datetime.now(IST).strftime('%Y-%m-%d %H:%M:%S')
+    return (timestamp, heart_rate, steps, None, device_id, None), spo2
+
+
+def check_batch(readings, states=None):
+    """
+    Check every reading in order.
+
+    Returns (rows, summary, pending). `results` in the summary only lists
+    readings that raised an alert or were rejected, so it stays small for
+    large healthy batches. No device's previous reading moves here: pass
+    `pending` to store_batch(), which applies it once the rows are committed,
+    so a batch that is rejected or fails to store is retried against the
+    same state.
+    """
+    pending = PendingStates(device_states if states is None else states)
+    parsed = []
+    results = []
+    rejected = 0
+    for index, reading in enumerate(readings):
+        try:
+            parsed.append((index, *parse_reading(reading)))
+        except (ValueError, TypeError) as e:
+            rejected += 1
+            results.append({"index": index, "error": str(e)})
+
+    rows = []
+    alerts = 0
+    for index, row, spo2 in parsed:
+        rows.append(row)
+        message = detect_drastic_change(row[1], row[2], spo2, device_id=row[4], states=pending)
+        if message != NO_CHANGE:
+            alerts += 1
+            results.append({"index": index, "device_id": row[4], "message": message})
+
+    results.sort(key=lambda result: result["index"])
+    return rows, {
+        "received": len(rows) + rejected,
+        "accepted": len(rows),
+        "rejected": rejected,
+        "alerts": alerts,
+        "results": results,
+    }, pending
+
+
+def store_batch(conn, rows, pending=None):
+    """
+    Insert the accepted rows and fold them into the rollups in one transaction.
+
+    The batch's device states (`pending`, from check_batch) are applied only
+    after the transaction commits. Returns the number of rows stored;
+    readings already in the table are skipped.
+    """
+    global _rollup_tables_ready
+    if rows:
+        if not _rollup_tables_ready:
+            create_rollup_tables(conn)
+            ensure_history_indexes(conn)
+            _rollup_tables_ready = True
+        with conn:
+            stored = write_samples(conn, rows)
+    else:
+        stored = 0
+    if pending is not None:
+        pending.commit()
+    return stored
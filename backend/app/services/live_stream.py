@@ -0,0 +1,325 @@
+import asyncio
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+from backend.app.alerts.outbox import create_alerts_table
+from backend.app.database.connection import connect
+
+POLL_INTERVAL = 0.5  # seconds between checks for new rows
+KEEPALIVE_INTERVAL = 15  # seconds between SSE comments on an idle stream
+SUBSCRIBER_QUEUE_SIZE = 1000  # slow clients beyond this are dropped and must resume
+POLL_LIMIT = 250  # max rows read per query per poll, so one poll's events fit in a subscriber's queue
+RESUME_LIMIT = 5000  # max rows replayed to a resuming client; beyond this it gets a "reset" event
+
+SENSOR_COLUMNS = ("id", "timestamp", "heart_rate", "step_count", "battery_level", "device_id", "emotion")
+ALERT_COLUMNS = ("id", "message", "timestamp", "status")
+ALERT_QUERY_COLUMNS = ", ".join(ALERT_COLUMNS + ("revision",))
+
+
+def format_event_id(sensor_id, alert_id, revision):
+    return f"{sensor_id}:{alert_id}:{revision}"
+
+
+def parse_event_id(event_id):
+    """
+    Return (sensor_id, alert_id, alert revision) from a Last-Event-ID.
+
+    Ids without a revision (from before status events existed) give None,
+    so no status changes are replayed. Raises ValueError if it is malformed.
+    """
+    parts = event_id.split(":")
+    if len(parts) == 2:
+        return int(parts[0]), int(parts[1]), None
+    sensor_id, alert_id, revision = parts
+    return int(sensor_id), int(alert_id), int(revision)
+
+
+class _Subscriber:
+    __slots__ = ("device_id", "queue", "dropped", "wakeup", "position")
+
+    def __init__(self, device_id, wakeup=None):
+        self.device_id = device_id
+        self.position = None
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = False
+        # Called from the poller thread after new events are queued (async clients)
+        self.wakeup = wakeup
+
+    def notify(self):
+        if self.wakeup is not None:
+            try:
+                self.wakeup()
+            except RuntimeError:
+                # The client's event loop is already closed
+                pass
+
+
+class LiveFeed:
+    """
+    Pushes new sensor_data and alerts rows to Server-Sent Events clients.
+
+    A single poller thread tails both tables by id and fans new rows out to
+    every subscriber, so the database sees one cheap indexed query per
+    POLL_INTERVAL no matter how many dashboards are connected. Alerts also
+    carry a revision that the outbox bumps on every status change; tailing
+    it sends "alert_status" events when a queued alert is sent or fails.
+
+    Every event id is "<last sensor id>:<last alert id>:<last alert
+    revision>", which lets a client that reconnects with Last-Event-ID
+    resume exactly where it stopped. A client that missed more than
+    RESUME_LIMIT rows gets a "reset" event instead and should reload
+    /history and /api/alerts.
+    """
+
+    def __init__(self, db_path, poll_interval=POLL_INTERVAL):
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self.subscribers = set()
+        self.last_sensor_id = 0
+        self.last_alert_id = 0
+        self.last_alert_revision = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def start(self):
+        """Start tailing from the current end of both tables."""
+        with self._lock:
+            if self._thread is not None:
+                return self
+            conn = self._connect()
+            try:
+                create_alerts_table(conn)
+                self.last_sensor_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM sensor_data").fetchone()[0]
+                self.last_alert_id, self.last_alert_revision = conn.execute(
+                    "SELECT COALESCE(MAX(id), 0), COALESCE(MAX(revision), 0) FROM alerts").fetchone()
+            finally:
+                conn.close()
+            self._thread = threading.Thread(target=self._run, name="live-feed", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            try:
+                if self._poll(conn):
+                    # A burst larger than POLL_LIMIT: read the rest straight away
+                    continue
+            except sqlite3.Error as e:
+                print(f"Live feed database error: {str(e)}")
+            time.sleep(self.poll_interval)
+
+    def _poll(self, conn):
+        """Publish up to POLL_LIMIT new rows of each kind. Returns whether more are waiting."""
+        sensor_rows = conn.execute(
+            f"SELECT {', '.join(SENSOR_COLUMNS)} FROM sensor_data WHERE id > ? ORDER BY id LIMIT ?",
+            (self.last_sensor_id, POLL_LIMIT)
+        ).fetchall()
+        alert_rows = conn.execute(
+            f"SELECT {ALERT_QUERY_COLUMNS} FROM alerts WHERE id > ? ORDER BY id LIMIT ?",
+            (self.last_alert_id, POLL_LIMIT)
+        ).fetchall()
+        changed_rows = conn.execute(
+            f"SELECT {ALERT_QUERY_COLUMNS} FROM alerts WHERE revision > ? ORDER BY revision LIMIT ?",
+            (self.last_alert_revision, POLL_LIMIT)
+        ).fetchall()
+        if not sensor_rows and not alert_rows and not changed_rows:
+            return False
+        more = POLL_LIMIT in (len(sensor_rows), len(alert_rows), len(changed_rows))
+
+        events = []
+        for row in sensor_rows:
+            self.last_sensor_id = row[0]
+            events.append(("vitals", row[5], dict(zip(SENSOR_COLUMNS, row)), self._position()))
+        # New alerts are sent with their current status; status events are for alerts clients already have
+        known_alert_id = self.last_alert_id
+        for row in alert_rows:
+            self.last_alert_id = row[0]
+            events.append(("alert", None, dict(zip(ALERT_COLUMNS, row)), self._position()))
+        for row in changed_rows:
+            self.last_alert_revision = max(self.last_alert_revision, row[4])
+            if row[0] <= known_alert_id:
+                events.append(("alert_status", None, dict(zip(ALERT_COLUMNS, row)), self._position()))
+
+        with self._lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            queued = False
+            for event in events:
+                if not self._matches(subscriber.device_id, event):
+                    continue
+                try:
+                    subscriber.queue.put_nowait(event)
+                    queued = True
+                except queue.Full:
+                    # Client is too slow; close it so it reconnects with Last-Event-ID
+                    subscriber.dropped = True
+                    self.unsubscribe(subscriber)
+                    queued = True
+                    break
+            if queued:
+                subscriber.notify()
+        return more
+
+    def _position(self):
+        return format_event_id(self.last_sensor_id, self.last_alert_id, self.last_alert_revision)
+
+    @staticmethod
+    def _matches(device_id, event):
+        # Alerts are not tied to a device in the alerts table, so every client gets them
+        return device_id is None or event[0] != "vitals" or event[1] == device_id
+
+    def subscribe(self, device_id=None, wakeup=None):
+        self.start()
+        subscriber = _Subscriber(device_id, wakeup)
+        with self._lock:
+            self.subscribers.add(subscriber)
+            # Everything after this position reaches the subscriber's queue; a backlog only has to reach it
+            subscriber.position = parse_event_id(self._position())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self.subscribers.discard(subscriber)
+
+    def _backlog(self, device_id, since, until):
+        """
+        Events between the client's Last-Event-ID and the live position it subscribed at.
+
+        Returns a single "reset" event instead if more than RESUME_LIMIT rows
+        were missed, so the client reloads rather than silently skipping some.
+        """
+        sensor_id, alert_id, revision = since
+        until_sensor_id, until_alert_id, until_revision = until
+        sensor_query = "FROM sensor_data WHERE id > ? AND id <= ?"
+        sensor_params = [sensor_id, until_sensor_id]
+        if device_id is not None:
+            sensor_query += " AND device_id = ?"
+            sensor_params.append(device_id)
+        alert_query = "FROM alerts WHERE id > ? AND id <= ?"
+        alert_params = (alert_id, until_alert_id)
+        # Status changes of alerts the client already has; without a revision in its id there is nothing to go by
+        changed_query = "FROM alerts WHERE revision > ? AND revision <= ? AND id <= ?"
+        changed_params = (revision, until_revision, alert_id) if revision is not None else None
+
+        conn = self._connect()
+        try:
+            missed = conn.execute(f"SELECT COUNT(*) {sensor_query}", sensor_params).fetchone()[0]
+            missed += conn.execute(f"SELECT COUNT(*) {alert_query}", alert_params).fetchone()[0]
+            if changed_params is not None:
+                missed += conn.execute(f"SELECT COUNT(*) {changed_query}", changed_params).fetchone()[0]
+            if missed > RESUME_LIMIT:
+                return [("reset", None, {"missed": missed}, format_event_id(*until))]
+            changed_rows = []
+            if changed_params is not None:
+                changed_rows = conn.execute(f"SELECT {ALERT_QUERY_COLUMNS} {changed_query} ORDER BY revision",
+                                            changed_params).fetchall()
+            sensor_rows = conn.execute(f"SELECT {', '.join(SENSOR_COLUMNS)} {sensor_query} ORDER BY id",
+                                       sensor_params).fetchall()
+            alert_rows = conn.execute(f"SELECT {ALERT_QUERY_COLUMNS} {alert_query} ORDER BY id",
+                                      alert_params).fetchall()
+        finally:
+            conn.close()
+
+        events = []
+        for row in changed_rows:
+            events.append(("alert_status", None, dict(zip(ALERT_COLUMNS, row)),
+                           format_event_id(sensor_id, alert_id, row[4])))
+        for row in sensor_rows:
+            sensor_id = row[0]
+            events.append(("vitals", row[5], dict(zip(SENSOR_COLUMNS, row)),
+                           format_event_id(sensor_id, alert_id, until_revision)))
+        for row in alert_rows:
+            alert_id = row[0]
+            events.append(("alert", None, dict(zip(ALERT_COLUMNS, row)),
+                           format_event_id(sensor_id, alert_id, until_revision)))
+        return events
+
+    def stream(self, device_id=None, last_event_id=None):
+        """
+        Generator of SSE-formatted strings for one client.
+
+        If last_event_id is given, rows written since then are replayed
+        first (or a "reset" event is sent, see _backlog). Rows already
+        replayed are skipped when they also arrive live.
+        """
+        subscriber = self.subscribe(device_id)
+        try:
+            yield "retry: 3000\n\n"
+            sent = (-1, -1, -1)
+            if last_event_id:
+                since = parse_event_id(last_event_id)
+                for event in self._backlog(device_id, since, subscriber.position):
+                    sent = parse_event_id(event[3])
+                    yield self._format(event)
+
+            while not subscriber.dropped:
+                try:
+                    event = subscriber.queue.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if self._already_sent(event, sent):
+                    continue
+                yield self._format(event)
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def astream(self, device_id=None, last_event_id=None):
+        """
+        stream() for an asyncio server: waits for events on the event loop
+        instead of blocking a thread per client.
+        """
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        # Subscribing may read the current end of both tables; keep it off the loop
+        subscriber = await loop.run_in_executor(
+            None, self.subscribe, device_id, lambda: loop.call_soon_threadsafe(ready.set))
+        try:
+            yield "retry: 3000\n\n"
+            sent = (-1, -1, -1)
+            if last_event_id:
+                since = parse_event_id(last_event_id)
+                for event in await loop.run_in_executor(None, self._backlog, device_id, since, subscriber.position):
+                    sent = parse_event_id(event[3])
+                    yield self._format(event)
+
+            while not subscriber.dropped:
+                try:
+                    event = subscriber.queue.get_nowait()
+                except queue.Empty:
+                    ready.clear()
+                    # Re-check after clear(), or an event queued just before it would wait for the next one
+                    if subscriber.queue.empty():
+                        try:
+                            await asyncio.wait_for(ready.wait(), KEEPALIVE_INTERVAL)
+                        except asyncio.TimeoutError:
+                            yield ": keepalive\n\n"
+                    continue
+                if self._already_sent(event, sent):
+                    continue
+                yield self._format(event)
+        finally:
+            self.unsubscribe(subscriber)
+
+    @staticmethod
+    def _already_sent(event, sent):
+        """Whether a live event was already replayed from the backlog (or skipped by a reset)."""
+        sent_sensor_id, sent_alert_id, sent_revision = sent
+        if event[0] == "vitals":
+            return event[2]["id"] <= sent_sensor_id
+        if event[0] == "alert":
+            return event[2]["id"] <= sent_alert_id
+        # A status event's id ends in the revision of its change
+        return parse_event_id(event[3])[2] <= (sent_revision if sent_revision is not None else -1)
+
+    @staticmethod
+    def _format(event):
+        kind, _, payload, event_id = event
+        return f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(payload)}\n\n"
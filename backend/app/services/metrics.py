@@ -0,0 +1,367 @@
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from sub-millisecond handler work to slow SMS sends
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class _Shards:
+    """
+    Per-thread rows of float cells.
+
+    Each thread only ever writes its own row, so updates need no lock; rows
+    are summed when metrics are scraped. When a thread finishes, its row is
+    folded into a shared base row, so totals never go backwards and a
+    thread-per-request server does not grow the list.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._local = threading.local()
+        self._base = [0.0] * size
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def row(self):
+        try:
+            return self._local.row
+        except AttributeError:
+            row = self._local.row = [0.0] * self.size
+            # The thread-local owner is released when the thread exits; its row is retired then
+            owner = self._local.owner = _RowOwner()
+            with self._lock:
+                self._rows[id(owner)] = row
+            weakref.finalize(owner, self._retire, id(owner))
+            return row
+
+    def _retire(self, key):
+        with self._lock:
+            row = self._rows.pop(key, None)
+            if row is not None:
+                self._base = [base + cell for base, cell in zip(self._base, row)]
+
+    def totals(self):
+        with self._lock:
+            rows = [self._base] + list(self._rows.values())
+        return [sum(column) for column in zip(*rows)]
+
+
+class _RowOwner:
+    __slots__ = ("__weakref__",)
+
+
+class _CounterChild:
+    __slots__ = ("_shards",)
+
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount=1):
+        self._shards.row()[0] += amount
+
+    def value(self):
+        return self._shards.totals()[0]
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_function", "_sources")
+
+    def __init__(self):
+        self._value = 0.0
+        self._function = None
+        self._sources = {}
+
+    def set(self, value):
+        self._value = value
+
+    def set_function(self, function):
+        """Compute the value when scraped instead of tracking it."""
+        self._function = function
+
+    def track(self, key, function):
+        """Add function() to the scraped value until untrack(key); a second track() of a key replaces it."""
+        self._sources[key] = function
+
+    def untrack(self, key):
+        self._sources.pop(key, None)
+
+    def value(self):
+        try:
+            if self._function is not None:
+                return float(self._function())
+            if self._sources:
+                return float(sum(function() for function in list(self._sources.values())))
+        except Exception:
+            return float("nan")
+        return self._value
+
+
+class _HistogramChild:
+    __slots__ = ("_buckets", "_shards")
+
+    def __init__(self, buckets):
+        self._buckets = buckets
+        # One cell per bucket plus +Inf, then the sum
+        self._shards = _Shards(len(buckets) + 2)
+
+    def observe(self, value):
+        row = self._shards.row()
+        row[bisect_left(self._buckets, value)] += 1
+        row[-1] += value
+
+    def time(self):
+        return _Timer(self)
+
+    def snapshot(self):
+        """(cumulative bucket counts including +Inf, count, sum)"""
+        totals = self._shards.totals()
+        cumulative = []
+        running = 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+
+class _Timer:
+    __slots__ = ("_child", "_started")
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._started)
+
+
+class _Metric(ABC):
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._child_for(())
+        (registry if registry is not None else REGISTRY).register(self)
+
+    @abstractmethod
+    def _new_child(self):
+        """A fresh child holding the values for one combination of labels."""
+
+    @abstractmethod
+    def _sample_lines(self, values, child):
+        """Exposition lines for one child."""
+
+    def _child_for(self, values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def labels(self, *values):
+        """The child for one combination of label values; keep the result on hot paths."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return self._child_for(tuple(str(value) for value in values))
+
+    def _label_text(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in children:
+            lines.extend(self._sample_lines(values, child))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def _sample_lines(self, values, child):
+        return [f"{self.name}{self._label_text(values)} {_format(child.value())}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default.set(value)
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+    def track(self, key, function):
+        self._default.track(key, function)
+
+    def untrack(self, key):
+        self._default.untrack(key)
+
+    def _sample_lines(self, values, child):
+        return [f"{self.name}{self._label_text(values)} {_format(child.value())}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def _sample_lines(self, values, child):
+        cumulative, count, total = child.snapshot()
+        lines = []
+        for bound, value in zip(self.buckets + (float("inf"),), cumulative):
+            le = "+Inf" if bound == float("inf") else _format(bound)
+            lines.append(f"{self.name}_bucket{self._label_text(values, [('le', le)])} {_format(value)}")
+        lines.append(f"{self.name}_sum{self._label_text(values)} {_format(total)}")
+        lines.append(f"{self.name}_count{self._label_text(values)} {_format(count)}")
+        return lines
+
+
+def _format(value):
+    if value != value:
+        return "NaN"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Duplicate metric {metric.name}")
+            self.metrics[metric.name] = metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def serve(port, registry=REGISTRY):
+    """
+    Serve /metrics on its own thread, for processes without the Flask app
+    (e.g. the watch supervisor). Returns the server.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+# Pipeline metrics ------------------------------------------------------------
+
+NOTIFICATION_TO_COMMIT = Histogram(
+    "ble_notification_to_commit_seconds", "Time from a BLE notification being queued to its row being committed")
+HANDLER_SECONDS = Histogram(
+    "ble_handler_seconds", "Time spent in a BLE notification handler", ["characteristic"])
+NOTIFICATIONS = Counter(
+    "ble_notifications_total", "BLE notifications received", ["characteristic"])
+CONNECTED_DEVICES = Gauge(
+    "ble_connected_devices", "Watches currently connected")
+RECONNECTS = Counter(
+    "ble_reconnects_total", "Watch reconnect attempts after a dropped or failed connection")
+CONNECT_SECONDS = Histogram(
+    "ble_connect_seconds", "Time to connect to a watch, by whether GATT discovery came from the cache",
+    ["discovery"])
+RECONNECT_FIRST_SAMPLE_SECONDS = Histogram(
+    "ble_reconnect_first_sample_seconds",
+    "Time from losing a watch's connection to the first heart rate sample after reconnecting")
+
+INGEST_HANDOFF_SECONDS = Histogram(
+    "ingest_handoff_seconds", "Time from a collector process receiving a notification to the ingest process handling it")
+INGEST_RING_DEPTH = Gauge(
+    "ingest_ring_depth", "Notifications waiting in the collectors' shared-memory rings")
+INGEST_RING_DROPPED = Gauge(
+    "ingest_ring_dropped", "Notifications dropped since start because a collector's ring was full")
+
+DB_BATCH_SIZE = Histogram(
+    "db_write_batch_size", "Rows per sensor_data write batch", buckets=SIZE_BUCKETS)
+DB_BATCH_SECONDS = Histogram(
+    "db_write_batch_seconds", "Duration of a sensor_data write batch (insert, rollups and commit)")
+DB_WRITE_ERRORS = Counter(
+    "db_write_errors_total", "sensor_data write batches that failed")
+DB_SAMPLES_DROPPED = Counter(
+    "db_samples_dropped_total", "Samples dropped because the write queue was full")
+DB_QUEUE_DEPTH = Gauge(
+    "db_write_queue_depth", "Samples waiting for the sensor_data writer")
+
+ALERTS_ENQUEUED = Counter(
+    "alerts_enqueued_total", "Alerts written to the outbox")
+ALERT_QUEUE_DEPTH = Gauge(
+    "alert_queue_depth", "Alerts waiting to be sent")
+SMS_SEND_SECONDS = Histogram(
+    "alert_sms_send_seconds", "SMS provider call latency", ["outcome"])
+
+EMOTION_BATCH_SIZE = Histogram(
+    "emotion_batch_size", "Windows classified per emotion model batch", buckets=SIZE_BUCKETS)
+EMOTION_LATENCY_SECONDS = Histogram(
+    "emotion_latency_seconds", "Time from an emotion request being queued to its prediction")
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"])
@@ -0,0 +1,379 @@
+"""
+Declarative rule engine for every health threshold and classification.
+
+The rule file (config.RULES_FILE, JSON) holds:
+
+  rules        thresholds on a metric of a sample ("heart_rate", "steps",
+               "spo2", ...) or, with "change": "abs" | "rise" | "drop", on
+               its change since the device's previous sample. Exactly one of
+               above / at_least / below / at_most. Optional: "clear"
+               (hysteresis for alerts), "for" (seconds the condition must
+               hold), "action" ("alert" goes to the debouncer and SMS,
+               "report" only returns "message"), "sources" (entry points the
+               rule applies to; all when omitted).
+  classifiers  ordered bands on one metric, e.g. heart rate -> emotion, with
+               an optional "refine" condition on a second metric per band.
+  overrides    {device_id: {rule or classifier name: {fields to replace}}};
+               {"enabled": false} switches a rule off for that device.
+
+Each (source, device) pair is compiled once into per-signal threshold tables
+sorted so that the rules firing for a value are a prefix found by bisection.
+Evaluating a sample is one pass over its signals, O(log rules) each, so the
+cost per sample stays flat as rules are added. The file is re-read when its
+modification time changes.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+
+from backend.app.alerts.debounce import AlertRule
+from backend.app.config import RULES_FILE
+
+logger = logging.getLogger(__name__)
+
+RELOAD_CHECK_INTERVAL = 2.0  # seconds between checks of the rule file's modification time
+OPERATORS = {
+    # key: (fires above the threshold?, fires at the threshold?)
+    "above": (True, False),
+    "at_least": (True, True),
+    "below": (False, False),
+    "at_most": (False, True),
+}
+CHANGES = ("abs", "rise", "drop")
+INFINITY = float("inf")
+NO_LABELS = {}  # shared, never modified
+ACTIONS = ("alert", "report")
+
+
+class RuleError(ValueError):
+    """The rule file is malformed."""
+
+
+def _parse_bound(spec, where):
+    """(threshold, above, inclusive) from the one operator key in spec."""
+    keys = [key for key in OPERATORS if key in spec]
+    if len(keys) != 1:
+        raise RuleError(f"{where}: needs exactly one of {', '.join(OPERATORS)}")
+    threshold = spec[keys[0]]
+    if not isinstance(threshold, (int, float)) or isinstance(threshold, bool):
+        raise RuleError(f"{where}: {keys[0]} must be a number")
+    above, inclusive = OPERATORS[keys[0]]
+    return threshold, above, inclusive
+
+
+def _passes(value, threshold, above, inclusive):
+    if above:
+        return value >= threshold if inclusive else value > threshold
+    return value <= threshold if inclusive else value < threshold
+
+
+class Rule:
+    """A compiled threshold rule."""
+
+    __slots__ = ("name", "metric", "change", "signal", "threshold", "above", "inclusive", "clear", "duration",
+                 "action", "label", "unit", "message", "order", "alert_rule")
+
+    def __init__(self, spec, order):
+        self.name = spec.get("name")
+        self.metric = spec.get("metric")
+        if not isinstance(self.name, str) or not isinstance(self.metric, str):
+            raise RuleError(f"rule #{order}: needs a name and a metric")
+        where = f"rule {self.name}"
+        self.change = spec.get("change")
+        if self.change is not None and self.change not in CHANGES:
+            raise RuleError(f"{where}: change must be one of {', '.join(CHANGES)}")
+        self.signal = self.metric if self.change is None else f"{self.metric}:{self.change}"
+        self.threshold, self.above, self.inclusive = _parse_bound(spec, where)
+        self.clear = spec.get("clear", self.threshold)
+        self.duration = spec.get("for", 0)
+        self.action = spec.get("action", "alert")
+        if self.action not in ACTIONS:
+            raise RuleError(f"{where}: action must be one of {', '.join(ACTIONS)}")
+        self.label = spec.get("label", f"{self.signal} {'>' if self.above else '<'} {self.threshold}")
+        self.unit = spec.get("unit", "")
+        self.message = spec.get("message", f"{self.label}: {{value}}{self.unit}")
+        self.order = order
+        self.alert_rule = AlertRule(self.name, self.label, self.threshold, self.clear, self.above, self.unit,
+                                    self.inclusive)
+
+
+class _Side:
+    """
+    The rules on one signal that fire on the same side of their thresholds.
+
+    Thresholds are stored so that larger keys are harder to reach (negated
+    for "below" rules); the rules firing for a value are then the prefix of
+    keys up to it.
+    """
+
+    __slots__ = ("sign", "keys", "rules")
+
+    def __init__(self, rules, above):
+        self.sign = 1 if above else -1
+        # At equal thresholds the inclusive rules come first: they also fire at the threshold itself
+        self.rules = sorted(rules, key=lambda rule: (self.sign * rule.threshold, not rule.inclusive))
+        self.keys = [self.sign * rule.threshold for rule in self.rules]
+
+    def firing(self, value):
+        value = self.sign * value
+        end = bisect_right(self.keys, value)
+        while end and self.keys[end - 1] == value and not self.rules[end - 1].inclusive:
+            end -= 1
+        return self.rules[:end]
+
+
+class Classifier:
+    """Ordered bands on one metric; the highest band whose lower bound the value passes wins."""
+
+    __slots__ = ("name", "metric", "default", "keys", "bands")
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.metric = spec.get("metric")
+        if not isinstance(self.metric, str):
+            raise RuleError(f"classifier {name}: needs a metric")
+        self.default = spec.get("default")
+        bands = []
+        for band in spec.get("bands", []):
+            threshold, above, inclusive = _parse_bound(band, f"classifier {name}")
+            if not above:
+                raise RuleError(f"classifier {name}: bands are lower bounds (above or at_least)")
+            refine = band.get("refine")
+            if refine is not None:
+                refine = (refine.get("metric"), *_parse_bound(refine, f"classifier {name}"), refine.get("label"))
+            bands.append((threshold, not inclusive, band.get("label"), refine))
+        bands.sort(key=lambda band: band[:2])
+        self.keys = [band[0] for band in bands]
+        self.bands = bands
+
+    def classify(self, value, sample=None):
+        index = bisect_right(self.keys, value)
+        while index and self.keys[index - 1] == value and self.bands[index - 1][1]:
+            index -= 1
+        if not index:
+            return self.default
+        _, _, label, refine = self.bands[index - 1]
+        if refine is not None and sample is not None:
+            metric, threshold, above, inclusive, refined = refine
+            other = sample.get(metric)
+            if other is not None and _passes(other, threshold, above, inclusive):
+                return refined
+        return label
+
+
+class Evaluation:
+    """What one sample triggered: alert rules, report messages, classifier labels and signal values."""
+
+    __slots__ = ("rules", "alerts", "reports", "labels", "values")
+
+    def __init__(self, rules, alerts, reports, labels, values):
+        self.rules = rules
+        self.alerts = alerts
+        self.reports = reports
+        self.labels = labels
+        self.values = values
+
+
+class CompiledRules:
+    """The rules and classifiers for one source and device, indexed for evaluation."""
+
+    def __init__(self, rules, classifiers):
+        self.rules = {rule.name: rule for rule in rules}
+        self.classifiers = classifiers
+        self.has_durations = any(rule.duration for rule in rules)
+        by_signal = {}
+        for rule in rules:
+            entry = by_signal.setdefault(rule.signal, (rule.metric, rule.change, [], []))
+            entry[2 if rule.above else 3].append(rule)
+        # (metric, change, signal, above side, lowest "above" threshold, below side, highest "below" threshold)
+        self.signals = []
+        for signal, (metric, change, above, below) in by_signal.items():
+            above_side = _Side(above, True) if above else None
+            below_side = _Side(below, False) if below else None
+            self.signals.append((metric, change, signal,
+                                 above_side, above_side.rules[0].threshold if above else INFINITY,
+                                 below_side, below_side.rules[0].threshold if below else -INFINITY))
+
+    def firing(self, sample, previous=None):
+        """(rules firing for the sample, {signal: value})"""
+        fired = []
+        values = {}
+        for metric, change, signal, above, lowest, below, highest in self.signals:
+            value = sample.get(metric)
+            if value is None:
+                continue
+            if change is not None:
+                last = previous.get(metric) if previous is not None else None
+                if last is None:
+                    continue
+                value = abs(value - last) if change == "abs" else value - last if change == "rise" else last - value
+            values[signal] = value
+            # Most samples are within every threshold; that takes one comparison per side
+            if value >= lowest:
+                fired += above.firing(value)
+            if value <= highest:
+                fired += below.firing(value)
+        return fired, values
+
+    def labels(self, sample):
+        return {name: classifier.classify(sample[classifier.metric], sample)
+                for name, classifier in self.classifiers.items() if sample.get(classifier.metric) is not None}
+
+
+class RuleSet:
+    """A parsed rule file; compiles and caches the rules for each (source, device) on first use."""
+
+    def __init__(self, spec):
+        if not isinstance(spec, dict):
+            raise RuleError("rule file must hold a JSON object")
+        self.rule_specs = spec.get("rules", [])
+        self.classifier_specs = spec.get("classifiers", {})
+        self.overrides = spec.get("overrides", {})
+        self._compiled = {}
+        # Compile everything once up front so a bad file is rejected as a whole
+        self._enabled = {device_id: frozenset(self._compile(None, device_id, all_sources=True).rules)
+                         for device_id in [None, *self.overrides]}
+
+    def compiled(self, source=None, device_id=None):
+        key = (source, device_id if device_id in self.overrides else None)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = self._compiled[key] = self._compile(*key)
+        return compiled
+
+    def enabled_rules(self, device_id=None):
+        """Names of the rules switched on for a device, from any source."""
+        return self._enabled[device_id if device_id in self.overrides else None]
+
+    def _compile(self, source, device_id, all_sources=False):
+        overrides = self.overrides.get(device_id, {}) if device_id is not None else {}
+
+        def applies(spec):
+            if not spec.get("enabled", True):
+                return False
+            return all_sources or "sources" not in spec or source in spec["sources"]
+
+        rules = []
+        for order, spec in enumerate(self.rule_specs):
+            spec = {**spec, **overrides.get(spec.get("name"), {})}
+            if applies(spec):
+                rules.append(Rule(spec, order))
+        names = [rule.name for rule in rules]
+        if len(set(names)) != len(names):
+            raise RuleError("rule names must be unique")
+        classifiers = {}
+        for name, spec in self.classifier_specs.items():
+            spec = {**spec, **overrides.get(name, {})}
+            if applies(spec):
+                classifiers[name] = Classifier(name, spec)
+        return CompiledRules(rules, classifiers)
+
+
+class RuleEngine:
+    """
+    Evaluates samples against the rule file, reloading it when it changes.
+
+    A file that fails to parse on reload is logged and the previous rules
+    stay in force. Rules with "for" keep, per source and device, the time
+    their condition started to hold.
+    """
+
+    def __init__(self, path=RULES_FILE, spec=None, check_interval=RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._ruleset = RuleSet(spec) if spec is not None else None
+        self._mtime = None
+        self._next_check = 0.0
+        self._pending = {}  # (source, device_id) -> {rule name: time the condition started to hold}
+        self._lock = threading.Lock()
+
+    def ruleset(self):
+        now = time.monotonic()
+        if now >= self._next_check and self.path is not None:
+            self._next_check = now + self.check_interval
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != self._mtime:
+                self._reload(mtime)
+        return self._ruleset
+
+    def _reload(self, mtime):
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    ruleset = RuleSet(json.load(f))
+            except (OSError, ValueError) as e:
+                if self._ruleset is None:
+                    raise RuleError(f"Cannot load rules from {self.path}: {e}") from e
+                logger.error(f"Keeping the previous rules, {self.path} is invalid: {e}")
+            else:
+                self._ruleset = ruleset
+                if self._mtime is not None:
+                    logger.info(f"Reloaded rules from {self.path}")
+            self._mtime = mtime
+
+    def evaluate(self, sample, device_id=None, source=None, previous=None, now=None):
+        """
+        Evaluate one sample ({metric: value}) from an entry point.
+
+        previous is the device's previous sample, needed by change rules.
+        Returns an Evaluation; reports are in rule file order.
+        """
+        compiled = self.ruleset().compiled(source, device_id)
+        fired, values = compiled.firing(sample, previous)
+        if compiled.has_durations:
+            fired = self._held((source, device_id), fired, time.time() if now is None else now)
+        alerts = []
+        reports = []
+        if fired:
+            if len(fired) > 1:
+                fired.sort(key=lambda rule: rule.order)
+            for rule in fired:
+                if rule.action == "alert":
+                    alerts.append(rule)
+                else:
+                    reports.append(rule.message.format(value=values[rule.signal]))
+        labels = compiled.labels(sample) if compiled.classifiers else NO_LABELS
+        return Evaluation(compiled.rules, alerts, reports, labels, values)
+
+    def _held(self, key, fired, now):
+        """
+        Drop the firing rules whose condition has not yet held for their duration.
+
+        key is (source, device_id): entry points evaluate the same device with
+        different rule sets, and one must not reset the other's timers.
+        """
+        with self._lock:
+            started = self._pending.pop(key, {})
+            pending = {}
+            held = []
+            for rule in fired:
+                if not rule.duration:
+                    held.append(rule)
+                    continue
+                since = pending[rule.name] = started.get(rule.name, now)
+                if now - since >= rule.duration:
+                    held.append(rule)
+            if pending:
+                self._pending[key] = pending
+        return held
+
+    def enabled_rules(self, device_id=None):
+        """Names of the rules switched on for a device in the current rule file, from any source."""
+        return self.ruleset().enabled_rules(device_id)
+
+    def classify(self, name, value, sample=None, source=None, device_id=None):
+        """Label from one classifier, or None if it is not defined for the source."""
+        classifier = self.ruleset().compiled(source, device_id).classifiers.get(name)
+        return classifier.classify(value, sample) if classifier is not None else None
+
+
+# Shared by every entry point in the process
+rule_engine = RuleEngine()
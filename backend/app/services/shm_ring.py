@@ -0,0 +1,146 @@
+"""
+Single-producer, single-consumer ring of fixed-size records in shared memory.
+
+Used to hand BLE notifications from collector processes to the ingest
+process (scripts/ingest_gateway.py) without pickling: a record is packed
+straight into the shared buffer by the producer and unpacked by the
+consumer, and publishing it is one 8-byte store of the head counter.
+
+Layout: a HEADER_SIZE header (head, dropped and capacity on the first
+cache line, tail on the second, so the two sides never write the same
+line) followed by `capacity` RECORD slots. head and tail only ever grow;
+slot = counter % capacity. Every slot also stores its sequence number
+(counter + 1), and the consumer stops at a slot whose number does not
+match, so a stale slot is never mistaken for a new record.
+
+The producer writes a record's body, then its sequence number, then the
+head counter; the consumer reads them in the opposite order. Python has no
+memory fences, so this relies on stores becoming visible in program order,
+which x86 (TSO) guarantees. On weakly ordered CPUs such as ARM a consumer
+could in principle read a torn record; run the gateway in one process
+(scripts/watch_supervisor.py) there if that matters.
+"""
+import struct
+import time
+from multiprocessing import shared_memory
+
+# sequence, received (epoch seconds), kind, payload length, device address, payload
+RECORD = struct.Struct("<QdBB17s29s")  # 64 bytes, one cache line
+BODY = struct.Struct("<dBB17s29s")  # RECORD after the sequence number
+ADDRESS_SIZE = 17  # bytes; fits a MAC address ("AA:BB:CC:DD:EE:FF"), not e.g. a macOS device UUID
+PAYLOAD_SIZE = 29  # longer notifications are truncated; the watch's fit in a default 20-byte ATT payload
+HEADER_SIZE = 128
+RING_CAPACITY = 65536  # records; 4 MB per ring
+
+HEAD = 0
+DROPPED = 8
+CAPACITY = 16
+TAIL = 64
+_COUNTER = struct.Struct("<Q")
+
+# Record kinds
+HEART_RATE = 1
+STEP_COUNT = 2
+BATTERY = 3
+
+
+class ShmRing:
+    """
+    One collector's queue of (kind, address, payload, received) records.
+
+    The producer calls push() and the consumer pop_many(); each side must
+    be a single thread. A full ring drops the new record (counted in
+    `dropped`) rather than blocking the BLE event loop.
+    """
+
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.owner = owner
+        self.buf = shm.buf
+        self.capacity = _COUNTER.unpack_from(self.buf, CAPACITY)[0]
+        # Each side keeps its own counter; only the other side's is read from shared memory
+        self._head = _COUNTER.unpack_from(self.buf, HEAD)[0]
+        self._tail = _COUNTER.unpack_from(self.buf, TAIL)[0]
+
+    @classmethod
+    def create(cls, capacity=RING_CAPACITY, name=None):
+        shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + capacity * RECORD.size)
+        shm.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        _COUNTER.pack_into(shm.buf, CAPACITY, capacity)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """Open a ring created by another process."""
+        try:
+            # Only the creator may unlink it
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching registers it too, which is harmless in a process started
+            # by multiprocessing: it shares its parent's resource tracker, which only cleans up at exit
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def dropped(self):
+        return _COUNTER.unpack_from(self.buf, DROPPED)[0]
+
+    def __len__(self):
+        return _COUNTER.unpack_from(self.buf, HEAD)[0] - _COUNTER.unpack_from(self.buf, TAIL)[0]
+
+    def push(self, kind, address, payload, received=None):
+        """
+        Append one record. Returns False (and counts a drop) if the ring is full.
+
+        Raises ValueError for an address longer than ADDRESS_SIZE bytes, which
+        would otherwise be truncated into another device's address.
+        """
+        address = address.encode()
+        if len(address) > ADDRESS_SIZE:
+            raise ValueError(f"Address {address.decode()} is longer than {ADDRESS_SIZE} bytes")
+        head = self._head
+        if head - _COUNTER.unpack_from(self.buf, TAIL)[0] >= self.capacity:
+            _COUNTER.pack_into(self.buf, DROPPED, self.dropped + 1)
+            return False
+        payload = bytes(payload[:PAYLOAD_SIZE])
+        offset = HEADER_SIZE + (head % self.capacity) * RECORD.size
+        BODY.pack_into(self.buf, offset + _COUNTER.size, time.time() if received is None else received,
+                       kind, len(payload), address, payload)
+        # The sequence number last, so a matching one means the body is complete
+        _COUNTER.pack_into(self.buf, offset, head + 1)
+        self._head = head + 1
+        _COUNTER.pack_into(self.buf, HEAD, self._head)
+        return True
+
+    def pop_many(self, limit=1024):
+        """Up to `limit` records, oldest first, as (kind, address, payload, received) tuples."""
+        tail = self._tail
+        available = min(_COUNTER.unpack_from(self.buf, HEAD)[0] - tail, limit)
+        if available <= 0:
+            return []
+        records = []
+        buf = self.buf
+        capacity = self.capacity
+        unpack_counter = _COUNTER.unpack_from
+        unpack_body = BODY.unpack_from
+        for _ in range(available):
+            offset = HEADER_SIZE + (tail % capacity) * RECORD.size
+            if unpack_counter(buf, offset)[0] != tail + 1:
+                break
+            received, kind, length, address, payload = unpack_body(buf, offset + _COUNTER.size)
+            records.append((kind, address.rstrip(b"\0").decode(), payload[:length], received))
+            tail += 1
+        self._tail = tail
+        _COUNTER.pack_into(buf, TAIL, tail)
+        return records
+
+    def close(self):
+        """Detach from the ring; the creator also frees it."""
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,200 @@
+import time
+from array import array
+from collections import deque
+
+from backend.app.services.rules import rule_engine
+
+WINDOW_SECONDS = 30  # length of the analysis window
+WINDOW_CAPACITY = 1024  # samples kept per device at most, whatever their age
+
+
+class SlidingWindow:
+    """
+    Time-based window over one device's recent heart rate and step samples.
+
+    Samples live in fixed-size array ring buffers. Running sums give the mean
+    and the least-squares heart rate slope, and monotonic deques give min and
+    max, so adding a sample and reading any statistic is O(1) amortized and
+    never touches the database.
+    """
+
+    def __init__(self, seconds=WINDOW_SECONDS, capacity=WINDOW_CAPACITY):
+        self.seconds = seconds
+        self.capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._heart_rates = array("d", bytes(8 * capacity))
+        self._steps = array("d", bytes(8 * capacity))
+        self._start = 0  # sequence number of the oldest sample in the window
+        self._end = 0  # sequence number the next sample will get
+        # (sequence, value) candidates for min and max
+        self._min = deque()
+        self._max = deque()
+        # Regression sums over (t - origin, heart_rate); origin keeps the floats small
+        self._origin = 0.0
+        self._sum_t = 0.0
+        self._sum_tt = 0.0
+        self._sum_hr = 0.0
+        self._sum_t_hr = 0.0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def add(self, heart_rate, step_count, now=None):
+        """Add one sample and drop the ones that fell out of the window."""
+        now = time.monotonic() if now is None else now
+        self.expire(now)
+        if len(self) == 0:
+            self._origin = now
+            self._sum_t = self._sum_tt = self._sum_hr = self._sum_t_hr = 0.0
+        elif len(self) == self.capacity:
+            self._pop_oldest()
+        if now - self._origin > 10 * self.seconds:
+            self._rebase()
+
+        seq = self._end
+        slot = seq % self.capacity
+        t = now - self._origin
+        self._times[slot] = now
+        self._heart_rates[slot] = heart_rate
+        self._steps[slot] = step_count
+        self._end += 1
+
+        self._sum_t += t
+        self._sum_tt += t * t
+        self._sum_hr += heart_rate
+        self._sum_t_hr += t * heart_rate
+
+        while self._min and self._min[-1][1] >= heart_rate:
+            self._min.pop()
+        self._min.append((seq, heart_rate))
+        while self._max and self._max[-1][1] <= heart_rate:
+            self._max.pop()
+        self._max.append((seq, heart_rate))
+
+    def expire(self, now=None):
+        """Drop samples older than the window length."""
+        cutoff = (time.monotonic() if now is None else now) - self.seconds
+        while len(self) and self._times[self._start % self.capacity] < cutoff:
+            self._pop_oldest()
+
+    def _pop_oldest(self):
+        slot = self._start % self.capacity
+        t = self._times[slot] - self._origin
+        heart_rate = self._heart_rates[slot]
+        self._sum_t -= t
+        self._sum_tt -= t * t
+        self._sum_hr -= heart_rate
+        self._sum_t_hr -= t * heart_rate
+        if self._min[0][0] == self._start:
+            self._min.popleft()
+        if self._max[0][0] == self._start:
+            self._max.popleft()
+        self._start += 1
+
+    def _rebase(self):
+        """Move the regression origin to the oldest sample and recompute the sums from the ring."""
+        self._origin = self._times[self._start % self.capacity] if len(self) else 0.0
+        self._sum_t = self._sum_tt = self._sum_hr = self._sum_t_hr = 0.0
+        for seq in range(self._start, self._end):
+            slot = seq % self.capacity
+            t = self._times[slot] - self._origin
+            heart_rate = self._heart_rates[slot]
+            self._sum_t += t
+            self._sum_tt += t * t
+            self._sum_hr += heart_rate
+            self._sum_t_hr += t * heart_rate
+
+    @property
+    def mean_heart_rate(self):
+        return self._sum_hr / len(self) if len(self) else None
+
+    @property
+    def min_heart_rate(self):
+        return self._min[0][1] if self._min else None
+
+    @property
+    def max_heart_rate(self):
+        return self._max[0][1] if self._max else None
+
+    @property
+    def heart_rate_slope(self):
+        """Least-squares heart rate trend in BPM per second (None with fewer than two distinct times)."""
+        n = len(self)
+        if n < 2:
+            return None
+        denominator = n * self._sum_tt - self._sum_t * self._sum_t
+        if denominator <= 1e-9:
+            return None
+        return (n * self._sum_t_hr - self._sum_t * self._sum_hr) / denominator
+
+    @property
+    def step_delta(self):
+        """Steps between the oldest and the newest sample in the window."""
+        if len(self) < 2:
+            return None
+        newest = self._steps[(self._end - 1) % self.capacity]
+        oldest = self._steps[self._start % self.capacity]
+        return int(newest - oldest)
+
+    def samples(self, limit=None):
+        """(times, heart_rates, steps) lists of the newest `limit` samples (all by default), oldest first."""
+        start = self._start if limit is None else max(self._start, self._end - limit)
+        slots = [seq % self.capacity for seq in range(start, self._end)]
+        return ([self._times[slot] for slot in slots], [self._heart_rates[slot] for slot in slots],
+                [self._steps[slot] for slot in slots])
+
+    def stats(self):
+        return {
+            "samples": len(self),
+            "mean_heart_rate": self.mean_heart_rate,
+            "min_heart_rate": self.min_heart_rate,
+            "max_heart_rate": self.max_heart_rate,
+            "heart_rate_slope": self.heart_rate_slope,
+            "step_delta": self.step_delta,
+        }
+
+
+class WindowRegistry:
+    """One SlidingWindow per device, created on first use."""
+
+    def __init__(self, seconds=WINDOW_SECONDS, capacity=WINDOW_CAPACITY):
+        self.seconds = seconds
+        self.capacity = capacity
+        self.windows = {}
+
+    def get(self, device_id):
+        window = self.windows.get(device_id)
+        if window is None:
+            window = self.windows[device_id] = SlidingWindow(self.seconds, self.capacity)
+        return window
+
+    def add(self, device_id, heart_rate, step_count, now=None):
+        window = self.get(device_id)
+        window.add(heart_rate, step_count, now)
+        return window
+
+
+def classify_emotion(heart_rate):
+    """Classify emotion based on the average heart rate (the window_emotion bands in the rule file)"""
+    return rule_engine.classify("window_emotion", heart_rate, source="window")
+
+
+def detect_running(step_difference):
+    """Detect if the user is running based on the step count change over the window"""
+    if step_difference is None:
+        return "Insufficient Data"
+
+    return rule_engine.classify("running", step_difference, source="window")
+
+
+def analyze_window(window):
+    """
+    Classify the last 30 seconds of one device from its in-memory window.
+
+    Returns (average heart rate, emotion, running state); cheap enough to
+    run on every sample.
+    """
+    avg_heart_rate = window.mean_heart_rate
+    if avg_heart_rate is None:
+        return None, None, detect_running(None)
+    return avg_heart_rate, classify_emotion(avg_heart_rate), detect_running(window.step_delta)
@@ -0,0 +1,17 @@
+from twilio.rest import Client
+
+
+class TwilioSmsProvider:
+    """Sends alert SMS through Twilio. Raises on any delivery error."""
+
+    def __init__(self, account_sid, auth_token, from_number, to_number):
+        self.client = Client(account_sid, auth_token)
+        self.from_number = from_number
+        self.to_number = to_number
+
+    def send(self, message):
+        self.client.messages.create(
+            body=message,
+            from_=self.from_number,
+            to=self.to_number
+        )
@@ -1,10 +1,14 @@
 import asyncio
-import csv
 import datetime
+import os
+import sys
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 from bleak import BleakClient
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+from backend.app.database.raw_archive import RawArchiveWriter
+
 # Fastrack Watch MAC Address
 MAC_ADDRESS_FASTRACK = "FB:D8:57:5B:04:32"
 
@@ -15,13 +19,9 @@ STEP_COUNT_UUID = "0000fee1-0000-1000-8000-00805f9b34fb"  # Suspected Steps
 # Data storage for real-time graphing
 time_data, heart_rate_data, step_count_data = [], [], []
 
-# CSV File Setup
-CSV_FILE = "watch_data.csv"
-
-# Initialize CSV File with Headers
-with open(CSV_FILE, "w", newline="") as file:
-    writer = csv.writer(file)
-    writer.writerow(["Timestamp", "Heart Rate", "Step Count"])
+# Raw notifications are archived losslessly (replay with python -m backend.app.database.raw_archive)
+ARCHIVE_DIR = "raw_archive"
+archive = RawArchiveWriter(ARCHIVE_DIR)
 
 def extract_heart_rate(data):
     """Extracts heart rate from raw data (Assumption: First byte is HR)."""
@@ -36,6 +36,7 @@ def notification_handler(sender, data):
     int_values = list(data)  # Convert bytearray to list of integers
     hex_values = data.hex()  # Convert to hex for readability
     timestamp = datetime.datetime.now().strftime("%H:%M:%S")
+    archive.append(MAC_ADDRESS_FASTRACK, getattr(sender, "uuid", sender), data)
 
     print(f"\n[{timestamp}] Notification from {sender}:")
     print(f"  🔹 Raw Bytearray: {data}")
@@ -58,12 +59,6 @@ def notification_handler(sender, data):
             time_data.append(timestamp)
             step_count_data.append(step_count)
 
-    # Log only if values are found
-    if heart_rate or step_count:
-        with open(CSV_FILE, "a", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow([timestamp, heart_rate or "", step_count or ""])
-
 async def read_and_notify():
     """Connects to the smartwatch and enables notifications for heart rate and step count."""
     async with BleakClient(MAC_ADDRESS_FASTRACK) as client:
@@ -81,6 +76,7 @@ async def read_and_notify():
             # Stop notifications
             await client.stop_notify(HEART_RATE_UUID)
             await client.stop_notify(STEP_COUNT_UUID)
+            archive.close()
             print("⏹ Stopped notifications.")
 
 def update_graph(frame):
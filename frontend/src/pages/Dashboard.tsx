@@ -1,6 +1,6 @@
-import React from 'react';
+import React, { useEffect } from 'react';
 import { Brain, AlertTriangle } from 'lucide-react';
-import { useQuery } from '@tanstack/react-query';
+import { useQuery, useQueryClient } from '@tanstack/react-query';
 import { getLatestEmotions } from '../lib/db';
 
 
@@ -25,6 +25,31 @@ export function Dashboard() {
     queryFn: getLatestAlerts,
   });
 
+  // New alerts are pushed by the backend instead of re-fetching the list
+  const queryClient = useQueryClient();
+  useEffect(() => {
+    const source = new EventSource('http://localhost:5000/stream');
+    source.addEventListener('alert', (event) => {
+      const alert = JSON.parse((event as MessageEvent).data);
+      queryClient.setQueryData(['alerts'], (previous: any[] | undefined) =>
+        [alert, ...(previous ?? [])].slice(0, 10)
+      );
+    });
+    // Queued alerts move to Sent or Failed once the outbox has tried them
+    source.addEventListener('alert_status', (event) => {
+      const alert = JSON.parse((event as MessageEvent).data);
+      queryClient.setQueryData(['alerts'], (previous: any[] | undefined) =>
+        (previous ?? []).map((item) => (item.id === alert.id ? alert : item))
+      );
+    });
+    // Too much was missed while disconnected to replay; reload instead
+    source.addEventListener('reset', () => {
+      queryClient.invalidateQueries({ queryKey: ['alerts'] });
+      queryClient.invalidateQueries({ queryKey: ['emotions'] });
+    });
+    return () => source.close();
+  }, [queryClient]);
+
   const latestEmotion = emotions?.[0];
 
 
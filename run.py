@@ -0,0 +1,39 @@
+"""
+Serve the API.
+
+    python run.py                 Flask development server (WSGI, one thread per request)
+    python run.py --asgi          uvicorn (pip install uvicorn): /stream and the BLE
+                                  endpoints run on an event loop, other requests on
+                                  a thread pool
+"""
+import argparse
+import logging
+
+from backend.app.asgi import WSGI_WORKERS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the smartwatch API server.")
+    parser.add_argument("--asgi", action="store_true", help="Serve through uvicorn instead of the Flask dev server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--db", help="SQLite database (default: SMARTWATCH_DB or config.DB_NAME)")
+    parser.add_argument("--workers", type=int, default=WSGI_WORKERS, help="Threads for Flask requests in ASGI mode")
+    parser.add_argument("--debug", action="store_true", help="Flask debugger and reloader (WSGI mode only)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.asgi:
+        try:
+            import uvicorn
+        except ImportError:
+            parser.error("ASGI mode needs uvicorn: pip install uvicorn")
+        from backend.app.asgi import create_asgi_app
+        uvicorn.run(create_asgi_app(args.db, args.workers), host=args.host, port=args.port, log_level="warning")
+    else:
+        from backend.app import create_app
+        create_app(args.db).run(host=args.host, port=args.port, debug=args.debug, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Measure alert enqueue latency against a local stub SMS provider.
+
+The caller-side latency of send_alert (what a BLE notification handler pays)
+should stay flat whether the provider is fast, slow or down. After the run the
+alerts table is summarised by status (Queued / Sent / Failed).
+
+Usage: python scripts/benchmarks/bench_alert_dispatch.py [alerts]
+"""
+import contextlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.app.alerts.outbox import AlertOutbox
+
+
+class StubSmsProvider:
+    """Local stand-in for Twilio with a configurable delay and failure mode."""
+
+    def __init__(self, delay=0.0, down=False):
+        self.delay = delay
+        self.down = down
+        self.calls = 0
+
+    def send(self, message):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.down:
+            raise ConnectionError("stub SMS provider is down")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(name, provider, alerts, db_path):
+    outbox = AlertOutbox(db_path, provider, max_attempts=3, base_backoff=0.05).start()
+    latencies = []
+    # The outbox prints every delivery; keep the report readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(alerts):
+            started = time.perf_counter()
+            outbox.enqueue(f"Heart rate is above 120 (#{i})")
+            latencies.append(time.perf_counter() - started)
+        time.sleep(3.0)
+        outbox.stop()
+
+    counts = dict(outbox._conn.execute("SELECT status, COUNT(*) FROM alerts GROUP BY status").fetchall())
+    print(f"{name:<14} enqueue p50 {percentile(latencies, 50) * 1e6:8.1f} us  "
+          f"p99 {percentile(latencies, 99) * 1e6:8.1f} us  "
+          f"provider calls {provider.calls:5d}  statuses {counts}")
+
+
+def main():
+    alerts = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        run("fast provider", StubSmsProvider(), alerts, os.path.join(tmp, "fast.db"))
+        run("slow provider", StubSmsProvider(delay=2.0), alerts, os.path.join(tmp, "slow.db"))
+        run("provider down", StubSmsProvider(down=True), alerts, os.path.join(tmp, "down.db"))
+
+
+if __name__ == "__main__":
+    main()
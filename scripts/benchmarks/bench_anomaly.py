@@ -0,0 +1,106 @@
+"""
+Per-device anomaly detection throughput and persistence.
+
+Simulates --devices wearers with their own resting heart rate (55-115 BPM)
+and cadence, sending one sample per second. Halfway through, one wearer in
+fifty has a 2-minute episode of +35 BPM. Reports samples per second on one
+core, memory per device, how many samples the fixed "HR > 120" cut-off and
+the per-device z-score (|z| > 4) flag inside and outside the episodes, and
+the cost of checkpointing and restoring every baseline.
+
+Usage: python scripts/benchmarks/bench_anomaly.py [--devices 5000] [--seconds 600]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.app.database.connection import connect
+from backend.app.services.anomaly import COLUMNS, AnomalyDetector, create_baseline_table
+
+EPISODE_EVERY = 50  # one device in this many has an episode
+EPISODE_LENGTH = 120  # seconds
+EPISODE_RISE = 35  # BPM
+
+
+def make_devices(count, rng):
+    return [(f"watch-{i:05d}", rng.uniform(55, 115), rng.choice([0, 0, 60, 100])) for i in range(count)]
+
+
+def run(detector, devices, seconds, rng, start=1_700_000_000.0):
+    """Feed every device one sample per second. Returns (elapsed, flag counts)."""
+    flags = {"episode": 0, "episode_fixed": 0, "normal": 0, "normal_fixed": 0, "episode_samples": 0,
+             "normal_samples": 0}
+    steps = {device_id: 0 for device_id, _, _ in devices}
+    episode_start = seconds // 2
+    samples = []
+    for second in range(seconds):
+        for n, (device_id, resting, cadence) in enumerate(devices):
+            in_episode = n % EPISODE_EVERY == 0 and episode_start <= second < episode_start + EPISODE_LENGTH
+            heart_rate = round(resting + rng.gauss(0, 3) + (EPISODE_RISE if in_episode else 0))
+            steps[device_id] += int(cadence / 60 + rng.random())
+            samples.append((device_id, heart_rate, steps[device_id], start + second, in_episode))
+
+    observe = detector.observe
+    started = time.perf_counter()
+    results = [observe(device_id, heart_rate, step_count, now) for device_id, heart_rate, step_count, now, _ in samples]
+    elapsed = time.perf_counter() - started
+
+    for (_, heart_rate, _, _, in_episode), scores in zip(samples, results):
+        kind = "episode" if in_episode else "normal"
+        flags[f"{kind}_samples"] += 1
+        flags[f"{kind}_fixed"] += heart_rate > 120
+        flags[kind] += abs(scores.get("heart_rate_z", 0)) > 4
+    return elapsed, len(samples), flags
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Anomaly detector throughput and persistence.")
+    parser.add_argument("--devices", type=int, default=5000)
+    parser.add_argument("--seconds", type=int, default=600, help="simulated seconds of samples per device")
+    args = parser.parse_args()
+    rng = random.Random(7)
+    devices = make_devices(args.devices, rng)
+
+    detector = AnomalyDetector()
+    elapsed, count, flags = run(detector, devices, args.seconds, rng)
+    print(f"{args.devices} devices, {count} samples: {count / elapsed:,.0f} samples/s on one core "
+          f"({elapsed / count * 1e6:.2f} us per sample)")
+    print(f"{'':>16} {'episode samples':>16} {'normal samples':>15}")
+    print(f"{'HR > 120':>16} {flags['episode_fixed'] / flags['episode_samples']:>15.1%} "
+          f"{flags['normal_fixed'] / flags['normal_samples']:>15.1%}")
+    print(f"{'|z| > 4':>16} {flags['episode'] / flags['episode_samples']:>15.1%} "
+          f"{flags['normal'] / flags['normal_samples']:>15.1%}")
+
+    tracemalloc.start()
+    fresh = AnomalyDetector()
+    for device_id, resting, _ in devices:
+        fresh.observe(device_id, resting, 0, now=0)
+        fresh.observe(device_id, resting, 1, now=1)
+        fresh.observe(device_id, resting, 2, now=2)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"memory: {held / args.devices:.0f} bytes per device")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, "baselines.db"))
+        create_baseline_table(conn)
+        started = time.perf_counter()
+        written = detector.checkpoint(conn)
+        print(f"checkpoint: {written} baselines in {(time.perf_counter() - started) * 1000:.0f} ms")
+        restored = AnomalyDetector()
+        started = time.perf_counter()
+        loaded = restored.load(conn)
+        print(f"restore: {loaded} baselines in {(time.perf_counter() - started) * 1000:.0f} ms")
+        conn.close()
+        same = all(getattr(restored.baselines[device_id], column) == getattr(baseline, column)
+                   for device_id, baseline in detector.baselines.items() for column in COLUMNS)
+        print(f"restored baselines identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Compare the API under the Flask dev server (WSGI) and under uvicorn (ASGI).
+
+Each mode is started in its own process against a 10k row synthetic
+database, with BLE lookups simulated to take --ble-latency seconds. While
+--streams SSE clients stay connected to /stream and --connects clients keep
+calling /connect for watches that are not cached, --queries clients
+hammer /api/alerts and /history. A row is inserted every 200 ms to measure
+how quickly it reaches the stream clients.
+
+Reported per mode: query latency and throughput, /connect calls completed,
+SSE delivery latency and the number of threads in the server process.
+
+Usage: python scripts/benchmarks/bench_asgi.py [--streams 100] [--connects 20] [--queries 8] [--duration 10]
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else float("nan")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Server side --------------------------------------------------------------------
+
+def serve(mode, port, db_path, ble_latency):
+    import asyncio
+    from backend.app.services import ble_scanner
+
+    class SimulatedBleakScanner:
+        """Scans nothing; a targeted lookup takes ble_latency seconds and finds the watch."""
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+        async def start(self):
+            pass
+
+        async def stop(self):
+            pass
+
+        @classmethod
+        async def find_device_by_address(cls, address, timeout=10):
+            await asyncio.sleep(ble_latency)
+            return type("Device", (), {"address": address, "name": "Simulated Watch"})()
+
+    ble_scanner.BleakScanner = SimulatedBleakScanner
+
+    if mode == "wsgi":
+        from werkzeug.serving import make_server
+        from backend.app import create_app
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        # What app.run() uses: one thread per connection
+        make_server("127.0.0.1", port, create_app(db_path), threaded=True).serve_forever()
+    else:
+        import uvicorn
+        from backend.app.asgi import create_asgi_app
+        uvicorn.run(create_asgi_app(db_path), host="127.0.0.1", port=port, log_level="warning")
+
+
+# Client side --------------------------------------------------------------------
+
+def server_threads(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+def run_mode(mode, db_path, args):
+    port = free_port()
+    process = subprocess.Popen([sys.executable, __file__, "--serve", mode, "--port", str(port), "--db", db_path,
+                                "--ble-latency", str(args.ble_latency)])
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+                conn.request("GET", "/api/alerts")
+                conn.getresponse().read()
+                break
+            except OSError:
+                if time.time() > deadline or process.poll() is not None:
+                    raise RuntimeError(f"{mode} server did not start")
+                time.sleep(0.2)
+        return drive(port, process.pid, db_path, args)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def drive(port, pid, db_path, args):
+    stop = threading.Event()
+    lock = threading.Lock()
+    inserted = {}  # sensor_data id -> insert time
+    stats = {"query": [], "connect": [], "connect_errors": 0, "first_byte": [], "delivery": []}
+
+    def record(key, value):
+        with lock:
+            stats[key].append(value)
+
+    streams = []
+
+    def stream_client():
+        started = time.perf_counter()
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        try:
+            conn.request("GET", "/stream")
+            with lock:
+                streams.append(conn.sock)
+            response = conn.getresponse()
+            response.readline()  # "retry: ..." is sent as soon as the stream opens
+            record("first_byte", time.perf_counter() - started)
+            while not stop.is_set():
+                line = response.readline()
+                if not line:
+                    break
+                if line.startswith(b"data:"):
+                    payload = json.loads(line[5:])
+                    # Alerts carry ids of their own; only vitals map to inserted rows
+                    sent = inserted.get(payload["id"]) if "step_count" in payload else None
+                    if sent is not None:
+                        record("delivery", time.perf_counter() - sent)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def connect_client(n):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        i = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                conn.request("POST", f"/connect/AA:BB:CC:00:{n:02X}:{i % 256:02X}")
+                conn.getresponse().read()
+                record("connect", time.perf_counter() - started)
+            except OSError:
+                with lock:
+                    stats["connect_errors"] += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            i += 1
+        conn.close()
+
+    def query_client(n):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        urls = ["/api/alerts", "/history?limit=100", f"/history?device_id=watch-{n}&limit=100"]
+        i = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            conn.request("GET", urls[i % len(urls)])
+            conn.getresponse().read()
+            record("query", time.perf_counter() - started)
+            i += 1
+        conn.close()
+
+    def writer():
+        db = sqlite3.connect(db_path)
+        i = 0
+        while not stop.is_set():
+            cursor = db.execute(
+                "INSERT INTO sensor_data (timestamp, heart_rate, step_count, battery_level, device_id, emotion) "
+                "VALUES (datetime('now'), ?, ?, 80, 'bench-watch', 'Neutral')", (70 + i % 20, i))
+            db.commit()
+            inserted[cursor.lastrowid] = time.perf_counter()
+            i += 1
+            stop.wait(0.2)
+        db.close()
+
+    threads = [threading.Thread(target=stream_client, daemon=True) for _ in range(args.streams)]
+    for thread in threads:
+        thread.start()
+    time.sleep(1)  # let the streams subscribe before rows are written
+    threads += [threading.Thread(target=connect_client, args=(n,), daemon=True) for n in range(args.connects)]
+    threads += [threading.Thread(target=query_client, args=(n,), daemon=True) for n in range(args.queries)]
+    threads.append(threading.Thread(target=writer, daemon=True))
+    for thread in threads[args.streams:]:
+        thread.start()
+    time.sleep(args.duration)
+    threads_in_server = server_threads(pid)
+    stop.set()
+    for sock in streams:
+        # Unblocks the stream clients' reads
+        sock.shutdown(socket.SHUT_RDWR)
+    for thread in threads:
+        thread.join(timeout=args.ble_latency + 5)
+
+    return {
+        "query_p50_ms": percentile(stats["query"], 50) * 1000,
+        "query_p99_ms": percentile(stats["query"], 99) * 1000,
+        "queries_per_s": len(stats["query"]) / args.duration,
+        "connects": len(stats["connect"]),
+        "connect_p50_s": percentile(stats["connect"], 50),
+        "streams_open": len(stats["first_byte"]),
+        "delivery_p50_ms": percentile(stats["delivery"], 50) * 1000,
+        "delivery_p99_ms": percentile(stats["delivery"], 99) * 1000,
+        "server_threads": threads_in_server,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare WSGI and ASGI serving under mixed load.")
+    parser.add_argument("--streams", type=int, default=100, help="concurrent /stream clients")
+    parser.add_argument("--connects", type=int, default=20, help="concurrent /connect clients")
+    parser.add_argument("--queries", type=int, default=8, help="concurrent /api/alerts and /history clients")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load per mode")
+    parser.add_argument("--ble-latency", type=float, default=2.0, help="seconds a simulated BLE lookup takes")
+    parser.add_argument("--modes", default="wsgi,asgi")
+    parser.add_argument("--serve", choices=["wsgi", "asgi"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.db, args.ble_latency)
+        return
+
+    from synthetic_db import build
+
+    print(f"{args.streams} streams, {args.connects} /connect clients ({args.ble_latency}s BLE), "
+          f"{args.queries} query clients, {args.duration}s per mode")
+    print(f"{'mode':>5} {'query p50':>10} {'query p99':>10} {'queries/s':>10} {'connects':>9} "
+          f"{'streams':>8} {'sse p50':>8} {'sse p99':>8} {'threads':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in args.modes.split(","):
+            db_path = build(os.path.join(tmp, f"{mode}.db"), 10_000)
+            r = run_mode(mode, db_path, args)
+            print(f"{mode:>5} {r['query_p50_ms']:>8.1f}ms {r['query_p99_ms']:>8.1f}ms {r['queries_per_s']:>10.0f} "
+                  f"{r['connects']:>9} {r['streams_open']:>8} {r['delivery_p50_ms']:>6.0f}ms "
+                  f"{r['delivery_p99_ms']:>6.0f}ms {r['server_threads'] or '-':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compare opening a SQLite connection per request with the shared ConnectionPool.
+
+Simulates concurrent dashboard clients calling the /api/alerts and /history
+queries from several threads and reports per-request latency and requests
+per second for both strategies.
+
+Usage: python scripts/benchmarks/bench_db_pool.py [requests_per_client]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.app.database.connection import ConnectionPool
+from backend.app.database.history import ensure_history_indexes, fetch_history
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+from bench_history import generate
+
+CLIENTS = [1, 8, 32]
+ALERTS_QUERY = "SELECT id, message, timestamp, status FROM alerts ORDER BY timestamp DESC LIMIT 10"
+
+
+def handle_request(conn, i):
+    if i % 2:
+        return conn.execute(ALERTS_QUERY).fetchall()
+    return fetch_history(conn, limit=100)[0]
+
+
+def per_request(db_path):
+    def run(i):
+        conn = sqlite3.connect(db_path)
+        try:
+            return handle_request(conn, i)
+        finally:
+            conn.close()
+    return run
+
+
+def pooled(pool):
+    def run(i):
+        with pool.connection() as conn:
+            return handle_request(conn, i)
+    return run
+
+
+def bench(run, clients, requests):
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        mine = []
+        for i in range(requests):
+            started = time.perf_counter()
+            run(i)
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000, len(latencies) / elapsed
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "pool.db")
+        conn = generate(db_path, 100_000)
+        conn.execute("CREATE TABLE alerts (id INTEGER PRIMARY KEY AUTOINCREMENT, message TEXT NOT NULL, "
+                     "timestamp TEXT NOT NULL, status TEXT NOT NULL)")
+        conn.executemany("INSERT INTO alerts (message, timestamp, status) VALUES (?, ?, 'Sent')",
+                         [(f"alert {i}", f"2025-01-01 00:00:{i % 60:02d}") for i in range(1000)])
+        ensure_history_indexes(conn)
+        conn.close()
+
+        pool = ConnectionPool(db_path)
+        print(f"{'clients':>8} {'mode':>12} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>10}")
+        for clients in CLIENTS:
+            for name, run in (("per-request", per_request(db_path)), ("pooled", pooled(pool))):
+                p50, p99, rps = bench(run, clients, requests)
+                print(f"{clients:>8} {name:>12} {p50:>8.3f} {p99:>8.3f} {rps:>10.0f}")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Drastic change detection for 10,000 simulated devices.
+
+Each device sends a slowly drifting heart rate, step count and SpO2, so a
+correct detector raises no alerts. The old single previous_data dict
+compares every reading with whichever device happened to write last and
+raises false alerts; the per-device store does not. Also reports readings
+per second from several threads with one lock versus sharded locks, the
+memory held per device, and the cost of an idle sweep.
+
+Usage: python scripts/benchmarks/bench_device_state.py [devices] [readings_per_device]
+"""
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.app.services.device_state import DeviceStateStore
+from backend.app.services.draastic_changes import detect_drastic_change
+
+THREADS = 8
+NO_CHANGE = "✅ No drastic changes detected."
+
+
+def make_readings(devices, per_device):
+    """Interleaved (device_id, heart_rate, steps, spo2) readings, in order per device."""
+    rng = random.Random(42)
+    state = {f"watch-{i:05d}": [rng.randint(55, 110), rng.randint(0, 20_000), rng.randint(93, 99)]
+             for i in range(devices)}
+    readings = []
+    for _ in range(per_device):
+        for device_id, values in state.items():
+            values[0] += rng.randint(-3, 3)
+            values[1] += rng.randint(0, 20)
+            readings.append((device_id, values[0], values[1], values[2]))
+    return readings
+
+
+def legacy_false_alerts(readings):
+    """The old module-global previous_data: one slot shared by every device."""
+    previous = None
+    alerts = 0
+    for _, heart_rate, steps, spo2 in readings:
+        if previous is not None and (abs(heart_rate - previous[0]) >= 30 or abs(steps - previous[1]) >= 500
+                                     or abs(spo2 - previous[2]) >= 5):
+            alerts += 1
+        previous = (heart_rate, steps, spo2)
+    return alerts
+
+
+def threaded(readings, shards):
+    """Readings per second with THREADS workers, each owning a slice of the devices."""
+    store = DeviceStateStore(shards=shards)
+    alerts = [0] * THREADS
+    by_worker = [[] for _ in range(THREADS)]
+    for reading in readings:
+        by_worker[hash(reading[0]) % THREADS].append(reading)
+
+    def worker(n):
+        for device_id, heart_rate, steps, spo2 in by_worker[n]:
+            if detect_drastic_change(heart_rate, steps, spo2, device_id=device_id, states=store) != NO_CHANGE:
+                alerts[n] += 1
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(readings) / (time.perf_counter() - started), sum(alerts)
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    per_device = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    readings = make_readings(devices, per_device)
+    print(f"{devices} devices, {len(readings)} readings, {THREADS} threads")
+    print(f"{'store':>16} {'readings/s':>12} {'false alerts':>13}")
+    print(f"{'global dict':>16} {'-':>12} {legacy_false_alerts(readings):>13}")
+    for shards in (1, 64):
+        rate, alerts = threaded(readings, shards)
+        print(f"{f'{shards} shard(s)':>16} {rate:>12.0f} {alerts:>13}")
+
+    tracemalloc.start()
+    store = DeviceStateStore()
+    for device_id, heart_rate, steps, spo2 in readings[:devices]:
+        store.swap(device_id, heart_rate, steps, spo2, now=0)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"memory: {held / devices:.0f} bytes per device")
+
+    started = time.perf_counter()
+    evicted = store.evict_idle(now=store.idle_ttl + 1)
+    print(f"idle sweep: {evicted} devices evicted in {(time.perf_counter() - started) * 1000:.1f} ms, {len(store)} left")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Emotion model throughput: micro-batched versus per-sample inference.
+
+Windows are synthesized as in scripts/train_emotion_model.py. Reports the
+cost of classify_batch by batch size, then offers windows at increasing
+rates from one thread, the way the supervisor's event loop produces them
+for every watch:
+  - per-sample: the thread classifies each window inline before taking
+    the next one, so it falls behind once a window costs more than the gap
+    between arrivals,
+  - micro-batched: the thread submits to EmotionService, whose worker
+    classifies whatever arrived within --max-wait-ms together.
+Latency is measured from a window's scheduled arrival to its result.
+
+Usage: python scripts/benchmarks/bench_emotion.py [--windows 20000] [--rates 1000,5000,20000,50000] [--max-wait-ms 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.app.services.emotion_ml import EmotionService, EmotionServiceBusy
+from train_emotion_model import PATTERNS, synthesize
+
+BATCH_SIZES = [1, 8, 32, 128, 256]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def make_windows(count, rng):
+    per_label = count // len(PATTERNS) + 1
+    windows = [window for label in PATTERNS for window in synthesize(label, per_label, rng)]
+    order = rng.permutation(len(windows))[:count]
+    # Plain lists, as SlidingWindow.samples() returns them
+    return [tuple(list(values) for values in windows[i]) for i in order]
+
+
+def offer(windows, rate, handle):
+    """Call handle(window, scheduled) for each window at `rate` windows per second. Returns the start time."""
+    interval = 1.0 / rate
+    started = time.perf_counter()
+    for i, window in enumerate(windows):
+        scheduled = started + i * interval
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            # Sleeping releases the GIL for the batcher; a late producer catches up in a burst
+            time.sleep(delay)
+        handle(window, scheduled)
+    return started
+
+
+def per_sample(service, windows, rate):
+    latencies = []
+
+    def inline(window, scheduled):
+        service.classify(*window)
+        latencies.append(time.perf_counter() - scheduled)
+
+    started = offer(windows, rate, inline)
+    return time.perf_counter() - started, latencies, ""
+
+
+def micro_batched(service, windows, rate):
+    service.stats["max_batch"] = 0
+    service.start()
+    latencies = []
+    refused = []
+
+    def submit(window, scheduled):
+        try:
+            future = service.submit(*window)
+        except EmotionServiceBusy:
+            refused.append(window)
+            return
+        future.add_done_callback(lambda _: latencies.append(time.perf_counter() - scheduled))
+
+    started = offer(windows, rate, submit)
+    service.close()
+    return (time.perf_counter() - started, latencies,
+            f"   largest batch {service.stats['max_batch']}, refused {len(refused)}")
+
+
+def report(name, count, seconds, latencies=None, extra=""):
+    line = f"{name:<20} {count / seconds:>10,.0f} windows/s"
+    if latencies:
+        line += f"   p50 {percentile(latencies, 50) * 1000:6.2f} ms   p99 {percentile(latencies, 99) * 1000:6.2f} ms"
+    print(line + extra)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batched versus per-sample emotion inference.")
+    parser.add_argument("--windows", type=int, default=20000)
+    parser.add_argument("--rates", default="1000,5000,20000,50000", help="offered windows per second")
+    parser.add_argument("--seconds", type=float, default=1.0, help="length of each offered-load run")
+    parser.add_argument("--max-wait-ms", type=float, default=3.0)
+    args = parser.parse_args()
+    windows = make_windows(args.windows, np.random.default_rng(11))
+    rates = [int(rate) for rate in args.rates.split(",")]
+    service = EmotionService(max_wait=args.max_wait_ms / 1000)
+
+    print(f"{len(windows)} windows of up to 64 samples\n")
+    print("classify_batch by batch size:")
+    for size in BATCH_SIZES:
+        batches = [windows[i:i + size] for i in range(0, min(len(windows), size * 200), size)]
+        started = time.perf_counter()
+        for batch in batches:
+            service.classify_batch(batch)
+        report(f"  batch of {size}", sum(len(batch) for batch in batches), time.perf_counter() - started)
+
+    for rate in rates:
+        offered = windows[:min(len(windows), int(rate * args.seconds))]
+        print(f"\noffered {rate:,} windows/s ({len(offered)} windows):")
+        for name, run in (("  per-sample", per_sample), ("  micro-batched", micro_batched)):
+            seconds, latencies, extra = run(service, offered, rate)
+            report(name, len(latencies), seconds, latencies, extra)
+
+
+if __name__ == "__main__":
+    main()
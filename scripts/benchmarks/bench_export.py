@@ -0,0 +1,101 @@
+"""
+Bulk export throughput and memory against generated databases.
+
+Every export is run twice into a null sink: once for throughput and once
+under tracemalloc for its peak heap (plus pyarrow's memory pool for
+Parquet and Arrow). RSS is not used because the pooled connections map up
+to 256 MB of the database file, which counts towards RSS without being
+held by the export. The streaming export is compared with the hand-written
+approach it replaces, fetchall() of the whole table followed by csv.writer:
+the stream's peak should stay flat as the table grows while fetchall's
+grows with it. Parquet and Arrow are skipped without pyarrow.
+
+Usage: python scripts/benchmarks/bench_export.py [rows ...]   (default: 100000 1000000)
+"""
+import csv
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.app.database.connection import get_connection
+from backend.app.database.export import EXPORT_COLUMNS, ExportStats, stream_export
+from synthetic_db import cached
+
+
+class NullSink(io.RawIOBase):
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return len(data)
+
+
+def fetchall_export(db_path):
+    """What ad-hoc exports did before: the whole table in memory, then written out."""
+    with get_connection(db_path) as conn:
+        rows = conn.execute(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM sensor_data ORDER BY timestamp, id").fetchall()
+    writer = csv.writer(io.TextIOWrapper(NullSink(), newline=""))
+    writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(rows)
+    return len(rows)
+
+
+def stream(db_path, export_format):
+    stats = ExportStats(export_format)
+    for _ in stream_export(db_path, export_format, stats=stats):
+        pass
+    return stats.rows
+
+
+def peak_memory(function, *args):
+    """Peak bytes allocated while function runs (Python heap plus pyarrow's pool)."""
+    pool = None
+    try:
+        import pyarrow
+        pool = pyarrow.default_memory_pool()
+        pool.release_unused()
+    except ImportError:
+        pass
+    arrow_before = pool.max_memory() if pool is not None else 0
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if pool is not None:
+        peak += max(0, pool.max_memory() - arrow_before)
+    return peak
+
+
+def has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    formats = ["csv", "parquet", "arrow"] if has_pyarrow() else ["csv"]
+    exports = [("fetchall + csv", fetchall_export)] + [
+        (f"stream {export_format}", lambda db_path, export_format=export_format: stream(db_path, export_format))
+        for export_format in formats
+    ]
+
+    print(f"{'rows':>10} {'export':>16} {'rows/s':>12} {'peak MB':>9}")
+    for rows in sizes:
+        db_path = cached(rows)
+        for name, export in exports:
+            started = time.perf_counter()
+            exported = export(db_path)
+            seconds = time.perf_counter() - started
+            assert exported == rows, (name, exported, rows)
+            peak = peak_memory(export, db_path)
+            print(f"{rows:>10} {name:>16} {rows / seconds:>12,.0f} {peak / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare POST /check_health (one reading per request) with /check_health/batch.
+
+Drives the health_routes blueprint through Flask's test client, so the
+numbers include request parsing and JSON responses but no network. Batches
+are sent as NDJSON and as JSON arrays and are stored in sensor_data.
+
+Usage: python scripts/benchmarks/bench_health_batch.py [readings] [batch_size]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+DEVICES = 100
+
+
+def make_readings(count):
+    return [{
+        "device_id": f"gateway-watch-{i % DEVICES}",
+        "heart_rate": 60 + (i // DEVICES) % 40,
+        "steps": i // DEVICES * 3,
+        "spo2": 97,
+        "timestamp": f"2025-01-01T{(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d}",
+    } for i in range(count)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The database path is read from the environment when config is imported
+        os.environ["SMARTWATCH_DB"] = os.path.join(tmp, "batch.db")
+        from backend.app import create_app
+        from backend.app.database.connection import connect
+
+        conn = connect()
+        conn.execute("""
+            CREATE TABLE sensor_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                heart_rate INTEGER, step_count INTEGER, battery_level INTEGER,
+                device_id TEXT, emotion TEXT,
+                UNIQUE(timestamp, heart_rate, step_count, battery_level, device_id)
+            )
+        """)
+        conn.close()
+
+        client = create_app().test_client()
+        readings = make_readings(count)
+
+        print(f"{'mode':>12} {'readings':>9} {'seconds':>8} {'readings/s':>11} {'speed-up':>9}")
+        single = min(count, 2000)
+        started = time.perf_counter()
+        for reading in readings[:single]:
+            client.post("/check_health", json=reading)
+        baseline = single / (time.perf_counter() - started)
+        print(f"{'single':>12} {single:>9} {single / baseline:>8.2f} {baseline:>11.0f} {1.0:>9.1f}")
+
+        bodies = {
+            "ndjson": ("application/x-ndjson", lambda batch: "\n".join(json.dumps(r) for r in batch)),
+            "json array": ("application/json", json.dumps),
+        }
+        for mode, (content_type, encode) in bodies.items():
+            payloads = [encode(readings[i:i + batch_size]) for i in range(0, count, batch_size)]
+            started = time.perf_counter()
+            for payload in payloads:
+                response = client.post("/check_health/batch", data=payload, content_type=content_type)
+                assert response.status_code == 200, response.get_json()
+            elapsed = time.perf_counter() - started
+            rate = count / elapsed
+            print(f"{mode:>12} {count:>9} {elapsed:>8.2f} {rate:>11.0f} {rate / baseline:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark /history queries against generated databases of increasing size.
+
+Compares the old unindexed "ORDER BY timestamp DESC LIMIT 500" query with
+keyset-paginated fetch_history (first page, a deep page reached through the
+cursor, and a device + time range filter).
+
+Usage: python scripts/benchmarks/bench_history.py [rows ...]
+       (default: 10000 1000000; 50000000 works but takes a while to generate)
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.app.database.history import ensure_history_indexes, fetch_history
+
+DEVICES = 100
+LEGACY_QUERY = ("SELECT timestamp, heart_rate, step_count, battery_level, device_id, emotion "
+                "FROM sensor_data ORDER BY timestamp DESC LIMIT 500")
+
+
+def generate(db_path, rows):
+    """Create a sensor_data table with `rows` readings spread over DEVICES watches."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("""
+        CREATE TABLE sensor_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            heart_rate INTEGER,
+            step_count INTEGER,
+            battery_level INTEGER,
+            device_id TEXT,
+            emotion TEXT
+        )
+    """)
+    start = datetime(2025, 1, 1)
+    seconds_per_row = max(1, 30 * 24 * 3600 // rows)
+
+    def samples():
+        for i in range(rows):
+            ts = (start + timedelta(seconds=i * seconds_per_row)).strftime('%Y-%m-%d %H:%M:%S')
+            yield ts, 60 + i % 60, i, 80, f"watch-{i % DEVICES}", "Neutral"
+
+    conn.executemany(
+        "INSERT INTO sensor_data (timestamp, heart_rate, step_count, battery_level, device_id, emotion) "
+        "VALUES (?, ?, ?, ?, ?, ?)", samples()
+    )
+    conn.commit()
+    return conn
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def bench(rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = generate(os.path.join(tmp, "history.db"), rows)
+        legacy_ms, _ = timed(lambda: conn.execute(LEGACY_QUERY).fetchall(), repeat=3)
+
+        ensure_history_indexes(conn)
+        first_ms, (_, cursor) = timed(lambda: fetch_history(conn))
+        for _ in range(20):
+            _, cursor = fetch_history(conn, cursor=cursor)
+        deep_ms, _ = timed(lambda: fetch_history(conn, cursor=cursor))
+        range_ms, _ = timed(lambda: fetch_history(conn, device_id="watch-7", start="2025-01-10 00:00:00",
+                                                  end="2025-01-20 00:00:00", limit=100))
+        conn.close()
+    print(f"{rows:>10} {legacy_ms:>12.2f} {first_ms:>12.2f} {deep_ms:>12.2f} {range_ms:>12.2f}")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 1_000_000]
+    print(f"{'rows':>10} {'legacy ms':>12} {'page 1 ms':>12} {'page 21 ms':>12} {'range ms':>12}")
+    for rows in sizes:
+        bench(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Multi-process ingestion: the shared-memory ring, and end-to-end scaling.
+
+1. Hand-off: one producer process sends heart rate notifications to this
+   process, once through a ShmRing and once through a multiprocessing.Queue
+   of dicts (pickled per record), and the records per second received are
+   compared.
+
+2. End to end: fake watches notifying every --interval seconds, run by the
+   single-process WatchSupervisor and by the IngestGateway with 1, 2 and 4
+   collector processes, reporting heart rate samples handled per second by
+   the analytics and storage side. The fake clients cost next to nothing,
+   so --ble-cost (milliseconds of CPU per notification, default 0.2) stands
+   in for the work bleak and D-Bus do per notification on a real adapter;
+   that is the work the collectors take off the ingest process.
+
+Usage: python scripts/benchmarks/bench_ingest.py [--records N] [--watches N] [--interval S]
+                                                  [--ble-cost MS] [--duration S]
+"""
+import argparse
+import asyncio
+import contextlib
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.app.database.sensor_writer import SensorDataWriter
+from backend.app.services.anomaly import AnomalyDetector
+from backend.app.services.emotion_ml import EmotionService
+from backend.app.services.gatt_cache import GattCache
+from backend.app.services.geolocation import StaticLocationBackend, location_provider
+from backend.app.services.shm_ring import HEART_RATE, ShmRing
+from fake_ble import FakeBleakClient, heart_rate_payload
+from ingest_gateway import IngestGateway
+from watch_supervisor import WatchSupervisor
+from watchdetails import HEART_RATE_NOTIFICATIONS, SmartWatchReader
+
+COLLECTOR_COUNTS = [1, 2, 4]
+ADDRESS = "FA:KE:00:00:00:01"
+
+# No IP geolocation lookups while benchmarking
+location_provider.backend = StaticLocationBackend(0.0, 0.0)
+
+
+# Hand-off ------------------------------------------------------------------
+
+def produce_ring(name, records):
+    ring = ShmRing.attach(name)
+    payload = heart_rate_payload(72)
+    sent = 0
+    while sent < records:
+        if ring.push(HEART_RATE, ADDRESS, payload):
+            sent += 1
+    ring.close()
+
+
+def produce_queue(queue, records):
+    payload = heart_rate_payload(72)
+    for _ in range(records):
+        queue.put({"kind": HEART_RATE, "address": ADDRESS, "payload": payload, "received": time.time()})
+
+
+def ring_handoff(context, records):
+    # Smaller than the record count, so the producer waits on a full ring as the queue's would block
+    ring = ShmRing.create(4096)
+    producer = context.Process(target=produce_ring, args=(ring.name, records))
+    started = time.perf_counter()
+    producer.start()
+    received = 0
+    while received < records:
+        batch = ring.pop_many()
+        received += len(batch)
+    seconds = time.perf_counter() - started
+    producer.join()
+    ring.close()
+    return records / seconds
+
+
+def queue_handoff(context, records):
+    queue = context.Queue(4096)
+    producer = context.Process(target=produce_queue, args=(queue, records))
+    started = time.perf_counter()
+    producer.start()
+    for _ in range(records):
+        queue.get()
+    seconds = time.perf_counter() - started
+    producer.join()
+    return records / seconds
+
+
+# End to end ----------------------------------------------------------------
+
+class BusyBleakClient(FakeBleakClient):
+    """FakeBleakClient that spends `ble_cost` seconds of CPU before delivering each notification."""
+
+    def __init__(self, address, ble_cost=0.0, **kwargs):
+        super().__init__(address, **kwargs)
+        self.ble_cost = ble_cost
+
+    async def start_notify(self, uuid, callback):
+        def deliver(sender, data):
+            until = time.perf_counter() + self.ble_cost
+            while time.perf_counter() < until:
+                pass
+            callback(sender, data)
+        await super().start_notify(uuid, deliver)
+
+
+async def run_supervisor(addresses, client_factory, duration, db_path):
+    writer = SensorDataWriter(db_path).start()
+    anomaly_detector = AnomalyDetector(db_path).start()
+    emotion_service = EmotionService().start()
+    supervisor = WatchSupervisor(
+        reader_factory=lambda address: SmartWatchReader(address, client_factory=client_factory, db_path=db_path,
+                                                        writer=writer, gatt_cache=GattCache(),
+                                                        anomaly_detector=anomaly_detector,
+                                                        emotion_service=emotion_service),
+        writer=writer,
+    )
+    for address in addresses:
+        await supervisor.add_watch(address)
+    await asyncio.sleep(duration)
+    handled = HEART_RATE_NOTIFICATIONS.value()
+    await supervisor.stop()
+    emotion_service.close()
+    writer.close()
+    anomaly_detector.close()
+    return handled, 0
+
+
+async def run_gateway(registry_path, processes, client_factory, duration, db_path):
+    gateway = IngestGateway(registry_path, processes=processes, db_path=db_path, client_factory=client_factory)
+    task = asyncio.create_task(gateway.run())
+    await asyncio.sleep(duration)
+    handled = HEART_RATE_NOTIFICATIONS.value()
+    dropped = sum(ring.dropped for ring in gateway.rings)
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+    return handled, dropped
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence stdout, including that of collector processes started meanwhile."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+        os.close(devnull)
+
+
+def end_to_end(name, run, duration, *args):
+    with tempfile.TemporaryDirectory() as tmp:
+        before = HEART_RATE_NOTIFICATIONS.value()
+        # The readers print every sample; keep the report readable
+        with quiet():
+            handled, dropped = asyncio.run(run(*args, duration, os.path.join(tmp, "bench.db")))
+    print(f"{name:>18} {(handled - before) / duration:>12,.0f} {dropped:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=500_000, help="Records per hand-off run")
+    parser.add_argument("--watches", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between a watch's notifications")
+    parser.add_argument("--ble-cost", type=float, default=0.2, help="Simulated BLE stack CPU per notification, ms")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per end-to-end run")
+    args = parser.parse_args()
+    context = multiprocessing.get_context("spawn")
+
+    print(f"{'hand-off':>18} {'records/s':>12}")
+    print(f"{'shm ring':>18} {ring_handoff(context, args.records):>12,.0f}")
+    print(f"{'mp.Queue (pickle)':>18} {queue_handoff(context, args.records):>12,.0f}")
+
+    addresses = [f"FA:KE:00:00:{i // 256:02X}:{i % 256:02X}" for i in range(args.watches)]
+    client_factory = functools.partial(BusyBleakClient, ble_cost=args.ble_cost / 1000, hr_interval=args.interval,
+                                       step_interval=1.0)
+    offered = args.watches / args.interval
+    print(f"\n{args.watches} watches offering {offered:,.0f} heart rate samples/s, "
+          f"{args.ble_cost} ms BLE cost each, {os.cpu_count()} CPUs")
+    print(f"{'ingestion':>18} {'samples/s':>12} {'dropped':>9}")
+    end_to_end("single process", run_supervisor, args.duration, addresses, client_factory)
+    with tempfile.TemporaryDirectory() as tmp:
+        registry_path = os.path.join(tmp, "watches.json")
+        with open(registry_path, "w") as f:
+            json.dump([{"address": address} for address in addresses], f)
+        for processes in COLLECTOR_COUNTS:
+            end_to_end(f"{processes} collector(s)", run_gateway, args.duration, registry_path, processes,
+                       client_factory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Rule engine throughput as the rule set grows.
+
+For each rule count, synthetic threshold and change rules are spread over
+heart rate, steps and SpO2 and 200k drifting samples are evaluated. The
+thresholds lie outside the range the samples move in, as alert thresholds
+do for a healthy wearer, so almost nothing fires. The compiled engine is
+compared with checking every rule in turn, which is what the separate
+hard-coded checks amounted to. Also reports the cost of each entry point
+with the shipped rule file and of recompiling on reload.
+
+Usage: python scripts/benchmarks/bench_rules.py [samples] [rule_counts]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.app.services.device_state import DeviceStateStore
+from backend.app.services.draastic_changes import detect_drastic_change
+from backend.app.services.rules import OPERATORS, RuleEngine, RuleSet, rule_engine
+
+# Range the samples stay within per metric
+METRICS = {"heart_rate": (45, 190), "steps": (0, 20_000_000), "spo2": (85, 100)}
+
+
+def make_spec(count, rng):
+    rules = []
+    for i in range(count):
+        metric = rng.choice(list(METRICS))
+        low, high = METRICS[metric]
+        change = rng.choice([None, None, "abs", "rise"])
+        if change is None:
+            operator = rng.choice(list(OPERATORS))
+            margin = rng.random() * (high - low)
+            threshold = high + margin if operator in ("above", "at_least") else low - margin
+        else:
+            operator = rng.choice(["above", "at_least"])
+            threshold = rng.randint(50, 500)
+        rule = {"name": f"rule_{i}", "metric": metric, operator: round(threshold, 1),
+                "action": rng.choice(["alert", "report"])}
+        if change is not None:
+            rule["change"] = change
+        rules.append(rule)
+    return {"rules": rules}
+
+
+def make_samples(count, rng):
+    samples = []
+    heart_rate, steps, spo2 = 80, 5000, 97
+    for _ in range(count):
+        heart_rate = min(190, max(45, heart_rate + rng.randint(-4, 4)))
+        steps += rng.randint(0, 30)
+        spo2 = min(100, max(85, spo2 + rng.randint(-1, 1)))
+        samples.append({"heart_rate": heart_rate, "steps": steps, "spo2": spo2})
+    return samples
+
+
+def linear(rules, samples):
+    """Every rule checked against every sample."""
+    compiled = [(rule.metric, rule.change, rule.threshold, rule.above, rule.inclusive) for rule in rules]
+    fired = 0
+    previous = None
+    for sample in samples:
+        for metric, change, threshold, above, inclusive in compiled:
+            value = sample[metric]
+            if change is not None:
+                if previous is None:
+                    continue
+                value = abs(value - previous[metric]) if change == "abs" else value - previous[metric]
+            if above:
+                hit = value >= threshold if inclusive else value > threshold
+            else:
+                hit = value <= threshold if inclusive else value < threshold
+            fired += hit
+        previous = sample
+    return fired
+
+
+def engine(rule_engine, samples):
+    fired = 0
+    previous = None
+    for sample in samples:
+        evaluation = rule_engine.evaluate(sample, "watch-1", previous=previous)
+        fired += len(evaluation.alerts) + len(evaluation.reports)
+        previous = sample
+    return fired
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    samples_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    counts = [int(n) for n in sys.argv[2].split(",")] if len(sys.argv) > 2 else [6, 50, 500, 5000]
+    rng = random.Random(42)
+    samples = make_samples(samples_count, rng)
+
+    print(f"{samples_count} samples")
+    print(f"{'rules':>6} {'engine us/sample':>17} {'linear us/sample':>17} {'fired':>9} {'compile ms':>11}")
+    for count in counts:
+        spec = make_spec(count, rng)
+        compile_seconds, ruleset = timed(RuleSet, spec)
+        engine_seconds, engine_fired = timed(engine, RuleEngine(path=None, spec=spec), samples)
+        rules = list(ruleset.compiled().rules.values())
+        linear_seconds, linear_fired = timed(linear, rules, samples)
+        assert engine_fired == linear_fired, (engine_fired, linear_fired)
+        print(f"{count:>6} {engine_seconds / samples_count * 1e6:>17.2f} {linear_seconds / samples_count * 1e6:>17.2f} "
+              f"{engine_fired:>9} {compile_seconds * 1000:>11.1f}")
+
+    print("\nshipped rule file, per call:")
+    store = DeviceStateStore()
+    seconds, _ = timed(lambda: [detect_drastic_change(s["heart_rate"], s["steps"], s["spo2"], states=store)
+                                for s in samples])
+    print(f"  detect_drastic_change    {seconds / samples_count * 1e6:.2f} us")
+    seconds, _ = timed(lambda: [rule_engine.evaluate(s, "watch-1", "watch") for s in samples])
+    print(f"  watch sample (emotion)   {seconds / samples_count * 1e6:.2f} us")
+    seconds, _ = timed(lambda: [rule_engine.classify("window_emotion", s["heart_rate"], source="window") for s in samples])
+    print(f"  window emotion           {seconds / samples_count * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Compare per-sample commits with the write-behind SensorDataWriter.
+
+Reports how long the caller (the notification handler) is blocked per sample
+and the sustained number of samples per second that reach the database.
+
+Usage: python scripts/benchmarks/bench_sensor_writer.py [samples]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.app.database.sensor_writer import INSERT_SENSOR_DATA, SensorDataWriter
+
+CREATE_SENSOR_DATA = """
+    CREATE TABLE sensor_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        heart_rate INTEGER,
+        step_count INTEGER,
+        battery_level INTEGER,
+        device_id TEXT,
+        emotion TEXT,
+        UNIQUE(timestamp, heart_rate, step_count, battery_level, device_id)
+    )
+"""
+
+
+def make_sample(i):
+    return (f"2025-02-17 15:{(i // 60) % 60:02d}:{i % 60:02d}", 60 + i % 40, i, 80, f"FA:KE:{i % 1000:04d}", "Neutral")
+
+
+def bench_commit_per_sample(db_path, samples):
+    conn = sqlite3.connect(db_path)
+    conn.execute(CREATE_SENSOR_DATA)
+    started = time.perf_counter()
+    for i in range(samples):
+        conn.execute(INSERT_SENSOR_DATA, make_sample(i))
+        conn.commit()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed / samples, samples / elapsed
+
+
+def bench_write_behind(db_path, samples):
+    conn = sqlite3.connect(db_path)
+    conn.execute(CREATE_SENSOR_DATA)
+    conn.close()
+    writer = SensorDataWriter(db_path).start()
+    started = time.perf_counter()
+    for i in range(samples):
+        writer.submit(*make_sample(i))
+    submit_elapsed = time.perf_counter() - started
+    writer.close()
+    total_elapsed = time.perf_counter() - started
+    return submit_elapsed / samples, samples / total_elapsed, writer.stats
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as tmp:
+        per_sample, rate = bench_commit_per_sample(os.path.join(tmp, "commit.db"), samples)
+        print(f"commit per sample : {per_sample * 1e6:9.1f} us blocked/sample, {rate:10.0f} samples/s")
+
+        per_sample, rate, stats = bench_write_behind(os.path.join(tmp, "writer.db"), samples)
+        print(f"write-behind      : {per_sample * 1e6:9.1f} us blocked/sample, {rate:10.0f} samples/s "
+              f"({stats['batches']} batches, max queue {stats['max_queue_depth']})")
+
+
+if __name__ == "__main__":
+    main()
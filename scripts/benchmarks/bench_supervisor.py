@@ -0,0 +1,88 @@
+"""
+Benchmark the watch supervisor with fake BLE clients.
+
+Runs an increasing number of simulated watches in one event loop and reports
+heart rate notifications per second and per-device latency (time from the
+scheduled notification to the handler returning).
+
+Usage: python scripts/benchmarks/bench_supervisor.py [duration_seconds]
+"""
+import asyncio
+import contextlib
+import os
+import statistics
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.app.database.sensor_writer import SensorDataWriter
+from backend.app.services.anomaly import AnomalyDetector
+from backend.app.services.emotion_ml import EmotionService
+from backend.app.services.gatt_cache import GattCache
+from backend.app.services.geolocation import StaticLocationBackend, location_provider
+from fake_ble import FakeBleakClient
+from watch_supervisor import WatchSupervisor
+from watchdetails import SmartWatchReader
+
+WATCH_COUNTS = [1, 10, 50, 100, 250, 500]
+
+# No IP geolocation lookups while benchmarking
+location_provider.backend = StaticLocationBackend(0.0, 0.0)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run_once(watch_count, duration, db_path):
+    writer = SensorDataWriter(db_path).start()
+    anomaly_detector = AnomalyDetector(db_path).start()
+    emotion_service = EmotionService().start()
+    supervisor = WatchSupervisor(
+        reader_factory=lambda address: SmartWatchReader(address, client_factory=FakeBleakClient, db_path=db_path,
+                                                        writer=writer, gatt_cache=GattCache(),
+                                                        anomaly_detector=anomaly_detector,
+                                                        emotion_service=emotion_service),
+        writer=writer,
+    )
+    for i in range(watch_count):
+        await supervisor.add_watch(f"FA:KE:00:00:{i // 256:02X}:{i % 256:02X}")
+
+    await asyncio.sleep(duration)
+    clients = [reader.client for reader in supervisor.readers.values()]
+    await supervisor.stop()
+    emotion_service.close()
+    writer.close()
+    anomaly_detector.close()
+
+    latencies = [latency for client in clients for latency in client.latencies]
+    sent = sum(client.sent for client in clients)
+    return {
+        "watches": watch_count,
+        "notifications_per_sec": sent / duration,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "mean_ms": (statistics.mean(latencies) if latencies else 0.0) * 1000,
+    }
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    print(f"{'watches':>8} {'notif/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for watch_count in WATCH_COUNTS:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            # The reader prints every sample; keep the report readable
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                result = asyncio.run(run_once(watch_count, duration, db_path))
+        print(f"{result['watches']:>8} {result['notifications_per_sec']:>10.1f} "
+              f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['max_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Local stand-in for the Twilio Messages API, for alert dispatch benchmarks.
+
+StubSmsServer accepts POSTs of form-encoded messages on a free localhost
+port, answers after a configurable delay and fails a configurable fraction
+of requests with 503. It records when each message arrived so delivery
+latency can be measured end to end. HttpSmsProvider is the matching
+provider for AlertOutbox.
+
+Usage: python scripts/benchmarks/stub_sms_server.py [port] [delay_seconds] [failure_rate]
+"""
+import random
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubSmsServer:
+    def __init__(self, port=0, delay=0.05, failure_rate=0.0):
+        self.delay = delay
+        self.failure_rate = failure_rate
+        self.received = {}  # message body -> arrival time (time.perf_counter())
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/Messages.json"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = urllib.parse.parse_qs(self.rfile.read(length).decode())
+                time.sleep(stub.delay)
+                with stub._lock:
+                    stub.requests += 1
+                    failed = random.random() < stub.failure_rate
+                    if failed:
+                        stub.failures += 1
+                    else:
+                        stub.received[form.get("Body", [""])[0]] = time.perf_counter()
+                self.send_response(503 if failed else 201)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(b'{"status": "queued"}' if not failed else b'{"message": "unavailable"}')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-sms", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class HttpSmsProvider:
+    """SMS provider that POSTs to a Twilio-style endpoint; raises on HTTP errors."""
+
+    def __init__(self, url, to="+10000000000", timeout=10):
+        self.url = url
+        self.to = to
+        self.timeout = timeout
+
+    def send(self, message):
+        data = urllib.parse.urlencode({"To": self.to, "Body": message}).encode()
+        with urllib.request.urlopen(self.url, data=data, timeout=self.timeout) as response:
+            response.read()
+
+
+if __name__ == "__main__":
+    server = StubSmsServer(
+        port=int(sys.argv[1]) if len(sys.argv) > 1 else 8099,
+        delay=float(sys.argv[2]) if len(sys.argv) > 2 else 0.05,
+        failure_rate=float(sys.argv[3]) if len(sys.argv) > 3 else 0.0,
+    ).start()
+    print(f"Stub SMS server listening on {server.url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
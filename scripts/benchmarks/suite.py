@@ -0,0 +1,265 @@
+"""
+End-to-end benchmark suite for the ingestion, query and alerting hot paths.
+
+Benchmarks:
+  handler     heart rate notification handler latency (SmartWatchReader)
+  insert      insert_sensor_data caller cost and sustained rows/s to SQLite
+  queries     /history and /api/alerts latency through Flask at each --sizes
+  drastic     detect_drastic_change throughput over 10k devices
+  alerts      alert enqueue and delivery latency against a stub SMS server
+              (20 alerts/s, 50 ms per SMS)
+
+Results are written as JSON ({"meta": ..., "results": {metric: {value, unit,
+better}}}). With --baseline the run is compared against a stored result and
+the exit status is 1 if any metric regressed by more than --tolerance.
+
+Usage:
+  python scripts/benchmarks/suite.py --output results.json
+  python scripts/benchmarks/suite.py --save-baseline scripts/benchmarks/baseline.json
+  python scripts/benchmarks/suite.py --baseline scripts/benchmarks/baseline.json --sizes 10000,1000000
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+DEFAULT_TOLERANCE = 0.25
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def quiet():
+    """The readers and the outbox print per sample; keep the report readable."""
+    stack = contextlib.ExitStack()
+    stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+    return stack
+
+
+class Results:
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, better="lower"):
+        self.metrics[name] = {"value": round(value, 3), "unit": unit, "better": better}
+        print(f"  {name:<40} {value:>14.3f} {unit}", file=sys.stderr)
+
+
+def bench_handler(results, tmp, samples=5000):
+    from fake_ble import HEART_RATE_MEASUREMENT, STEP_COUNT_UUID, heart_rate_payload, step_payload
+    from watchdetails import SmartWatchReader
+
+    latencies = []
+    with quiet():
+        reader = SmartWatchReader("FA:KE:00:00:00:01", db_path=os.path.join(tmp, "handler.db"))
+        for i in range(samples):
+            reader.step_count_handler(STEP_COUNT_UUID, step_payload(1000 + i))
+            payload = heart_rate_payload(65 + i % 20)
+            started = time.perf_counter()
+            reader.heart_rate_handler(HEART_RATE_MEASUREMENT, payload)
+            latencies.append(time.perf_counter() - started)
+        reader.emotion_service.close()
+        reader.writer.close()
+        reader.db_connection.close()
+    results.add("handler.heart_rate.p50_us", percentile(latencies, 50) * 1e6, "us")
+    results.add("handler.heart_rate.p99_us", percentile(latencies, 99) * 1e6, "us")
+
+
+def bench_insert(results, tmp, samples=50_000):
+    from watchdetails import SmartWatchReader
+
+    with quiet():
+        reader = SmartWatchReader("FA:KE:00:00:00:02", db_path=os.path.join(tmp, "insert.db"))
+        started = time.perf_counter()
+        for i in range(samples):
+            reader.insert_sensor_data(60 + i % 40, i, 80, "Neutral")
+        submitted = time.perf_counter() - started
+        reader.writer.close()
+        total = time.perf_counter() - started
+        reader.db_connection.close()
+    results.add("insert.caller_us", submitted / samples * 1e6, "us")
+    results.add("insert.rows_per_s", reader.writer.stats["written"] / total, "rows/s", "higher")
+
+
+def bench_queries(results, tmp, sizes, repeat=20):
+    from backend.app import create_app
+    from synthetic_db import cached
+
+    def timed(url, headers=None):
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(url, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code in (200, 404), (url, response.status_code)
+        return statistics.median(latencies) * 1000, response
+
+    for rows in sizes:
+        client = create_app(cached(rows)).test_client()
+        label = f"{rows // 1000}k" if rows < 1_000_000 else f"{rows // 1_000_000}M"
+        ms, response = timed("/history?limit=500")
+        results.add(f"queries.history.page1.{label}_ms", ms, "ms")
+        cursor = response.headers.get("X-Next-Cursor")
+        for _ in range(10):
+            cursor = client.get(f"/history?limit=500&cursor={cursor}").headers.get("X-Next-Cursor") or cursor
+        ms, _ = timed(f"/history?limit=500&cursor={cursor}")
+        results.add(f"queries.history.page11.{label}_ms", ms, "ms")
+        ms, _ = timed("/history?device_id=watch-7&from=2025-01-10T00:00:00&to=2025-01-20T00:00:00&limit=100")
+        results.add(f"queries.history.device_range.{label}_ms", ms, "ms")
+        ms, _ = timed("/api/alerts")
+        results.add(f"queries.alerts.{label}_ms", ms, "ms")
+
+
+def bench_drastic(results, devices=10_000, readings=200_000):
+    from backend.app.services.device_state import DeviceStateStore
+    from backend.app.services.draastic_changes import detect_drastic_change
+
+    store = DeviceStateStore()
+    rng = random.Random(1)
+    calls = [(f"watch-{i % devices}", rng.randint(60, 100), i, rng.randint(94, 99)) for i in range(readings)]
+    started = time.perf_counter()
+    for device_id, heart_rate, steps, spo2 in calls:
+        detect_drastic_change(heart_rate, steps, spo2, device_id=device_id, states=store)
+    results.add("drastic.readings_per_s", readings / (time.perf_counter() - started), "readings/s", "higher")
+
+
+def bench_alerts(results, tmp, alerts=100, rate=20, delay=0.05):
+    from backend.app.alerts.outbox import AlertOutbox
+    from stub_sms_server import HttpSmsProvider, StubSmsServer
+
+    server = StubSmsServer(delay=delay).start()
+    outbox = AlertOutbox(os.path.join(tmp, "alerts.db"), HttpSmsProvider(server.url)).start()
+    enqueued = {}
+    enqueue_latencies = []
+    with quiet():
+        for i in range(alerts):
+            message = f"HR > 120 for 45s, peak {121 + i % 40} BPM (#{i})"
+            started = time.perf_counter()
+            outbox.enqueue(message)
+            enqueue_latencies.append(time.perf_counter() - started)
+            enqueued[message] = started
+            # Paced below the outbox's capacity, so delivery latency is not just queueing
+            time.sleep(1 / rate)
+        deadline = time.perf_counter() + 60
+        while len(server.received) < alerts and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        outbox.stop()
+    server.stop()
+    delivery = [server.received[m] - t for m, t in enqueued.items() if m in server.received]
+    results.add("alerts.enqueue.p50_us", percentile(enqueue_latencies, 50) * 1e6, "us")
+    results.add("alerts.enqueue.p99_us", percentile(enqueue_latencies, 99) * 1e6, "us")
+    results.add("alerts.delivery.p50_ms", percentile(delivery, 50) * 1000, "ms")
+    results.add("alerts.delivery.p99_ms", percentile(delivery, 99) * 1000, "ms")
+    results.add("alerts.delivered_ratio", len(delivery) / alerts, "ratio", "higher")
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Print current vs baseline per metric. Returns the names of regressed metrics."""
+    regressions = []
+    print(f"{'metric':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, entry in current.items():
+        base = baseline.get(name)
+        if base is None or not base["value"]:
+            print(f"{name:<40} {'-':>12} {entry['value']:>12.3f} {'new':>8}")
+            continue
+        change = (entry["value"] - base["value"]) / base["value"]
+        worse = change > tolerance if entry["better"] == "lower" else change < -tolerance
+        flag = "  REGRESSION" if worse else ""
+        print(f"{name:<40} {base['value']:>12.3f} {entry['value']:>12.3f} {change:>+8.1%}{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    benchmarks = ["handler", "insert", "queries", "drastic", "alerts"]
+    parser = argparse.ArgumentParser(description="Run the hot-path benchmark suite.")
+    parser.add_argument("--only", help=f"Comma-separated subset of {','.join(benchmarks)}")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="sensor_data row counts for the query benchmarks")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument("--baseline", help="Compare against this JSON result")
+    parser.add_argument("--save-baseline", help="Write the JSON results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before a metric counts as a regression")
+    args = parser.parse_args()
+    selected = args.only.split(",") if args.only else benchmarks
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+
+    results = Results()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the app, the outbox and location lookups away from the real database and network
+        os.environ["SMARTWATCH_DB"] = os.path.join(tmp, "suite.db")
+        from backend.app.alerts.outbox import AlertOutbox
+        from backend.app.alerts.smsalert import set_outbox
+        from backend.app.services.geolocation import StaticLocationBackend, location_provider
+        from bench_alert_dispatch import StubSmsProvider
+        location_provider.backend = StaticLocationBackend(0.0, 0.0)
+        set_outbox(AlertOutbox(os.environ["SMARTWATCH_DB"], StubSmsProvider()).start())
+
+        for name in selected:
+            print(f"{name}:", file=sys.stderr)
+            if name == "handler":
+                bench_handler(results, tmp)
+            elif name == "insert":
+                bench_insert(results, tmp)
+            elif name == "queries":
+                bench_queries(results, tmp, sizes)
+            elif name == "drastic":
+                bench_drastic(results)
+            elif name == "alerts":
+                bench_alerts(results, tmp)
+            else:
+                parser.error(f"Unknown benchmark: {name}")
+
+    report = {"meta": metadata(), "results": results.metrics}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+    if not args.output and not args.save_baseline:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results.metrics, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
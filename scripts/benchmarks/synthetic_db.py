@@ -0,0 +1,122 @@
+"""
+Generate synthetic smartwatch databases for benchmarks.
+
+Builds the production schema (sensor_data with its history indexes, the
+alerts outbox table and the rollup tables) filled with `rows` readings spread
+over DEVICES watches across 30 days, plus one alert per ALERT_EVERY readings.
+Generated files are cached by size, so large databases are only built once.
+
+Usage: python scripts/benchmarks/synthetic_db.py [rows ...] [--cache-dir DIR]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from backend.app.database.history import ensure_history_indexes
+from backend.app.database.rollups import create_rollup_tables
+
+DEVICES = 100
+ALERT_EVERY = 100
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+# Bumped whenever the generated schema or data changes, so stale caches are rebuilt
+FORMAT_VERSION = 1
+
+CREATE_SENSOR_DATA = """
+    CREATE TABLE sensor_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        heart_rate INTEGER,
+        step_count INTEGER,
+        battery_level INTEGER,
+        device_id TEXT,
+        emotion TEXT,
+        UNIQUE(timestamp, heart_rate, step_count, battery_level, device_id)
+    )
+"""
+CREATE_ALERTS = """
+    CREATE TABLE alerts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        message TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL,
+        last_error TEXT,
+        revision INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+
+def build(db_path, rows, devices=DEVICES):
+    """Create a database with `rows` sensor readings at db_path (overwriting it)."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(CREATE_SENSOR_DATA)
+    conn.execute(CREATE_ALERTS)
+    conn.execute("CREATE INDEX idx_alerts_status_due ON alerts(status, next_attempt_at)")
+    conn.execute("CREATE INDEX idx_alerts_revision ON alerts(revision)")
+
+    start = datetime(2025, 1, 1)
+    step = 30 * 24 * 3600 / rows
+
+    def samples():
+        for i in range(rows):
+            ts = (start + timedelta(seconds=int(i * step))).strftime('%Y-%m-%d %H:%M:%S')
+            yield ts, 60 + i % 60, i // devices, 80 - (i // devices) % 80, f"watch-{i % devices}", "Neutral"
+
+    def alerts():
+        for i in range(0, rows, ALERT_EVERY):
+            ts = (start + timedelta(seconds=int(i * step))).strftime('%Y-%m-%d %H:%M:%S')
+            yield f"HR > 120 for 45s, peak {121 + i % 40} BPM", ts, "Sent" if i % 7 else "Failed"
+
+    conn.executemany(
+        "INSERT INTO sensor_data (timestamp, heart_rate, step_count, battery_level, device_id, emotion) "
+        "VALUES (?, ?, ?, ?, ?, ?)", samples()
+    )
+    conn.executemany("INSERT INTO alerts (message, timestamp, status) VALUES (?, ?, ?)", alerts())
+    conn.commit()
+    ensure_history_indexes(conn)
+    create_rollup_tables(conn)
+    conn.execute(f"PRAGMA user_version = {FORMAT_VERSION}")
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def cached(rows, cache_dir=DEFAULT_CACHE_DIR):
+    """Path of a generated database with `rows` readings, building it on first use."""
+    os.makedirs(cache_dir, exist_ok=True)
+    db_path = os.path.join(cache_dir, f"synthetic_{rows}.db")
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+        if version == FORMAT_VERSION:
+            return db_path
+    started = time.perf_counter()
+    build(db_path, rows)
+    print(f"Generated {db_path} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return db_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate cached synthetic benchmark databases.")
+    parser.add_argument("rows", nargs="*", type=int, default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+    for rows in args.rows:
+        print(cached(rows, args.cache_dir))
+
+
+if __name__ == "__main__":
+    main()
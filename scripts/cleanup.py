@@ -1,19 +1,45 @@
-import sqlite3
-import datetime
+import argparse
+import logging
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.app.config import DB_NAME
+from backend.app.database.connection import connect
+from backend.app.database.retention import RUN_INTERVAL, RetentionEngine
 
-# Connect to SQLite database
-conn = sqlite3.connect("smartwatch_data.db")
-cursor = conn.cursor()
 
-# Calculate the timestamp for 7 days ago
-seven_days_ago = datetime.datetime.now() - datetime.timedelta(days=7)
-seven_days_ago_str = seven_days_ago.strftime('%Y-%m-%d %H:%M:%S')  # Format for SQLite
+def main():
+    parser = argparse.ArgumentParser(description="Delete old sensor data, rollups and alerts in small batches.")
+    parser.add_argument("--db", default=DB_NAME, help="SQLite database path")
+    parser.add_argument("--once", action="store_true", help="Run the retention policies once and exit")
+    parser.add_argument("--interval", type=int, default=RUN_INTERVAL, help="Seconds between scheduled runs")
+    parser.add_argument("--enable-auto-vacuum", action="store_true",
+                        help="Switch the database to incremental auto-vacuum (runs one full VACUUM)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
 
-# Delete records older than 7 days
-cursor.execute("DELETE FROM your_table WHERE timestamp_column <= ?", (seven_days_ago_str,))
+    if args.enable_auto_vacuum:
+        conn = connect(args.db)
+        RetentionEngine.enable_incremental_vacuum(conn)
+        conn.close()
+        print("Incremental auto-vacuum enabled.")
 
-# Commit changes and close the connection
-conn.commit()
-conn.close()
+    engine = RetentionEngine(args.db)
+    if args.once:
+        deleted = engine.run_once()
+        print(f"Old records deleted successfully! {deleted} "
+              f"({engine.metrics['last_run_seconds']:.1f}s, {engine.metrics['pages_reclaimed']} pages reclaimed)")
+        return
 
-print("Old records deleted successfully!")
+    engine.start(args.interval)
+    try:
+        while True:
+            time.sleep(args.interval)
+            print(f"Retention metrics: {engine.metrics}")
+    except KeyboardInterrupt:
+        engine.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,48 @@
-import sqlite3
+import os
+import sys
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
+import pytz
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.app.database.connection import get_connection
+from backend.app.services.sliding_window import WindowRegistry, analyze_window
 
-def get_last_30_seconds_data():
-    """Retrieve sensor data from the last 30 seconds"""
-    conn = sqlite3.connect('smartwatch_data.db')
-    cursor = conn.cursor()
-    
-    time_threshold = datetime.now() - timedelta(seconds=30)
-    cursor.execute("""
-        SELECT timestamp, heart_rate, step_count FROM sensor_data
-        WHERE timestamp >= ? ORDER BY timestamp DESC
-    """, (time_threshold.strftime('%Y-%m-%d %H:%M:%S'),))
-    
-    data = cursor.fetchall()
-    conn.close()
-    return data
+IST = pytz.timezone('Asia/Kolkata')  # sensor_data timestamps are written in IST
 
-def classify_emotion(heart_rate):
-    """Classify emotion based on heart rate"""
-    if heart_rate < 60:
-        return "Calm/Relaxed"
-    elif 60 <= heart_rate <= 100:
-        return "Normal"
-    elif 100 < heart_rate <= 130:
-        return "Excited/Active"
-    else:
-        return "Anxious/Stressed"
+def tail_sensor_data(windows, last_id):
+    """Feed rows inserted after last_id into the windows. Returns the new last id."""
+    with get_connection() as conn:
+        rows = conn.execute("""
+            SELECT id, timestamp, heart_rate, step_count, device_id FROM sensor_data
+            WHERE id > ? ORDER BY id
+        """, (last_id,)).fetchall()
+    for row_id, timestamp, heart_rate, step_count, device_id in rows:
+        if heart_rate is None:
+            continue
+        sample_time = IST.localize(datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')).timestamp()
+        windows.add(device_id, heart_rate, step_count or 0, now=sample_time)
+    return rows[-1][0] if rows else last_id
 
-def detect_running(step_data):
-    """Detect if the user is running based on step count changes"""
-    if len(step_data) < 2:
-        return "Insufficient Data"
-    
-    latest_step = step_data[0]
-    earliest_step = step_data[-1]
-    
-    step_difference = latest_step - earliest_step
-    if step_difference > 10:
-        return "Running"
-    return "Not Running"
-
-def analyze_data():
-    """Analyze the last 30 seconds of smartwatch data"""
-    data = get_last_30_seconds_data()
-    
-    if not data:
-        print("No recent data available.")
-        return
-    
-    heart_rates = [row[1] for row in data if row[1] is not None]
-    step_counts = [row[2] for row in data if row[2] is not None]
-    
-    if heart_rates:
-        avg_heart_rate = sum(heart_rates) / len(heart_rates)
-        emotion = classify_emotion(avg_heart_rate)
-        print(f"Average Heart Rate: {avg_heart_rate:.2f} BPM | Emotion: {emotion}")
-    
-    if step_counts:
-        running_state = detect_running(step_counts)
-        print(f"Running State: {running_state}")
+def analyze_data(windows):
+    """Print the analysis of every device seen so far"""
+    now = time.time()
+    for device_id, window in windows.windows.items():
+        window.expire(now)
+        avg_heart_rate, emotion, running_state = analyze_window(window)
+        if avg_heart_rate is None:
+            print(f"{device_id}: No recent data available.")
+            continue
+        print(f"{device_id}: Average Heart Rate: {avg_heart_rate:.2f} BPM | Emotion: {emotion} | Running State: {running_state}")
 
 if __name__ == "__main__":
+    # SmartWatchReader analyses every sample as it arrives and the supervisor
+    # reports the result. This standalone monitor is for another process
+    # (e.g. a gateway whose readers run elsewhere), which can only see the
+    # database; it tails new rows by id instead of re-reading the window
+    windows = WindowRegistry()
+    with get_connection() as conn:
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) - 1000 FROM sensor_data").fetchone()[0]
     while True:
-        analyze_data()
+        last_id = tail_sensor_data(windows, last_id)
+        analyze_data(windows)
         time.sleep(5)  # Run analysis every 5 seconds
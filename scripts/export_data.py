@@ -0,0 +1,62 @@
+import argparse
+import os
+import sys
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Unix only; the peak RSS report is skipped on Windows
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.app.config import DB_NAME
+from backend.app.database.connection import connect
+from backend.app.database.export import (
+    CHUNK_SIZE, CONTENT_TYPES, EXTENSIONS, ExportFormatError, ExportStats, stream_export
+)
+from backend.app.database.history import ensure_history_indexes, parse_timestamp
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export sensor readings as CSV, Parquet or Arrow, streamed in chunks.")
+    parser.add_argument("output", help="Output file, or - for stdout")
+    parser.add_argument("--db", default=DB_NAME, help="SQLite database path")
+    parser.add_argument("--format", choices=sorted(CONTENT_TYPES),
+                        help="Output format (default: from the output file's extension, else csv)")
+    parser.add_argument("--device-id", help="Only readings from this watch")
+    parser.add_argument("--from", dest="start", type=parse_timestamp, help="ISO-8601 start time (inclusive)")
+    parser.add_argument("--to", dest="end", type=parse_timestamp, help="ISO-8601 end time (exclusive)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows read and written at a time")
+    args = parser.parse_args()
+
+    export_format = args.format
+    if export_format is None:
+        extension = os.path.splitext(args.output)[1].lstrip(".")
+        export_format = next((name for name, ext in EXTENSIONS.items() if ext == extension or name == extension), "csv")
+
+    conn = connect(args.db)
+    ensure_history_indexes(conn)
+    conn.close()
+
+    stats = ExportStats(export_format)
+    try:
+        body = stream_export(args.db, export_format, args.device_id, args.start, args.end, args.chunk_size, stats)
+    except ExportFormatError as e:
+        parser.error(str(e))
+
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        for data in body:
+            output.write(data)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+    if resource is None:
+        print(f"Exported {stats.summary()}", file=sys.stderr)
+        return
+    # ru_maxrss is in kilobytes on Linux; it includes database pages read through mmap
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Exported {stats.summary()}; peak RSS {peak:.0f} MB", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
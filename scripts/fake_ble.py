@@ -0,0 +1,364 @@
+import asyncio
+import csv
+import os
+import random
+import struct
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.app.database.raw_archive import iter_archive
+
+HEART_RATE_MEASUREMENT = "00002a37-0000-1000-8000-00805f9b34fb"
+STEP_COUNT_UUID = "0000fee1-0000-1000-8000-00805f9b34fb"
+BATTERY_LEVEL = "00002a19-0000-1000-8000-00805f9b34fb"
+
+# GATT table the fake watches expose as client.services (shaped like bleak's)
+FakeService = namedtuple("FakeService", "uuid characteristics")
+FakeCharacteristic = namedtuple("FakeCharacteristic", "uuid handle properties")
+WATCH_GATT = [
+    FakeService("00001800-0000-1000-8000-00805f9b34fb", [
+        FakeCharacteristic("00002a00-0000-1000-8000-00805f9b34fb", 0x0003, ["read"]),
+        FakeCharacteristic("00002a01-0000-1000-8000-00805f9b34fb", 0x0005, ["read"]),
+    ]),
+    FakeService("0000180a-0000-1000-8000-00805f9b34fb", [
+        FakeCharacteristic("00002a29-0000-1000-8000-00805f9b34fb", 0x0009, ["read"]),
+        FakeCharacteristic("00002a26-0000-1000-8000-00805f9b34fb", 0x000b, ["read"]),
+    ]),
+    FakeService("0000180d-0000-1000-8000-00805f9b34fb", [
+        FakeCharacteristic(HEART_RATE_MEASUREMENT, 0x0010, ["notify"]),
+    ]),
+    FakeService("0000180f-0000-1000-8000-00805f9b34fb", [
+        FakeCharacteristic(BATTERY_LEVEL, 0x0020, ["read", "notify"]),
+    ]),
+    FakeService("0000fee0-0000-1000-8000-00805f9b34fb", [
+        FakeCharacteristic(STEP_COUNT_UUID, 0x0030, ["notify"]),
+        FakeCharacteristic("0000fee2-0000-1000-8000-00805f9b34fb", 0x0033, ["write"]),
+    ]),
+]
+
+
+def discover(services, discovery_delay):
+    """
+    The fake watch's GATT table, limited to `services` (bleak's services=
+    filter) when given. Takes discovery_delay seconds for the full table and
+    proportionally less for a filtered one.
+    """
+    table = WATCH_GATT if services is None else [s for s in WATCH_GATT if s.uuid in services]
+    return table, discovery_delay * len(table) / len(WATCH_GATT)
+
+
+class FakeBleakClient:
+    """
+    Minimal stand-in for bleak's BleakClient that emits synthetic notifications.
+
+    Used to drive SmartWatchReader (and the supervisor) without a physical watch.
+    Every heart rate notification records its scheduled send time, so the
+    end-to-end latency (schedule -> handler returned) can be measured.
+    """
+
+    def __init__(self, address, hr_interval=1.0, step_interval=1.0,
+                 heart_rate_range=(65, 85), battery_level=80, services=None, discovery_delay=0.0):
+        self.address = address
+        self.services = None
+        self._service_filter = services
+        self.discovery_delay = discovery_delay
+        self.hr_interval = hr_interval
+        self.step_interval = step_interval
+        self.heart_rate_range = heart_rate_range
+        self.battery_level = battery_level
+        self.is_connected = False
+        self.latencies = []
+        self.sent = 0
+        self._steps = random.randint(0, 5000)
+        self._tasks = {}
+
+    async def connect(self, **kwargs):
+        self.services, delay = discover(self._service_filter, self.discovery_delay)
+        await asyncio.sleep(delay)
+        self.is_connected = True
+        return True
+
+    async def disconnect(self):
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self.is_connected = False
+        return True
+
+    async def read_gatt_char(self, uuid):
+        return bytearray([self.battery_level])
+
+    async def start_notify(self, uuid, callback):
+        if uuid == HEART_RATE_MEASUREMENT:
+            self._tasks[uuid] = asyncio.create_task(self._emit(uuid, callback, self.hr_interval, self._heart_rate_payload))
+        elif uuid == STEP_COUNT_UUID:
+            self._tasks[uuid] = asyncio.create_task(self._emit(uuid, callback, self.step_interval, self._step_payload))
+
+    async def stop_notify(self, uuid):
+        task = self._tasks.pop(uuid, None)
+        if task is not None:
+            task.cancel()
+
+    def _heart_rate_payload(self):
+        return heart_rate_payload(random.randint(*self.heart_rate_range))
+
+    def _step_payload(self):
+        self._steps += random.randint(0, 3)
+        return step_payload(self._steps)
+
+    async def _emit(self, uuid, callback, interval, make_payload):
+        # Stagger devices so they don't all fire on the same tick
+        next_at = time.perf_counter() + random.uniform(0, interval)
+        while self.is_connected:
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            callback(uuid, make_payload())
+            if uuid == HEART_RATE_MEASUREMENT:
+                self.latencies.append(time.perf_counter() - next_at)
+                self.sent += 1
+            next_at += interval
+
+
+# Replay --------------------------------------------------------------------
+#
+# A recording is a list of (offset_seconds, characteristic_uuid, payload)
+# events in time order. DISCONNECT as the uuid drops the link at that point;
+# a dropout (watch taken off) is simply a stretch with no heart rate events.
+
+DISCONNECT = "disconnect"
+ALIASES = {"hr": HEART_RATE_MEASUREMENT, "steps": STEP_COUNT_UUID, "battery": BATTERY_LEVEL}
+
+
+def heart_rate_payload(heart_rate):
+    return bytearray([0x00, heart_rate])
+
+
+def step_payload(steps):
+    return bytearray(struct.pack("<H", steps & 0xFFFF))
+
+
+def _parse_time(value):
+    value = value.strip()
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%H:%M:%S"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    return datetime.fromisoformat(value)
+
+
+def load_watch_csv(path):
+    """
+    Load a recording in the watch_data.csv layout: Timestamp,Heart Rate,Step Count.
+
+    Empty or N/A cells are skipped; a heart rate of 0 is replayed as is (the
+    reader treats it as the watch being off the wrist).
+    """
+    events = []
+    start = None
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            at = _parse_time(row["Timestamp"])
+            start = at if start is None else start
+            offset = (at - start).total_seconds()
+            heart_rate = (row.get("Heart Rate") or "").strip()
+            steps = (row.get("Step Count") or "").strip()
+            if steps.isdigit():
+                events.append((offset, STEP_COUNT_UUID, step_payload(int(steps))))
+            if heart_rate.isdigit():
+                events.append((offset, HEART_RATE_MEASUREMENT, heart_rate_payload(int(heart_rate))))
+    return events
+
+
+def load_raw_recording(path):
+    """
+    Load raw GATT payloads: CSV rows of offset_seconds,characteristic,hex_payload.
+
+    characteristic is a UUID or one of hr/steps/battery/disconnect.
+    """
+    events = []
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith("#") or row[0] == "offset":
+                continue
+            offset, characteristic = float(row[0]), row[1].strip()
+            uuid = ALIASES.get(characteristic, characteristic)
+            payload = bytearray.fromhex(row[2].strip()) if len(row) > 2 and row[2].strip() else bytearray()
+            events.append((offset, uuid, payload))
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def load_raw_archive(directory, device_id=None):
+    """Load notifications captured by RawArchiveWriter, from one device or all of them."""
+    events = []
+    start = None
+    for timestamp, _, uuid, payload in iter_archive(directory, device_id=device_id):
+        start = timestamp if start is None else start
+        events.append((timestamp - start, uuid, bytearray(payload)))
+    return events
+
+
+def load_recording(path):
+    """Load a recording: a raw archive directory, or either CSV format (told apart by the header)."""
+    if os.path.isdir(path):
+        return load_raw_archive(path)
+    with open(path, newline="") as f:
+        header = f.readline()
+    return load_watch_csv(path) if header.startswith("Timestamp") else load_raw_recording(path)
+
+
+def synthetic_recording(duration=600, hr_interval=1.0, step_interval=1.0, heart_rate_range=(65, 85),
+                        battery_level=80, battery_drain=0.5, dropout_every=0, dropout_length=15,
+                        disconnect_every=0, seed=None):
+    """
+    Generate a recording: a heart rate random walk, a rising step counter and a
+    draining battery, with optional dropouts (no heart rate for dropout_length
+    seconds every dropout_every seconds) and periodic disconnects. battery_drain
+    is in percent per minute.
+    """
+    rng = random.Random(seed)
+    events = []
+    low, high = heart_rate_range
+    heart_rate = rng.randint(low, high)
+    t = 0.0
+    while t < duration:
+        off_wrist = dropout_every and t % dropout_every >= dropout_every - dropout_length
+        if not off_wrist:
+            heart_rate = min(high, max(low, heart_rate + rng.randint(-2, 2)))
+            events.append((t, HEART_RATE_MEASUREMENT, heart_rate_payload(heart_rate)))
+        t += hr_interval
+    steps = rng.randint(0, 5000)
+    t = 0.0
+    while t < duration:
+        steps += rng.randint(0, 3)
+        events.append((t, STEP_COUNT_UUID, step_payload(steps)))
+        t += step_interval
+    for minute in range(int(duration // 60) + 1):
+        events.append((minute * 60.0, BATTERY_LEVEL, bytearray([max(0, int(battery_level - minute * battery_drain))])))
+    if disconnect_every:
+        events.extend((t, DISCONNECT, bytearray()) for t in range(disconnect_every, int(duration), disconnect_every))
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+class ReplayBleakClient:
+    """
+    BleakClient stand-in that replays a recording into the subscribed handlers.
+
+    Events are delivered at `speed` times real time. The position in the
+    recording survives reconnects (it lives on the ReplayScenario), so a
+    DISCONNECT event behaves like a real dropped link: the supervisor
+    reconnects and the stream continues where it stopped.
+    """
+
+    def __init__(self, address, scenario, services=None):
+        self.address = address
+        self.scenario = scenario
+        self.services = None
+        self._service_filter = services
+        self.is_connected = False
+        self.battery_level = scenario.battery_level
+        self.latencies = []
+        self.sent = 0
+        self._callbacks = {}
+        self._player = None
+
+    async def connect(self, **kwargs):
+        scenario = self.scenario
+        self.services, delay = discover(self._service_filter, scenario.discovery_delay)
+        await asyncio.sleep(delay)
+        if random.random() < scenario.connect_failure_rate:
+            scenario.connect_failures += 1
+            raise ConnectionError(f"Simulated connection failure to {self.address}")
+        if self._service_filter is None:
+            scenario.discoveries += 1
+        self.is_connected = True
+        return True
+
+    async def disconnect(self):
+        if self._player is not None:
+            self._player.cancel()
+            self._player = None
+        self.is_connected = False
+        return True
+
+    async def read_gatt_char(self, uuid):
+        return bytearray([self.battery_level])
+
+    async def start_notify(self, uuid, callback):
+        self._callbacks[uuid] = callback
+        if self._player is None:
+            self._player = asyncio.create_task(self._play())
+
+    async def stop_notify(self, uuid):
+        self._callbacks.pop(uuid, None)
+
+    async def _play(self):
+        events = self.scenario.events
+        position = self.scenario.positions.get(self.address, 0)
+        speed = self.scenario.speed
+        # Offset each device by a random phase so they don't all fire on the same tick
+        base = time.perf_counter() - (events[position][0] if position < len(events) else 0) / speed
+        base += random.uniform(0, self.scenario.stagger) if position == 0 else 0
+        while self.is_connected:
+            if position >= len(events):
+                if not self.scenario.loop or not events:
+                    break
+                position = 0
+                base = time.perf_counter()
+            offset, uuid, payload = events[position]
+            due = base + offset / speed
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            position += 1
+            self.scenario.positions[self.address] = position
+            if uuid == DISCONNECT:
+                self.scenario.disconnects += 1
+                self.is_connected = False
+                break
+            if uuid == BATTERY_LEVEL:
+                self.battery_level = payload[0]
+            callback = self._callbacks.get(uuid)
+            if callback is None:
+                continue
+            callback(uuid, payload)
+            if uuid == HEART_RATE_MEASUREMENT:
+                self.latencies.append(time.perf_counter() - due)
+                self.sent += 1
+                self.scenario.sent += 1
+
+
+class ReplayScenario:
+    """
+    Client factory for SmartWatchReader(client_factory=...) that replays one
+    recording on every device, keeping each device's position across reconnects.
+
+    discovery_delay is how long a full GATT discovery takes on connect, and
+    connect_failure_rate the fraction of connection attempts that fail.
+    """
+
+    def __init__(self, events, speed=1.0, loop=True, stagger=1.0, battery_level=80,
+                 discovery_delay=0.0, connect_failure_rate=0.0):
+        self.events = events
+        self.speed = speed
+        self.loop = loop
+        self.stagger = stagger
+        self.battery_level = battery_level
+        self.discovery_delay = discovery_delay
+        self.connect_failure_rate = connect_failure_rate
+        self.positions = {}
+        self.clients = []
+        self.sent = 0
+        self.disconnects = 0
+        self.discoveries = 0
+        self.connect_failures = 0
+
+    def __call__(self, address, services=None):
+        client = ReplayBleakClient(address, self, services)
+        self.clients.append(client)
+        return client
+
+    def latencies(self):
+        return [latency for client in self.clients for latency in client.latencies]
@@ -0,0 +1,314 @@
+"""
+Multi-process ingestion for gateways with several BLE adapters or many watches.
+
+BLE collectors run in worker processes, one per adapter (--adapters) or per
+share of the registry (--processes). Each runs a WatchSupervisor whose
+readers only connect, subscribe and reconnect, and pushes every
+notification into its own shared-memory ring (backend/app/services/
+shm_ring.py) as a fixed-size record. This process drains the rings and
+feeds the notifications to ordinary SmartWatchReader handlers sharing one
+writer, anomaly detector and emotion model, so storage, analytics and
+alerts behave exactly as under watch_supervisor.py. The BLE stacks no
+longer share a GIL with each other or with the analytics.
+
+Usage: python scripts/ingest_gateway.py [registry.json] [--processes N | --adapters hci0,hci1]
+       Registry entries may name their adapter: {"address": "...", "adapter": "hci1"}
+"""
+import argparse
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import zlib
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bleak import BleakClient
+from watch_supervisor import METRICS_PORT, REGISTRY_FILE, REGISTRY_POLL_INTERVAL, WatchSupervisor, load_registry
+from watchdetails import GATT_CACHE, SmartWatchCharacteristics, SmartWatchReader
+from backend.app.config import DB_NAME, RAW_ARCHIVE_DIR
+from backend.app.database.raw_archive import RawArchiveWriter
+from backend.app.database.sensor_writer import SensorDataWriter
+from backend.app.services import metrics
+from backend.app.services.anomaly import AnomalyDetector
+from backend.app.services.emotion_ml import EmotionService
+from backend.app.services.geolocation import location_provider
+from backend.app.services.shm_ring import ADDRESS_SIZE, BATTERY, HEART_RATE, RING_CAPACITY, STEP_COUNT, ShmRing
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.002  # seconds the pump sleeps once every ring is empty
+POP_BATCH = 1024  # records taken from one ring before moving on to the next
+STOP_POLL_INTERVAL = 0.2  # seconds between a collector's checks for shutdown
+STOP_TIMEOUT = 10  # seconds a collector gets to disconnect its watches
+
+HEART_RATE_UUID = SmartWatchCharacteristics.HEART_RATE_MEASUREMENT.value
+STEP_COUNT_UUID = SmartWatchCharacteristics.STEP_COUNT_UUID.value
+
+
+def in_group(address, entry, index, count, adapter=None, default_adapter=None):
+    """Whether a registry entry belongs to collector `index` of `count`."""
+    if adapter is not None:
+        return entry.get("adapter", default_adapter) == adapter
+    return zlib.crc32(address.encode()) % count == index
+
+
+def fits_ring(address):
+    """Whether the address fits a ring record; longer ones are skipped rather than truncated."""
+    if len(address.encode()) <= ADDRESS_SIZE:
+        return True
+    logger.error(f"Skipping {address}: the collector ring holds addresses of at most {ADDRESS_SIZE} bytes")
+    return False
+
+
+class CollectorReader(SmartWatchReader):
+    """
+    The BLE half of SmartWatchReader, for a collector process.
+
+    Connecting, subscribing and reconnecting are inherited. Notifications
+    and battery readings go into the ring; analytics, storage and removal
+    alerts happen in the ingest process, which sees every sample.
+    """
+
+    def __init__(self, address, ring, client_factory=BleakClient, gatt_cache=None):
+        # Not SmartWatchReader.__init__: no database connection, writer or analytics in a collector
+        self.address = address
+        self.ring = ring
+        self.client_factory = client_factory
+        self.client = None
+        self.gatt_cache = gatt_cache if gatt_cache is not None else GATT_CACHE
+        self.reconnect_started = None
+        self.cached_connect_failures = 0
+        self.removal_task = None
+        self.notification_count = 0
+        self.last_heart_rate_time = datetime.now()
+        self.watch_removed = False
+
+    def heart_rate_handler(self, sender, data):
+        # Counted in the notification metrics by the ingest process, which handles it;
+        # only the collector knows when it reconnected
+        if self.reconnect_started is not None:
+            metrics.RECONNECT_FIRST_SAMPLE_SECONDS.observe(time.perf_counter() - self.reconnect_started)
+            self.reconnect_started = None
+        self.notification_count += 1
+        self.last_heart_rate_time = datetime.now()
+        self.ring.push(HEART_RATE, self.address, data)
+
+    def step_count_handler(self, sender, data):
+        self.ring.push(STEP_COUNT, self.address, data)
+
+    async def read_battery(self):
+        battery_level = await super().read_battery()
+        if battery_level is not None:
+            self.ring.push(BATTERY, self.address, bytes([battery_level]))
+        return battery_level
+
+    async def check_watch_removal(self):
+        """Removal is detected by the ingest process."""
+
+    async def disconnect(self):
+        await self._drop_client()
+
+
+def run_collector(ring_name, registry_path, stop, index, count, adapter=None, default_adapter=None,
+                  client_factory=None, metrics_port=None):
+    """Entry point of a collector process."""
+    # Ctrl+C reaches the whole process group; the gateway decides when collectors stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO)
+    if metrics_port is not None:
+        metrics.serve(metrics_port)
+    asyncio.run(_collect(ring_name, registry_path, stop, index, count, adapter, default_adapter, client_factory))
+
+
+async def _collect(ring_name, registry_path, stop, index, count, adapter, default_adapter, client_factory):
+    ring = ShmRing.attach(ring_name)
+    if client_factory is None:
+        client_factory = functools.partial(BleakClient, adapter=adapter) if adapter else BleakClient
+    supervisor = WatchSupervisor(
+        registry_path,
+        reader_factory=lambda address: CollectorReader(address, ring, client_factory),
+        select=lambda address, entry: (in_group(address, entry, index, count, adapter, default_adapter)
+                                       and fits_ring(address)),
+    )
+    parent = multiprocessing.parent_process()
+    try:
+        next_sync = 0.0
+        while not stop.is_set() and (parent is None or parent.is_alive()):
+            if time.monotonic() >= next_sync:
+                await supervisor.sync_registry()
+                next_sync = time.monotonic() + REGISTRY_POLL_INTERVAL
+            await asyncio.sleep(STOP_POLL_INTERVAL)
+    finally:
+        await supervisor.stop()
+        ring.close()
+
+
+class IngestGateway:
+    """Collector processes feeding one storage and analytics pipeline through shared memory."""
+
+    def __init__(self, registry_path=REGISTRY_FILE, processes=None, adapters=None, db_path=DB_NAME,
+                 ring_capacity=RING_CAPACITY, client_factory=None, collector_metrics_port=None):
+        self.registry_path = registry_path
+        self.adapters = list(adapters or [])
+        self.process_count = len(self.adapters) or processes or os.cpu_count() or 1
+        self.ring_capacity = ring_capacity
+        self.client_factory = client_factory
+        self.collector_metrics_port = collector_metrics_port
+        # One writer, archive, anomaly detector and emotion model for every watch, as in WatchSupervisor
+        self.writer = SensorDataWriter(db_path).start()
+        self.archive = RawArchiveWriter(RAW_ARCHIVE_DIR) if RAW_ARCHIVE_DIR else None
+        self.anomaly_detector = AnomalyDetector(db_path).start()
+        self.emotion_service = EmotionService().start()
+        self.reader_factory = lambda address: SmartWatchReader(
+            address, db_path=db_path, writer=self.writer, archive=self.archive,
+            anomaly_detector=self.anomaly_detector, emotion_service=self.emotion_service)
+        self.readers = {}
+        self.removal_tasks = {}
+        self.rings = []
+        self.processes = []
+        self.stats = {"records": 0, "collector_restarts": 0}
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self._registry_mtime = None
+        metrics.INGEST_RING_DEPTH.set_function(lambda: sum(len(ring) for ring in self.rings))
+        metrics.INGEST_RING_DROPPED.set_function(lambda: sum(ring.dropped for ring in self.rings))
+
+    def start(self):
+        """Create the rings and start one collector process per ring."""
+        for index in range(self.process_count):
+            self.rings.append(ShmRing.create(self.ring_capacity))
+            self.processes.append(self._spawn(index))
+        return self
+
+    def _spawn(self, index):
+        adapter = self.adapters[index] if self.adapters else None
+        metrics_port = self.collector_metrics_port + index if self.collector_metrics_port else None
+        process = self._context.Process(
+            target=run_collector, name=f"ble-collector-{adapter or index}", daemon=True,
+            args=(self.rings[index].name, self.registry_path, self._stop, index, self.process_count, adapter,
+                  self.adapters[0] if self.adapters else None, self.client_factory, metrics_port))
+        process.start()
+        return process
+
+    def drain(self):
+        """Hand every waiting record to its watch's reader. Returns how many were handled."""
+        handled = 0
+        now = time.time()
+        for ring in self.rings:
+            for kind, address, payload, received in ring.pop_many(POP_BATCH):
+                reader = self.readers.get(address)
+                if reader is None:
+                    reader = self._add_reader(address)
+                if kind == HEART_RATE:
+                    reader.heart_rate_handler(HEART_RATE_UUID, payload)
+                elif kind == STEP_COUNT:
+                    reader.step_count_handler(STEP_COUNT_UUID, payload)
+                elif kind == BATTERY:
+                    reader.last_battery_level = payload[0]
+                metrics.INGEST_HANDOFF_SECONDS.observe(now - received)
+                handled += 1
+        self.stats["records"] += handled
+        return handled
+
+    def _add_reader(self, address):
+        reader = self.readers[address] = self.reader_factory(address)
+        self.removal_tasks[address] = asyncio.get_running_loop().create_task(reader.check_watch_removal())
+        return reader
+
+    async def _remove_reader(self, address):
+        task = self.removal_tasks.pop(address, None)
+        if task is not None:
+            task.cancel()
+        reader = self.readers.pop(address, None)
+        if reader is not None:
+            await reader.disconnect()
+
+    async def pump(self):
+        """Drain the rings until cancelled; sleeps POLL_INTERVAL whenever they are all empty."""
+        while True:
+            await asyncio.sleep(0 if self.drain() else POLL_INTERVAL)
+
+    async def sync_registry(self):
+        """Forget watches that left the registry (the collectors disconnect them on their own)."""
+        if not self.registry_path or not os.path.exists(self.registry_path):
+            return
+        mtime = os.path.getmtime(self.registry_path)
+        if mtime == self._registry_mtime:
+            return
+        self._registry_mtime = mtime
+        try:
+            registry = load_registry(self.registry_path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Invalid registry {self.registry_path}: {e}")
+            return
+        for address in set(self.readers) - set(registry):
+            await self._remove_reader(address)
+
+    def restart_dead_collectors(self):
+        """Start a collector again if its process died; it carries on with the same ring."""
+        for index, process in enumerate(self.processes):
+            if not process.is_alive() and not self._stop.is_set():
+                logger.warning(f"{process.name} exited with code {process.exitcode}, restarting it")
+                self.processes[index] = self._spawn(index)
+                self.stats["collector_restarts"] += 1
+
+    async def run(self):
+        """Ingest until cancelled."""
+        self.start()
+        # Warm the location cache here: removal alerts are raised in this process
+        location_provider.start()
+        pump = asyncio.create_task(self.pump())
+        try:
+            while True:
+                await self.sync_registry()
+                self.restart_dead_collectors()
+                await asyncio.sleep(REGISTRY_POLL_INTERVAL)
+        finally:
+            pump.cancel()
+            await self.stop()
+
+    async def stop(self):
+        """Stop the collectors, handle what they left in the rings, then flush and close everything."""
+        self._stop.set()
+        for process in self.processes:
+            await asyncio.get_running_loop().run_in_executor(None, process.join, STOP_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+        while self.drain():
+            pass
+        for address in list(self.readers):
+            await self._remove_reader(address)
+        self.emotion_service.close()
+        self.writer.close()
+        if self.archive is not None:
+            self.archive.close()
+        self.anomaly_detector.close()
+        rings, self.rings = self.rings, []
+        for ring in rings:
+            ring.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Ingest from BLE collector processes over shared memory.")
+    parser.add_argument("registry", nargs="?", default=REGISTRY_FILE)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--processes", type=int, help="Collector processes, watches split by address (default: CPUs)")
+    group.add_argument("--adapters", help="Comma-separated BLE adapters, one collector each (e.g. hci0,hci1)")
+    args = parser.parse_args()
+
+    adapters = args.adapters.split(",") if args.adapters else None
+    gateway = IngestGateway(args.registry, processes=args.processes, adapters=adapters,
+                            collector_metrics_port=METRICS_PORT + 1)
+    metrics.serve(METRICS_PORT)
+    logger.info(f"Metrics on http://localhost:{METRICS_PORT}/metrics, collectors on the ports after it")
+    await gateway.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
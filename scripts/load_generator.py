@@ -0,0 +1,165 @@
+"""
+Load-test the ingestion path without Bluetooth.
+
+Runs the real WatchSupervisor, SmartWatchReader handlers, write-behind
+writer and alert outbox against simulated watches that replay a recording
+(watch_data.csv layout or raw payloads) or a synthetic stream, sped up and
+multiplied across many devices. SMS goes to a local stub provider.
+
+Examples:
+    python scripts/load_generator.py --devices 200 --speed 10 --duration 30
+    python scripts/load_generator.py --recording scripts/smartwatch_data.csv --speed 5
+    python scripts/load_generator.py --dropout-every 120 --disconnect-every 300 --speed 20
+    python scripts/load_generator.py --disconnect-every 10 --discovery-delay 2 --connect-failure-rate 0.3
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'benchmarks')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay simulated watches through the ingestion path.")
+    parser.add_argument("--devices", type=int, default=50, help="Number of simulated watches")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed-up factor")
+    parser.add_argument("--duration", type=float, default=30.0, help="Wall-clock seconds to run")
+    parser.add_argument("--recording", help="watch_data.csv-style or raw payload recording, or a raw archive directory (default: synthetic)")
+    parser.add_argument("--no-loop", action="store_true", help="Stop each device at the end of the recording")
+    parser.add_argument("--hr-interval", type=float, default=1.0, help="Synthetic: seconds between heart rate samples")
+    parser.add_argument("--heart-rate", default="65-85", help="Synthetic: heart rate range, e.g. 60-150 to trigger alerts")
+    parser.add_argument("--dropout-every", type=int, default=0, help="Synthetic: seconds between dropouts (0 = none)")
+    parser.add_argument("--dropout-length", type=int, default=15, help="Synthetic: dropout length in seconds")
+    parser.add_argument("--disconnect-every", type=int, default=0, help="Synthetic: seconds between disconnects")
+    parser.add_argument("--discovery-delay", type=float, default=0.0,
+                        help="Seconds a full GATT discovery takes on connect")
+    parser.add_argument("--connect-failure-rate", type=float, default=0.0,
+                        help="Fraction of connection attempts that fail")
+    parser.add_argument("--no-gatt-cache", action="store_true", help="Run full GATT discovery on every connect")
+    parser.add_argument("--sms-delay", type=float, default=0.2, help="Stub SMS provider latency in seconds")
+    parser.add_argument("--db", help="SQLite database (default: a temporary file)")
+    parser.add_argument("--verbose", action="store_true", help="Show the readers' per-sample output")
+    return parser.parse_args()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run(args, db_path):
+    from backend.app.alerts.outbox import AlertOutbox
+    from backend.app.alerts.smsalert import set_outbox
+    from backend.app.database.sensor_writer import SensorDataWriter
+    from backend.app.services.anomaly import AnomalyDetector
+    from backend.app.services.emotion_ml import EmotionService
+    from backend.app.services.gatt_cache import GattCache
+    from backend.app.services.geolocation import StaticLocationBackend, location_provider
+    from bench_alert_dispatch import StubSmsProvider
+    from fake_ble import ReplayScenario, load_recording, synthetic_recording
+    from watch_supervisor import WatchSupervisor
+    from watchdetails import SmartWatchReader
+
+    if args.recording:
+        events = load_recording(args.recording)
+    else:
+        # Long enough that a looped recording does not restart within the run
+        events = synthetic_recording(duration=max(600, args.duration * args.speed), hr_interval=args.hr_interval,
+                                     heart_rate_range=tuple(int(v) for v in args.heart_rate.split("-")),
+                                     dropout_every=args.dropout_every, dropout_length=args.dropout_length,
+                                     disconnect_every=args.disconnect_every)
+    scenario = ReplayScenario(events, speed=args.speed, loop=not args.no_loop, discovery_delay=args.discovery_delay,
+                              connect_failure_rate=args.connect_failure_rate)
+    # In memory, so simulated watches never end up in the real cache file
+    gatt_cache = GattCache()
+    if args.no_gatt_cache:
+        gatt_cache.services_for = lambda address, characteristic_uuids: None
+
+    location_provider.backend = StaticLocationBackend(0.0, 0.0)
+    sms = StubSmsProvider(delay=args.sms_delay)
+    outbox = AlertOutbox(db_path, sms).start()
+    set_outbox(outbox)
+    writer = SensorDataWriter(db_path).start()
+    anomaly_detector = AnomalyDetector(db_path).start()
+    emotion_service = EmotionService().start()
+    supervisor = WatchSupervisor(
+        reader_factory=lambda address: SmartWatchReader(address, client_factory=scenario, db_path=db_path,
+                                                        writer=writer, gatt_cache=gatt_cache,
+                                                        anomaly_detector=anomaly_detector,
+                                                        emotion_service=emotion_service),
+        writer=writer,
+        reconnect_delay=1,
+    )
+
+    started = time.perf_counter()
+    for i in range(args.devices):
+        await supervisor.add_watch(f"FA:KE:{i >> 16 & 0xFF:02X}:{i >> 8 & 0xFF:02X}:{i & 0xFF:02X}:00")
+    await asyncio.sleep(args.duration)
+    reconnects = sum(state["reconnects"] for state in supervisor.states.values())
+    await supervisor.stop()
+    emotion_service.close()
+    elapsed = time.perf_counter() - started
+    writer.close()
+    anomaly_detector.close()
+    outbox.stop()
+    return scenario, writer, sms, elapsed, reconnects
+
+
+def mean_seconds(histogram):
+    """(mean, count) of a histogram child's observations."""
+    _, count, total = histogram.snapshot()
+    return (total / count if count else 0.0), int(count)
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or os.path.join(tmp, "load.db")
+        # Everything that reads DB_NAME (e.g. the alert outbox) uses the load-test database
+        os.environ["SMARTWATCH_DB"] = db_path
+
+        with contextlib.ExitStack() as stack:
+            if not args.verbose:
+                devnull = stack.enter_context(open(os.devnull, "w"))
+                stack.enter_context(contextlib.redirect_stdout(devnull))
+            scenario, writer, sms, elapsed, reconnects = asyncio.run(run(args, db_path))
+
+        from backend.app.database.connection import connect
+        from backend.app.services.metrics import CONNECT_SECONDS, RECONNECT_FIRST_SAMPLE_SECONDS
+        conn = connect(db_path)
+        rows = conn.execute("SELECT COUNT(*) FROM sensor_data").fetchone()[0]
+        alerts = dict(conn.execute("SELECT status, COUNT(*) FROM alerts GROUP BY status").fetchall())
+        conn.close()
+
+        latencies = scenario.latencies()
+        print(f"devices            {args.devices}")
+        print(f"speed-up           {args.speed}x over {elapsed:.1f}s")
+        print(f"notifications      {scenario.sent} ({scenario.sent / elapsed:.0f}/s)")
+        print(f"handler latency    p50 {percentile(latencies, 50) * 1000:.2f} ms  "
+              f"p99 {percentile(latencies, 99) * 1000:.2f} ms  "
+              f"mean {statistics.fmean(latencies) * 1000 if latencies else 0:.2f} ms")
+        print(f"disconnects        {scenario.disconnects} (reconnects {reconnects}, "
+              f"{scenario.connect_failures} failed connects, {scenario.discoveries} full GATT discoveries)")
+        connect_cached, cached_count = mean_seconds(CONNECT_SECONDS.labels("cached"))
+        connect_full, full_count = mean_seconds(CONNECT_SECONDS.labels("full"))
+        first_sample, first_sample_count = mean_seconds(RECONNECT_FIRST_SAMPLE_SECONDS.labels())
+        print(f"connect time       mean {connect_cached:.2f}s with cached GATT ({cached_count}), "
+              f"{connect_full:.2f}s with full discovery ({full_count})")
+        print(f"reconnect gap      mean {first_sample:.2f}s from link loss to first sample ({first_sample_count})")
+        print(f"rows written       {writer.stats['written']} in {writer.stats['batches']} batches "
+              f"(dropped {writer.stats['dropped']}, max queue {writer.stats['max_queue_depth']}); "
+              f"{rows} in sensor_data")
+        print(f"alerts             {alerts} ({sms.calls} SMS sent to the stub)")
+
+
+if __name__ == "__main__":
+    main()
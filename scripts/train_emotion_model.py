@@ -0,0 +1,109 @@
+"""
+Train the emotion model served by backend/app/services/emotion_ml.py.
+
+There is no labelled recording yet, so training windows are synthesized per
+label from the heart rate and cadence patterns the rule-based classifier
+describes (resting, walking, running, a racing heart at rest), with sample
+rate, noise and whole-BPM rounding like the watch's. A softmax regression is
+fitted with NumPy gradient descent and written as JSON.
+
+Usage: python scripts/train_emotion_model.py [--windows 2000] [--output backend/app/emotion_model.json]
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.app.config import EMOTION_MODEL_FILE
+from backend.app.services.emotion_ml import FEATURES, EmotionModel, pack_windows, window_features
+from backend.app.services.sliding_window import WINDOW_SECONDS
+
+# label: (heart rate range, noise in BPM, drift in BPM over the window, cadence range in steps/min)
+PATTERNS = {
+    "Relaxed": ((48, 60), (1.5, 4.0), (-3, 1), (0, 10)),
+    "Neutral": ((60, 90), (1.0, 3.0), (-4, 4), (0, 40)),
+    "Energetic": ((95, 150), (1.0, 4.0), (-5, 15), (90, 170)),
+    "Anxious": ((90, 120), (2.0, 6.0), (0, 20), (0, 20)),
+    "Stressed": ((120, 165), (0.5, 2.0), (-5, 10), (0, 30)),
+}
+
+
+def synthesize(label, count, rng):
+    (hr_low, hr_high), (noise_low, noise_high), (drift_low, drift_high), (cadence_low, cadence_high) = PATTERNS[label]
+    windows = []
+    for _ in range(count):
+        interval = rng.uniform(0.5, 2.0)
+        times = np.arange(0, WINDOW_SECONDS, interval) + rng.uniform(0, 1e5)
+        base = rng.uniform(hr_low, hr_high)
+        drift = rng.uniform(drift_low, drift_high) * (times - times[0]) / WINDOW_SECONDS
+        heart_rates = np.round(base + drift + rng.normal(0, rng.uniform(noise_low, noise_high), len(times)))
+        cadence = rng.uniform(cadence_low, cadence_high)
+        steps = np.floor(rng.uniform(0, 5000) + cadence * (times - times[0]) / 60)
+        # Windows start filling after a (re)connect
+        keep = len(times) if rng.random() > 0.1 else rng.integers(2, len(times) + 1)
+        windows.append((times[-keep:], heart_rates[-keep:], steps[-keep:]))
+    return windows
+
+
+def fit(features, targets, classes, iterations=3000, learning_rate=0.5, l2=1e-3):
+    mean = features.mean(axis=0)
+    scale = features.std(axis=0)
+    scale[scale == 0] = 1.0
+    x = (features - mean) / scale
+    onehot = np.eye(classes)[targets]
+    weights = np.zeros((x.shape[1], classes))
+    bias = np.zeros(classes)
+    for _ in range(iterations):
+        logits = x @ weights + bias
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        error = (probabilities - onehot) / len(x)
+        weights -= learning_rate * (x.T @ error + l2 * weights)
+        bias -= learning_rate * error.sum(axis=0)
+    return mean, scale, weights, bias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the emotion model on synthetic windows.")
+    parser.add_argument("--windows", type=int, default=2000, help="training windows per label")
+    parser.add_argument("--output", default=EMOTION_MODEL_FILE)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    labels = list(PATTERNS)
+
+    def dataset(count):
+        windows, targets = [], []
+        for index, label in enumerate(labels):
+            windows.extend(synthesize(label, count, rng))
+            targets.extend([index] * count)
+        return window_features(*pack_windows(windows)), np.array(targets)
+
+    features, targets = dataset(args.windows)
+    mean, scale, weights, bias = fit(features, targets, len(labels))
+    model = EmotionModel(labels, FEATURES, mean, scale, weights, bias)
+
+    test_features, test_targets = dataset(args.windows // 4)
+    predicted = model.predict_proba(test_features).argmax(axis=1)
+    print(f"held-out accuracy: {(predicted == test_targets).mean():.1%}")
+    for index, label in enumerate(labels):
+        mask = test_targets == index
+        print(f"  {label:<10} {(predicted[mask] == index).mean():.1%}")
+
+    spec = model.to_dict()
+    # Six significant digits are plenty and keep the file readable
+    for key in ("mean", "scale", "bias"):
+        spec[key] = [float(f"{value:.6g}") for value in spec[key]]
+    spec["weights"] = [[float(f"{value:.6g}") for value in row] for row in spec["weights"]]
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(spec, f, indent=2)
+        f.write("\n")
+    print(f"model written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 import asyncio
+import os
+import sys
 from bleak import BleakClient, BleakScanner
-import sqlite3
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.app.database.connection import get_connection
 
 # Your smartwatch's service UUIDs (Replace these with actual values)
 HEART_RATE_UUID = "00002a37-0000-1000-8000-00805f9b34fb"
@@ -31,11 +34,8 @@ async def read_data(device_address):
             store_data(heart_rate, step_count)
 
 def store_data(heart_rate, step_count):
-    conn = sqlite3.connect("sensor_data.db")
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO sensor_data (heart_rate, step_count) VALUES (?, ?)", (heart_rate, step_count))
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        conn.execute("INSERT INTO sensor_data (heart_rate, step_count) VALUES (?, ?)", (heart_rate, step_count))
 
 async def main():
     devices = await find_watch()
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from enum import Enum
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from watchdetails import SmartWatchReader
+from backend.app.database.sensor_writer import SensorDataWriter
+from backend.app.config import DB_NAME, RAW_ARCHIVE_DIR
+from backend.app.database.raw_archive import RawArchiveWriter
+from backend.app.services.anomaly import AnomalyDetector
+from backend.app.services.emotion_ml import EmotionService
+from backend.app.services import metrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+REGISTRY_FILE = "watches.json"
+REGISTRY_POLL_INTERVAL = 5  # seconds between registry file checks
+RECONNECT_DELAY = 10  # seconds before the first reconnect of a dropped watch (then backs off)
+RECONNECT_MAX_DELAY = 120  # upper bound for the reconnect backoff
+METRICS_PORT = int(os.environ.get("SUPERVISOR_METRICS_PORT", 9102))  # Prometheus /metrics of the BLE process
+
+
+class DeviceState(Enum):
+    """Connection state of a supervised watch"""
+    CONNECTING = "connecting"
+    CONNECTED = "connected"
+    DISCONNECTED = "disconnected"
+    STOPPED = "stopped"
+
+
+def load_registry(path):
+    """
+    Load the device registry.
+
+    The registry is a JSON list of watches, e.g.
+    [{"address": "FB:D8:57:5B:04:32", "name": "Wearer 1"}]
+    """
+    with open(path) as f:
+        entries = json.load(f)
+    return {entry["address"]: entry for entry in entries}
+
+
+class WatchSupervisor:
+    """Runs many SmartWatchReader instances concurrently in one event loop."""
+
+    def __init__(self, registry_path=None, reader_factory=None, writer=None,
+                 reconnect_delay=RECONNECT_DELAY, registry_poll_interval=REGISTRY_POLL_INTERVAL,
+                 max_reconnect_delay=RECONNECT_MAX_DELAY, select=None):
+        self.registry_path = registry_path
+        # select(address, entry) -> bool picks this supervisor's share of the registry (all by default)
+        self.select = select
+        # Every watch shares one write-behind writer so inserts are group-committed across devices
+        self.owns_writer = writer is None and reader_factory is None
+        self.writer = SensorDataWriter(DB_NAME).start() if self.owns_writer else writer
+        # ...and one raw notification archive; all readers run on this loop, so no locking is needed
+        self.archive = RawArchiveWriter(RAW_ARCHIVE_DIR) if RAW_ARCHIVE_DIR and reader_factory is None else None
+        # ...and one anomaly detector, which checkpoints every watch's baseline in one transaction
+        self.anomaly_detector = AnomalyDetector(DB_NAME).start() if reader_factory is None else None
+        # ...and one emotion model, so windows from every watch are classified in the same batches
+        self.emotion_service = EmotionService().start() if reader_factory is None else None
+        self.reader_factory = reader_factory or (
+            lambda address: SmartWatchReader(address, writer=self.writer, archive=self.archive,
+                                             anomaly_detector=self.anomaly_detector,
+                                             emotion_service=self.emotion_service))
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.registry_poll_interval = registry_poll_interval
+        self.readers = {}
+        self.states = {}
+        self.tasks = {}
+        self._registry_mtime = None
+        metrics.CONNECTED_DEVICES.set_function(
+            lambda: sum(1 for state in self.states.values() if state["state"] == DeviceState.CONNECTED.value)
+        )
+
+    async def add_watch(self, address, name=None):
+        """Start supervising a watch. Does nothing if it is already running."""
+        if address in self.tasks:
+            return
+        self.states[address] = {
+            "name": name or address,
+            "state": DeviceState.CONNECTING.value,
+            "connected_since": None,
+            "reconnects": 0,
+            "last_error": None,
+        }
+        self.tasks[address] = asyncio.create_task(self._run_watch(address))
+        logger.info(f"Added watch {address}")
+
+    async def remove_watch(self, address):
+        """Stop supervising a watch and disconnect it."""
+        task = self.tasks.pop(address, None)
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        reader = self.readers.pop(address, None)
+        if reader is not None:
+            await reader.disconnect()
+        self.states.pop(address, None)
+        logger.info(f"Removed watch {address}")
+
+    def writer_stats(self):
+        """Queue depth and flush statistics of the shared sensor data writer."""
+        if self.writer is None:
+            return {}
+        return dict(self.writer.stats, queue_depth=self.writer.queue_depth)
+
+    def status(self):
+        """Per-device connection state, suitable for JSON serialisation."""
+        report = {}
+        for address, state in self.states.items():
+            reader = self.readers.get(address)
+            report[address] = dict(state)
+            if reader is not None:
+                report[address]["notifications"] = reader.notification_count
+                report[address]["last_heart_rate_time"] = reader.last_heart_rate_time.isoformat()
+                report[address]["watch_removed"] = reader.watch_removed
+                # 30-second mean heart rate, emotion and running state, updated on every sample
+                report[address]["window"] = getattr(reader, "window_analysis", None)
+        return report
+
+    def _set_state(self, address, state, error=None):
+        entry = self.states.get(address)
+        if entry is None:
+            return
+        entry["state"] = state.value
+        if state == DeviceState.CONNECTED:
+            entry["connected_since"] = datetime.now().isoformat()
+        elif state == DeviceState.DISCONNECTED:
+            entry["connected_since"] = None
+            entry["last_error"] = error
+
+    async def _run_watch(self, address):
+        """Connect, monitor and reconnect a single watch until cancelled."""
+        reader = self.reader_factory(address)
+        self.readers[address] = reader
+
+        def on_state(state, error=None):
+            self._set_state(address, DeviceState(state), error)
+            if state == DeviceState.DISCONNECTED.value and address in self.states:
+                self.states[address]["reconnects"] += 1
+
+        await reader.run(on_state, base_delay=self.reconnect_delay, max_delay=self.max_reconnect_delay)
+
+    async def sync_registry(self):
+        """Add and remove watches so the running set matches the registry file."""
+        if not self.registry_path or not os.path.exists(self.registry_path):
+            return
+        mtime = os.path.getmtime(self.registry_path)
+        if mtime == self._registry_mtime:
+            return
+        self._registry_mtime = mtime
+        try:
+            registry = load_registry(self.registry_path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Invalid registry {self.registry_path}: {e}")
+            return
+        if self.select is not None:
+            registry = {address: entry for address, entry in registry.items() if self.select(address, entry)}
+
+        for address in set(self.tasks) - set(registry):
+            await self.remove_watch(address)
+        for address, entry in registry.items():
+            await self.add_watch(address, entry.get("name"))
+
+    async def run(self):
+        """Follow the registry file until cancelled."""
+        try:
+            while True:
+                await self.sync_registry()
+                await asyncio.sleep(self.registry_poll_interval)
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """Disconnect every supervised watch and flush pending samples."""
+        for address in list(self.tasks):
+            await self.remove_watch(address)
+        if self.emotion_service is not None:
+            self.emotion_service.close()
+        if self.owns_writer:
+            self.writer.close()
+        if self.archive is not None:
+            self.archive.close()
+        if self.anomaly_detector is not None:
+            self.anomaly_detector.close()
+
+
+async def main():
+    registry_path = sys.argv[1] if len(sys.argv) > 1 else REGISTRY_FILE
+    supervisor = WatchSupervisor(registry_path)
+    metrics.serve(METRICS_PORT)
+    logger.info(f"Metrics on http://localhost:{METRICS_PORT}/metrics")
+    await supervisor.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -6,6 +6,8 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from bleak import BleakClient
 from enum import Enum
 import struct
+import time
+import random
 from datetime import datetime
 from bleak.backends.device import BLEDevice
 from datetime import datetime
@@ -13,7 +15,7 @@ import pytz
 import os
 import sys
 
-from backend.app.services.geolocation import get_device_location
+from backend.app.services.geolocation import location_link, location_provider
 # sys.path.append(os.path.abspath(os.path.join('..')))
 
 from backend.app.alerts.smsalert import send_alert
@@ -22,11 +24,48 @@ IST = pytz.timezone('Asia/Kolkata')
 
 
 
-from backend.app.alerts.smsalert import send_alert
+from backend.app.alerts.smsalert import WATCH_REMOVED, send_alert, check_rules
+from backend.app.database.sensor_writer import SensorDataWriter
+from backend.app.database.history import ensure_history_indexes
+from backend.app.database.connection import connect as connect_db
+from backend.app.config import DB_NAME, GATT_CACHE_FILE, RAW_ARCHIVE_DIR
+from backend.app.database.raw_archive import RawArchiveWriter
+from backend.app.services.anomaly import AnomalyDetector
+from backend.app.services.emotion_ml import WINDOW_SAMPLES, EmotionService, EmotionServiceBusy
+from backend.app.services.gatt_cache import GattCache
+from backend.app.services.rules import rule_engine
+from backend.app.services.sliding_window import SlidingWindow, analyze_window
+from backend.app.services.metrics import (
+    CONNECT_SECONDS, HANDLER_SECONDS, NOTIFICATIONS, RECONNECT_FIRST_SAMPLE_SECONDS, RECONNECTS
+)
 
 IST = pytz.timezone('Asia/Kolkata')
 
 WATCH_REMOVAL_THRESHOLD = 10 
+RECONNECT_BASE_DELAY = 1  # seconds before the first reconnect attempt; doubles per failure
+RECONNECT_MAX_DELAY = 60  # cap on the reconnect delay
+CONNECTION_POLL_INTERVAL = 0.5  # seconds between checks that the link is still up
+CACHED_CONNECT_ATTEMPTS = 3  # failed connects with the cached GATT layout before it is rediscovered
+
+# Metric children resolved once; the handlers run for every notification
+HEART_RATE_HANDLER_SECONDS = HANDLER_SECONDS.labels("heart_rate")
+STEP_HANDLER_SECONDS = HANDLER_SECONDS.labels("step_count")
+HEART_RATE_NOTIFICATIONS = NOTIFICATIONS.labels("heart_rate")
+STEP_NOTIFICATIONS = NOTIFICATIONS.labels("step_count")
+CACHED_CONNECT_SECONDS = CONNECT_SECONDS.labels("cached")
+FULL_CONNECT_SECONDS = CONNECT_SECONDS.labels("full")
+
+# Discovered GATT layouts, shared by every reader in the process
+GATT_CACHE = GattCache(GATT_CACHE_FILE)
+
+
+def backoff_delay(attempt, base=RECONNECT_BASE_DELAY, cap=RECONNECT_MAX_DELAY):
+    """
+    Delay before reconnect attempt `attempt` (1, 2, ...): exponential with
+    "equal jitter", so watches that dropped together don't retry in lockstep.
+    """
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
 
 class SmartWatchServices(Enum):
     """List of smartwatch services"""
@@ -43,15 +82,39 @@ class SmartWatchCharacteristics(Enum):
     STEP_COUNT_UUID = "0000fee1-0000-1000-8000-00805f9b34fb"
 
 class SmartWatchReader:
-    def __init__(self, address):
+    def __init__(self, address, client_factory=BleakClient, db_path=DB_NAME, writer=None, archive=None,
+                 gatt_cache=None, anomaly_detector=None, emotion_service=None):
         self.address = address
+        self.client_factory = client_factory
         self.client = None
+        self.gatt_cache = gatt_cache if gatt_cache is not None else GATT_CACHE
+        # perf_counter() when the link was lost, until the first sample after reconnecting
+        self.reconnect_started = None
+        # Consecutive failed connects using the cached GATT layout
+        self.cached_connect_failures = 0
         self.last_step_count = None
         self.last_heart_rate_time = datetime.now()
         self.watch_removed = False
-        self.db_connection = sqlite3.connect("smartwatch_data.db")
+        self.notification_count = 0
+        self.removal_task = None
+        # Last 30 seconds of samples, analysed in memory on every notification
+        self.window = SlidingWindow()
+        self.window_analysis = None  # latest analyze_window() result, shown in the supervisor status
+        self.db_connection = connect_db(db_path)
         self.db_cursor = self.db_connection.cursor()
         self.setup_database()
+        # Samples are written behind by a background thread; readers may share one writer
+        self.owns_writer = writer is None
+        self.writer = writer if writer is not None else SensorDataWriter(db_path).start()
+        # Raw payloads are kept losslessly when RAW_ARCHIVE_DIR is set
+        self.owns_archive = archive is None and RAW_ARCHIVE_DIR is not None
+        self.archive = RawArchiveWriter(RAW_ARCHIVE_DIR) if self.owns_archive else archive
+        # Per-device heart rate and cadence baselines, restored from the database
+        self.owns_anomaly_detector = anomaly_detector is None
+        self.anomaly_detector = anomaly_detector if anomaly_detector is not None else AnomalyDetector(db_path).start()
+        # The emotion model relabels each stored sample from its window; readers may share one batcher
+        self.owns_emotion_service = emotion_service is None
+        self.emotion_service = emotion_service if emotion_service is not None else EmotionService().start()
 
     def setup_database(self):
         """Initialize the database tables with all required columns."""
@@ -94,6 +157,8 @@ class SmartWatchReader:
                 """)
                 self.db_connection.commit()
                 print("New table created successfully")
+
+            ensure_history_indexes(self.db_connection)
                 
         except sqlite3.Error as e:
             print(f"Database setup error: {str(e)}")
@@ -117,30 +182,31 @@ class SmartWatchReader:
         # message += f"\nLocation: {location_link}"
         
         
-        if heart_rate > 120:    
-            send_alert("Heart rate is above 120")
-            return "Stressed"
-        elif heart_rate > 90 and step_count > 1000:
-            # send_alert("Heart rate is above 90 and step count is above 1000")
-            return "Energetic"
-        elif heart_rate > 90:
-            # send_alert("Heart rate is above 90")
-            return "Anxious"
-        elif heart_rate < 60:
-            send_alert("Heart rate is below 60")
-            return "Relaxed"
-        else:
-            # send_alert("Neutral")
-            return "Neutral"
+        # Every sample goes through the rule engine and the debounced alert rules,
+        # so a sustained episode produces one escalating alert instead of one SMS
+        # per notification. Thresholds and emotion bands are in the rule file;
+        # the *_z rules compare against this wearer's own baseline.
+        sample = {"heart_rate": heart_rate, "steps": step_count}
+        # Cadence only from real step totals, not the 0 used before the first step notification
+        self.anomaly_detector.observe(self.address, heart_rate, self.last_step_count, scores=sample)
+        evaluation = rule_engine.evaluate(sample, self.address, "watch")
+        check_rules(self.address, evaluation)
+        return evaluation.labels.get("emotion", "Neutral")
 
     def heart_rate_handler(self, sender, data):
         """Handle heart rate notifications"""
+        started = time.perf_counter()
+        HEART_RATE_NOTIFICATIONS.inc()
         try:
+            if self.archive is not None:
+                self.archive.append(self.address, getattr(sender, "uuid", sender), data)
             heart_rate = data[1] if len(data) > 1 else data[0]
             step_count = self.last_step_count if self.last_step_count is not None else 0
             battery_level = self.last_battery_level if hasattr(self, 'last_battery_level') else None
 
 
+            self.notification_count += 1
+
             if heart_rate == 0:
                 return  # Don't store continuous 0 heart rate, handled in background check
 
@@ -153,47 +219,91 @@ class SmartWatchReader:
             
 
             self.last_heart_rate_time = datetime.now()
+            if self.reconnect_started is not None:
+                RECONNECT_FIRST_SAMPLE_SECONDS.observe(time.perf_counter() - self.reconnect_started)
+                self.reconnect_started = None
             
             emotion = self.detect_emotion(heart_rate, step_count)
-            
-            print(f"Heart Rate: {heart_rate} BPM | Step Count: {step_count} | Battery Level: {battery_level}% | Emotion: {emotion}")
-            self.insert_sensor_data(heart_rate, step_count, battery_level, emotion)
+            self.window.add(heart_rate, step_count)
+            avg_heart_rate, window_emotion, running_state = analyze_window(self.window)
+            self.window_analysis = {
+                "mean_heart_rate": round(avg_heart_rate, 1),
+                "emotion": window_emotion,
+                "running_state": running_state,
+            }
+
+            print(f"Heart Rate: {heart_rate} BPM | Step Count: {step_count} | Battery Level: {battery_level}% | "
+                  f"Emotion: {emotion} | 30s: {avg_heart_rate:.1f} BPM, {window_emotion}, {running_state}")
+            sample = self.insert_sensor_data(heart_rate, step_count, battery_level, emotion)
+            self.classify_window(sample)
             
             
             
         except Exception as e:
             print(f"Error in heart rate handler: {str(e)}")
+        finally:
+            HEART_RATE_HANDLER_SECONDS.observe(time.perf_counter() - started)
 
     def step_count_handler(self, sender, data):
         """Handle step count notifications"""
+        started = time.perf_counter()
+        STEP_NOTIFICATIONS.inc()
         try:
+            if self.archive is not None:
+                self.archive.append(self.address, getattr(sender, "uuid", sender), data)
             self.last_step_count = struct.unpack("<H", data[:2])[0]
             print(f"Step Count: {self.last_step_count}")
         except Exception as e:
             print(f"Error in step count handler: {str(e)}")
+        finally:
+            STEP_HANDLER_SECONDS.observe(time.perf_counter() - started)
 
     def insert_sensor_data(self, heart_rate, step_count, battery_level, emotion):
-        """Insert sensor data into SQLite database"""
+        """Queue sensor data for the write-behind writer (never blocks on SQLite)"""
+        timestamp = datetime.now(IST).strftime('%Y-%m-%d %H:%M:%S')
+        sample = self.writer.submit(timestamp, heart_rate, step_count, battery_level, self.address, emotion)
+        print(f"✅ Data Queued: {heart_rate} BPM, {step_count} Steps, {battery_level}%, Emotion: {emotion}")
+        return sample
+
+    def classify_window(self, sample):
+        """Queue the window for the emotion model; its label replaces the rule-based one on the stored row"""
         try:
-            timestamp = datetime.now(IST).strftime('%Y-%m-%d %H:%M:%S')
-            
-            self.db_cursor.execute("""
-                INSERT OR REPLACE INTO sensor_data 
-                (timestamp, heart_rate, step_count, battery_level, device_id, emotion)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (timestamp, heart_rate, step_count, battery_level, self.address, emotion))
-            
-            self.db_connection.commit()
-            print(f"✅ Data Inserted: {heart_rate} BPM, {step_count} Steps, {battery_level}%, Emotion: {emotion}")
-        
-        except sqlite3.Error as e:
-            print(f"Database error: {str(e)}")
+            future = self.emotion_service.submit(*self.window.samples(WINDOW_SAMPLES))
+        except EmotionServiceBusy:
+            return  # Under overload the rule-based label stays
+        future.add_done_callback(lambda done: self._store_emotion(sample, done))
+
+    def _store_emotion(self, sample, future):
+        if future.exception() is not None:
+            print(f"Emotion model failed: {future.exception()}")
+            return
+        self.writer.submit_emotion(sample, future.result().label)
 
     async def connect(self):
-        """Connect to the smartwatch"""
+        """Connect to the smartwatch, reusing the cached GATT layout of a watch seen before"""
+        started = time.perf_counter()
+        services = self.gatt_cache.services_for(self.address, [c.value for c in SmartWatchCharacteristics])
         try:
-            self.client = BleakClient(self.address)
-            await self.client.connect()
+            if services is not None:
+                # Only resolve the services we read from; BlueZ also reuses bleak's own discovery
+                self.client = self.client_factory(self.address, services=services)
+                try:
+                    await self.client.connect(dangerous_use_bleak_cache=True)
+                except Exception:
+                    # The watch may be out of range, or the cached layout stale after a firmware update
+                    self.cached_connect_failures += 1
+                    if self.cached_connect_failures >= CACHED_CONNECT_ATTEMPTS:
+                        print(f"{self.cached_connect_failures} cached connects failed, rediscovering services")
+                        self.gatt_cache.forget(self.address)
+                        self.cached_connect_failures = 0
+                    raise
+                self.cached_connect_failures = 0
+                CACHED_CONNECT_SECONDS.observe(time.perf_counter() - started)
+            else:
+                self.client = self.client_factory(self.address)
+                await self.client.connect()
+                self.gatt_cache.remember(self.address, getattr(self.client, "services", None))
+                FULL_CONNECT_SECONDS.observe(time.perf_counter() - started)
             print(f"Connected: {self.client.is_connected}")
             return True
         except Exception as e:
@@ -218,34 +328,93 @@ class SmartWatchReader:
                 if elapsed_time > WATCH_REMOVAL_THRESHOLD and not self.watch_removed:
                     self.watch_removed = True
                     message = f"⚠️ Watch removed! No heart rate detected for {WATCH_REMOVAL_THRESHOLD} seconds."
-                    geo_location = get_device_location()
-                    latitude, longitude = geo_location['latitude'], geo_location['longitude']
-                    location_link = f"https://www.google.com/maps/search/?api=1&query={latitude},{longitude}"
-                    message += f"\nLocation: {location_link}"
-                    send_alert(message)
+                    # Last known location from the cache; never waits on the network
+                    link = location_link(location_provider.last_known())
+                    message += f"\nLocation: {link or 'unavailable'}"
+                    send_alert(message, device_id=self.address, kind=WATCH_REMOVED)
                     print(message)
             except Exception as e:
                 print(f"Error in watch removal check: {str(e)}")
             await asyncio.sleep(1)
 
     async def start_monitoring(self):
-        """Start monitoring heart rate and step count"""
+        """Start monitoring heart rate and step count. Returns False if subscribing failed."""
         try:
             await self.client.start_notify(SmartWatchCharacteristics.HEART_RATE_MEASUREMENT.value, self.heart_rate_handler)
             await self.client.start_notify(SmartWatchCharacteristics.STEP_COUNT_UUID.value, self.step_count_handler)
             print("Monitoring heart rate, step count, and battery level...")
             
-            # Start the watch removal detection task
-            asyncio.create_task(self.check_watch_removal())
+            # Warm the location cache so a removal alert has coordinates to attach
+            location_provider.start()
+
+            # Start the watch removal detection task (only once, even across reconnects)
+            if self.removal_task is None or self.removal_task.done():
+                self.removal_task = asyncio.create_task(self.check_watch_removal())
+            return True
         except Exception as e:
             print(f"Error starting monitoring: {str(e)}")
+            return False
+
+    async def run(self, on_state=None, base_delay=RECONNECT_BASE_DELAY, max_delay=RECONNECT_MAX_DELAY):
+        """
+        Connect, monitor and reconnect until cancelled.
+
+        A dropped or failed connection is retried after backoff_delay(), and
+        every new connection subscribes to the notifications again. on_state
+        is called with "connecting", "connected" or "disconnected" (plus an
+        error for the latter).
+        """
+        on_state = on_state or (lambda state, error=None: None)
+        attempt = 0
+        while True:
+            on_state("connecting")
+            if not await self.connect():
+                error = "connect failed"
+            elif not await self.start_monitoring():
+                # The cached layout may be stale; rediscover on the next attempt
+                self.gatt_cache.forget(self.address)
+                error = "subscribe failed"
+                await self._drop_client()
+            else:
+                attempt = 0
+                battery = await self.read_battery()
+                if battery is not None:
+                    print(f"Battery Level: {battery}%")
+                on_state("connected")
+                while self.client.is_connected:
+                    await asyncio.sleep(CONNECTION_POLL_INTERVAL)
+                error = "connection lost"
+                self.reconnect_started = time.perf_counter()
+            on_state("disconnected", error)
+            attempt += 1
+            RECONNECTS.inc()
+            await asyncio.sleep(backoff_delay(attempt, base_delay, max_delay))
+
+    async def _drop_client(self):
+        try:
+            if self.client is not None and self.client.is_connected:
+                await self.client.disconnect()
+        except Exception as e:
+            print(f"Error dropping connection: {str(e)}")
 
     async def disconnect(self):
         """Disconnect from the device"""
         try:
+            if self.removal_task is not None:
+                self.removal_task.cancel()
+                self.removal_task = None
             if self.client and self.client.is_connected:
                 await self.client.disconnect()
                 print("Disconnected from device")
+            # Before the writer, so the last labels are still written
+            if self.owns_emotion_service:
+                self.emotion_service.close()
+            if self.owns_writer:
+                self.writer.close()
+            if self.owns_archive:
+                self.archive.close()
+            if self.owns_anomaly_detector:
+                self.anomaly_detector.close()
             self.db_connection.close()
             print("Database connection closed")
         except Exception as e:
@@ -257,16 +426,8 @@ async def main():
     watch = SmartWatchReader(MAC_ADDRESS)
     
     try:
-        if await watch.connect():
-            battery = await watch.read_battery()
-            if battery is not None:
-                print(f"Battery Level: {battery}%")
-
-            await watch.start_monitoring()
-
-            print("\nMonitoring continuously. Press Ctrl+C to stop.")
-            while True:
-                await asyncio.sleep(1)
+        print("\nMonitoring continuously (reconnecting if the watch drops out). Press Ctrl+C to stop.")
+        await watch.run()
 
     except Exception as e:
         print(f"An error occurred: {str(e)}")
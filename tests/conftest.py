@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+# Keep modules that open the default database or GATT cache at import time away from the real files
+_scratch = tempfile.mkdtemp(prefix="smartwatch-tests-")
+os.environ.setdefault("SMARTWATCH_DB", os.path.join(_scratch, "smartwatch_data.db"))
+os.environ.setdefault("SMARTWATCH_GATT_CACHE", os.path.join(_scratch, "gatt_cache.json"))
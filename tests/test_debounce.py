@@ -0,0 +1,78 @@
+from backend.app.alerts.debounce import AlertDebouncer, AlertRule
+
+HR_HIGH = AlertRule("hr_high", "HR > 120", 120, 110, unit=" BPM")
+SPO2_LOW = AlertRule("spo2_low", "SpO2 < 90", 90, 92, above=False, unit="%")
+
+
+def make_debouncer():
+    return AlertDebouncer([HR_HIGH, SPO2_LOW], cooldown=60)
+
+
+def test_first_trigger_alerts_and_repeats_are_suppressed():
+    debouncer = make_debouncer()
+    assert debouncer.observe("watch-1", "hr_high", 120, now=0) is None
+    assert debouncer.observe("watch-1", "hr_high", 125, now=1) == "HR > 120: 125 BPM"
+    assert debouncer.observe("watch-1", "hr_high", 130, now=2) is None
+    assert debouncer.open_rules("watch-1") == ("hr_high",)
+    assert debouncer.stats == {"observed": 3, "sent": 1, "suppressed": 1}
+
+
+def test_hovering_between_clear_and_threshold_keeps_the_episode():
+    debouncer = make_debouncer()
+    debouncer.observe("watch-1", "hr_high", 125, now=0)
+    # Below the threshold but above the clear level: the episode is still in progress
+    for now, value in enumerate((119, 121, 115, 122), start=1):
+        assert debouncer.observe("watch-1", "hr_high", value, now=now) is None
+    assert debouncer.open_rules("watch-1") == ("hr_high",)
+
+
+def test_escalation_once_per_cooldown_with_duration_and_peak():
+    debouncer = make_debouncer()
+    debouncer.observe("watch-1", "hr_high", 125, now=0)
+    debouncer.observe("watch-1", "hr_high", 151, now=30)
+    assert debouncer.observe("watch-1", "hr_high", 130, now=60) == "HR > 120 for 60s, peak 151 BPM"
+    assert debouncer.observe("watch-1", "hr_high", 140, now=90) is None
+    assert debouncer.observe("watch-1", "hr_high", 128, now=120) == "HR > 120 for 120s, peak 151 BPM"
+
+
+def test_clearing_ends_the_episode_and_a_new_one_alerts_again():
+    debouncer = make_debouncer()
+    debouncer.observe("watch-1", "hr_high", 125, now=0)
+    assert debouncer.observe("watch-1", "hr_high", 110, now=5) is None
+    assert debouncer.open_rules("watch-1") == ()
+    assert debouncer.observe("watch-1", "hr_high", 121, now=6) == "HR > 120: 121 BPM"
+
+
+def test_below_rules_and_devices_are_independent():
+    debouncer = make_debouncer()
+    assert debouncer.observe("watch-1", "spo2_low", 88, now=0) == "SpO2 < 90: 88%"
+    assert debouncer.observe("watch-2", "spo2_low", 89, now=0) == "SpO2 < 90: 89%"
+    assert debouncer.observe("watch-1", "spo2_low", 85, now=61) == "SpO2 < 90 for 61s, peak 85%"
+    assert debouncer.observe("watch-1", "spo2_low", 91, now=62) is None
+    assert debouncer.observe("watch-1", "spo2_low", 92, now=63) is None
+    assert debouncer.open_rules("watch-1") == ()
+    assert debouncer.open_rules("watch-2") == ("spo2_low",)
+
+
+def test_inclusive_rules_trigger_at_the_threshold():
+    debouncer = AlertDebouncer(cooldown=60)
+    rule = AlertRule("hr_very_high", "HR >= 160", 160, 150, inclusive=True)
+    assert debouncer.observe("watch-1", "hr_very_high", 160, now=0, rule=rule) == "HR >= 160: 160"
+
+
+def test_close_ends_an_episode_silently():
+    debouncer = make_debouncer()
+    debouncer.observe("watch-1", "hr_high", 125, now=0)
+    debouncer.close("watch-1", "hr_high")
+    assert debouncer.open_rules("watch-1") == ()
+    assert debouncer.observe("watch-1", "hr_high", 125, now=1) == "HR > 120: 125 BPM"
+
+
+def test_allow_rate_limits_free_form_messages_per_key():
+    debouncer = make_debouncer()
+    key = ("watch-1", "watch_removed")
+    assert debouncer.allow(key, "Watch removed!", now=0) == "Watch removed!"
+    assert debouncer.allow(key, "Watch removed!", now=10) is None
+    assert debouncer.allow(key, "Watch removed!", now=20) is None
+    assert debouncer.allow(("watch-2", "watch_removed"), "Watch removed!", now=20) == "Watch removed!"
+    assert debouncer.allow(key, "Watch removed!", now=60) == "Watch removed! (repeated 2 more times)"
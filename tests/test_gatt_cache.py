@@ -0,0 +1,124 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.app.services.gatt_cache import GattCache
+
+HEART_RATE_SERVICE = "0000180d-0000-1000-8000-00805f9b34fb"
+HEART_RATE_MEASUREMENT = "00002a37-0000-1000-8000-00805f9b34fb"
+BATTERY_SERVICE = "0000180f-0000-1000-8000-00805f9b34fb"
+BATTERY_LEVEL = "00002a19-0000-1000-8000-00805f9b34fb"
+ADDRESS = "FB:D8:57:5B:04:32"
+
+
+class FakeCharacteristic:
+    def __init__(self, uuid, handle):
+        self.uuid = uuid
+        self.handle = handle
+        self.properties = ["read", "notify"]
+
+
+class FakeService:
+    def __init__(self, uuid, characteristics):
+        self.uuid = uuid
+        self.characteristics = characteristics
+
+
+SERVICES = [
+    FakeService(HEART_RATE_SERVICE.upper(), [FakeCharacteristic(HEART_RATE_MEASUREMENT, 12)]),
+    FakeService(BATTERY_SERVICE, [FakeCharacteristic(BATTERY_LEVEL, 20)]),
+]
+
+
+def test_remembered_layout_gives_the_services_to_resolve(tmp_path):
+    cache = GattCache(str(tmp_path / "gatt.json"))
+    assert cache.services_for(ADDRESS, [HEART_RATE_MEASUREMENT]) is None
+
+    cache.remember(ADDRESS, SERVICES)
+    assert cache.services_for(ADDRESS, [HEART_RATE_MEASUREMENT.upper()]) == [HEART_RATE_SERVICE]
+    assert sorted(cache.services_for(ADDRESS, [HEART_RATE_MEASUREMENT, BATTERY_LEVEL])) == [
+        HEART_RATE_SERVICE, BATTERY_SERVICE,
+    ]
+    # A layout without any characteristic we use is rediscovered
+    assert cache.services_for(ADDRESS, ["0000fee1-0000-1000-8000-00805f9b34fb"]) is None
+    assert cache.get(ADDRESS)["services"][HEART_RATE_SERVICE][HEART_RATE_MEASUREMENT]["handle"] == 12
+
+
+def test_layouts_persist_and_forget_removes_them(tmp_path):
+    path = str(tmp_path / "gatt.json")
+    GattCache(path).remember(ADDRESS, SERVICES)
+    cache = GattCache(path)
+    assert cache.get(ADDRESS) is not None
+    cache.forget(ADDRESS)
+    assert GattCache(path).get(ADDRESS) is None
+
+
+def test_caches_sharing_a_file_keep_each_others_entries(tmp_path):
+    path = str(tmp_path / "gatt.json")
+    first, second = GattCache(path), GattCache(path)
+    first.get(ADDRESS)
+    second.get(ADDRESS)
+    first.remember(ADDRESS, SERVICES)
+    second.remember("AA:BB:CC:DD:EE:FF", SERVICES)
+    with open(path) as f:
+        assert sorted(json.load(f)) == ["AA:BB:CC:DD:EE:FF", ADDRESS]
+    second.forget(ADDRESS)
+    assert GattCache(path).get(ADDRESS) is None
+    assert GattCache(path).get("AA:BB:CC:DD:EE:FF") is not None
+    assert list(tmp_path.iterdir()) == [tmp_path / "gatt.json"]
+
+
+def test_unreadable_file_is_ignored(tmp_path):
+    path = tmp_path / "gatt.json"
+    path.write_text("{not json")
+    assert GattCache(str(path)).get(ADDRESS) is None
+
+
+class FakeClient:
+    """Refuses connects that use the cached layout; a full discovery succeeds."""
+
+    created = []
+
+    def __init__(self, address, services=None):
+        self.address = address
+        self.services_filter = services
+        self.services = SERVICES
+        self.is_connected = False
+        FakeClient.created.append(self)
+
+    async def connect(self, dangerous_use_bleak_cache=False):
+        if dangerous_use_bleak_cache:
+            raise OSError("Characteristic handle no longer exists")
+        self.is_connected = True
+
+
+def test_cached_layout_is_dropped_after_repeated_failed_connects(tmp_path):
+    watchdetails = pytest.importorskip("watchdetails")
+    cache = GattCache(str(tmp_path / "gatt.json"))
+    cache.remember(ADDRESS, SERVICES)
+    FakeClient.created = []
+
+    # Only the connection state connect() uses; a full reader would open the database and start workers
+    reader = watchdetails.SmartWatchReader.__new__(watchdetails.SmartWatchReader)
+    reader.address = ADDRESS
+    reader.client = None
+    reader.client_factory = FakeClient
+    reader.gatt_cache = cache
+    reader.cached_connect_failures = 0
+
+    for attempt in range(1, watchdetails.CACHED_CONNECT_ATTEMPTS):
+        assert asyncio.run(reader.connect()) is False
+        assert reader.cached_connect_failures == attempt
+        assert cache.get(ADDRESS) is not None
+
+    assert asyncio.run(reader.connect()) is False
+    assert reader.cached_connect_failures == 0
+    assert cache.get(ADDRESS) is None
+    assert all(sorted(client.services_filter) == [HEART_RATE_SERVICE, BATTERY_SERVICE]
+               for client in FakeClient.created)
+
+    # The next connect discovers the services again and caches the fresh layout
+    assert asyncio.run(reader.connect()) is True
+    assert FakeClient.created[-1].services_filter is None
+    assert cache.get(ADDRESS) is not None
@@ -0,0 +1,129 @@
+import sqlite3
+import time
+
+from backend.app.alerts.outbox import STATUS_FAILED, STATUS_QUEUED, STATUS_SENT, AlertOutbox
+
+
+class StubProvider:
+    """Fails the first `failures` sends, then records every message."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.sent = []
+
+    def send(self, message):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError(f"provider down ({self.calls})")
+        self.sent.append(message)
+
+
+def alert_row(db_path, alert_id):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT status, attempts, last_error FROM alerts WHERE id = ?", (alert_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+
+
+def wait_for_status(db_path, alert_id, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        row = alert_row(db_path, alert_id)
+        if row[0] == status:
+            return row
+        time.sleep(0.01)
+    raise AssertionError(f"alert {alert_id} is {alert_row(db_path, alert_id)}, expected {status}")
+
+
+def make_outbox(tmp_path, provider, **kwargs):
+    kwargs.setdefault("workers", 1)
+    kwargs.setdefault("base_backoff", 0)
+    return AlertOutbox(str(tmp_path / "alerts.db"), provider, **kwargs)
+
+
+def test_enqueue_stores_a_queued_alert_without_sending(tmp_path):
+    provider = StubProvider()
+    outbox = make_outbox(tmp_path, provider)
+
+    alert_id = outbox.enqueue("HR > 120: 130 BPM")
+
+    assert alert_row(outbox.db_path, alert_id) == (STATUS_QUEUED, 0, None)
+    assert provider.calls == 0
+    assert outbox.queue_depth == 1
+
+
+def test_queued_alert_is_sent(tmp_path):
+    provider = StubProvider()
+    outbox = make_outbox(tmp_path, provider).start()
+    try:
+        alert_id = outbox.enqueue("HR > 120: 130 BPM")
+        assert wait_for_status(outbox.db_path, alert_id, STATUS_SENT) == (STATUS_SENT, 1, None)
+    finally:
+        outbox.stop()
+
+    assert provider.sent == ["HR > 120: 130 BPM"]
+    assert outbox.stats["sent"] == 1
+    assert outbox.queue_depth == 0
+
+
+def test_failed_send_is_retried_until_it_succeeds(tmp_path):
+    provider = StubProvider(failures=2)
+    outbox = make_outbox(tmp_path, provider, max_attempts=5).start()
+    try:
+        alert_id = outbox.enqueue("SpO2 < 90: 85%")
+        assert wait_for_status(outbox.db_path, alert_id, STATUS_SENT) == (STATUS_SENT, 3, None)
+    finally:
+        outbox.stop()
+
+    assert provider.sent == ["SpO2 < 90: 85%"]
+    assert outbox.stats["retried"] == 2
+    assert outbox.stats["failed"] == 0
+
+
+def test_alert_fails_after_max_attempts(tmp_path):
+    provider = StubProvider(failures=100)
+    outbox = make_outbox(tmp_path, provider, max_attempts=3).start()
+    try:
+        alert_id = outbox.enqueue("Watch removed!")
+        status, attempts, error = wait_for_status(outbox.db_path, alert_id, STATUS_FAILED)
+    finally:
+        outbox.stop()
+
+    assert attempts == 3
+    assert error == "provider down (3)"
+    assert provider.calls == 3
+    assert outbox.stats["failed"] == 1
+
+
+def test_retries_back_off(tmp_path):
+    provider = StubProvider(failures=1)
+    outbox = make_outbox(tmp_path, provider, base_backoff=60).start()
+    try:
+        alert_id = outbox.enqueue("HR < 60: 55 BPM")
+        deadline = time.monotonic() + 5
+        while provider.calls == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        # Still waiting for its backoff (30-60 s) after the first failure
+        assert alert_row(outbox.db_path, alert_id)[:2] == (STATUS_QUEUED, 1)
+        assert provider.calls == 1
+    finally:
+        outbox.stop()
+
+
+def test_alerts_left_queued_are_sent_by_the_next_run(tmp_path):
+    first = make_outbox(tmp_path, StubProvider())
+    alert_id = first.enqueue("HR > 140: 150 BPM")
+    first.stop()
+
+    provider = StubProvider()
+    second = make_outbox(tmp_path, provider).start()
+    try:
+        wait_for_status(second.db_path, alert_id, STATUS_SENT)
+    finally:
+        second.stop()
+    assert provider.sent == ["HR > 140: 150 BPM"]
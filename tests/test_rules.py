@@ -0,0 +1,119 @@
+import pytest
+
+from backend.app.config import RULES_FILE
+from backend.app.services.rules import RuleEngine, RuleError
+
+SPEC = {
+    "rules": [
+        {"name": "hr_high", "metric": "heart_rate", "above": 140, "clear": 130, "label": "HR > 140",
+         "unit": " BPM", "sources": ["monitor"]},
+        {"name": "hr_very_high", "metric": "heart_rate", "at_least": 160, "label": "HR >= 160",
+         "sources": ["monitor"]},
+        {"name": "hr_low", "metric": "heart_rate", "below": 50, "clear": 55, "sources": ["monitor"]},
+        {"name": "spo2_low", "metric": "spo2", "at_most": 90, "for": 20, "sources": ["monitor"]},
+        {"name": "hr_change", "metric": "heart_rate", "change": "abs", "at_least": 30, "action": "report",
+         "message": "HR changed by {value}", "sources": ["api"]},
+        {"name": "steps_rise", "metric": "steps", "change": "rise", "above": 50, "action": "report",
+         "message": "Steps rose by {value}", "sources": ["api"]},
+    ],
+    "classifiers": {
+        "emotion": {
+            "metric": "heart_rate", "default": "Relaxed",
+            "bands": [
+                {"at_least": 60, "label": "Neutral"},
+                {"above": 90, "label": "Anxious", "refine": {"metric": "steps", "above": 1000, "label": "Energetic"}},
+                {"above": 120, "label": "Stressed"},
+            ],
+        },
+    },
+    "overrides": {
+        "quiet-watch": {"hr_high": {"enabled": False}, "hr_low": {"below": 40}},
+    },
+}
+
+
+@pytest.fixture
+def engine():
+    return RuleEngine(path=None, spec=SPEC)
+
+
+def alert_names(evaluation):
+    return [rule.name for rule in evaluation.alerts]
+
+
+@pytest.mark.parametrize("heart_rate, expected", [
+    (50, []),
+    (49, ["hr_low"]),
+    (140, []),
+    (141, ["hr_high"]),
+    (159, ["hr_high"]),
+    (160, ["hr_high", "hr_very_high"]),
+])
+def test_threshold_boundaries(engine, heart_rate, expected):
+    evaluation = engine.evaluate({"heart_rate": heart_rate}, "watch-1", "monitor")
+    assert alert_names(evaluation) == expected
+
+
+def test_rules_only_apply_to_their_sources(engine):
+    assert alert_names(engine.evaluate({"heart_rate": 200}, "watch-1", "api")) == []
+
+
+def test_device_overrides(engine):
+    assert alert_names(engine.evaluate({"heart_rate": 150}, "quiet-watch", "monitor")) == []
+    assert alert_names(engine.evaluate({"heart_rate": 45}, "quiet-watch", "monitor")) == []
+    assert alert_names(engine.evaluate({"heart_rate": 39}, "quiet-watch", "monitor")) == ["hr_low"]
+    assert "hr_high" not in engine.enabled_rules("quiet-watch")
+    assert "hr_high" in engine.enabled_rules("watch-1")
+
+
+def test_change_rules_need_a_previous_sample(engine):
+    sample = {"heart_rate": 100, "steps": 200}
+    assert engine.evaluate(sample, "watch-1", "api").reports == []
+
+    previous = {"heart_rate": 130, "steps": 100}
+    assert engine.evaluate(sample, "watch-1", "api", previous).reports == [
+        "HR changed by 30", "Steps rose by 100",
+    ]
+    # A drop in steps is not a rise
+    assert engine.evaluate({"heart_rate": 100, "steps": 0}, "watch-1", "api", previous).reports == [
+        "HR changed by 30",
+    ]
+
+
+def test_duration_rules_fire_once_the_condition_has_held(engine):
+    assert alert_names(engine.evaluate({"spo2": 88}, "watch-1", "monitor", now=0)) == []
+    assert alert_names(engine.evaluate({"spo2": 89}, "watch-1", "monitor", now=19)) == []
+    assert alert_names(engine.evaluate({"spo2": 90}, "watch-1", "monitor", now=20)) == ["spo2_low"]
+    # Recovering resets the timer
+    assert alert_names(engine.evaluate({"spo2": 97}, "watch-1", "monitor", now=21)) == []
+    assert alert_names(engine.evaluate({"spo2": 88}, "watch-1", "monitor", now=30)) == []
+
+
+@pytest.mark.parametrize("heart_rate, steps, expected", [
+    (59, 0, "Relaxed"),
+    (60, 0, "Neutral"),
+    (90, 0, "Neutral"),
+    (91, 0, "Anxious"),
+    (91, 1001, "Energetic"),
+    (120, 5000, "Energetic"),
+    (121, 5000, "Stressed"),
+])
+def test_classifier_bands(engine, heart_rate, steps, expected):
+    sample = {"heart_rate": heart_rate, "steps": steps}
+    assert engine.evaluate(sample, "watch-1", "monitor").labels["emotion"] == expected
+    assert engine.classify("emotion", heart_rate, sample) == expected
+
+
+def test_invalid_rules_are_rejected():
+    with pytest.raises(RuleError):
+        RuleEngine(path=None, spec={"rules": [{"name": "x", "metric": "heart_rate", "above": 1, "below": 2}]})
+    with pytest.raises(RuleError):
+        RuleEngine(path=None, spec={"rules": [{"name": "x", "metric": "heart_rate", "above": 1},
+                                              {"name": "x", "metric": "spo2", "below": 2}]})
+
+
+def test_shipped_rule_file_loads():
+    engine = RuleEngine(RULES_FILE)
+    assert engine.classify("window_emotion", 140, source="window") == "Anxious/Stressed"
+    assert engine.classify("running", 11, source="window") == "Running"
+    assert alert_names(engine.evaluate({"heart_rate": 125}, "watch-1", "watch")) == ["stress_hr"]
@@ -0,0 +1,80 @@
+import pytest
+
+from backend.app.services.shm_ring import BATTERY, HEART_RATE, PAYLOAD_SIZE, STEP_COUNT, ShmRing
+
+ADDRESS = "FB:D8:57:5B:04:32"
+
+
+@pytest.fixture
+def ring():
+    ring = ShmRing.create(capacity=4)
+    yield ring
+    ring.close()
+
+
+def test_records_come_out_in_order(ring):
+    assert ring.push(HEART_RATE, ADDRESS, b"\x00\x48", received=1.0)
+    assert ring.push(STEP_COUNT, ADDRESS, b"\x10\x27\x00", received=2.0)
+    assert ring.push(BATTERY, "AA:BB:CC:DD:EE:FF", bytes([87]), received=3.0)
+    assert len(ring) == 3
+    assert ring.pop_many() == [
+        (HEART_RATE, ADDRESS, b"\x00\x48", 1.0),
+        (STEP_COUNT, ADDRESS, b"\x10\x27\x00", 2.0),
+        (BATTERY, "AA:BB:CC:DD:EE:FF", bytes([87]), 3.0),
+    ]
+    assert len(ring) == 0
+    assert ring.pop_many() == []
+
+
+def test_full_ring_drops_new_records(ring):
+    for i in range(4):
+        assert ring.push(HEART_RATE, ADDRESS, bytes([i]), received=i)
+    assert not ring.push(HEART_RATE, ADDRESS, b"\x04", received=4)
+    assert not ring.push(HEART_RATE, ADDRESS, b"\x05", received=5)
+    assert ring.dropped == 2
+    assert len(ring) == 4
+    # The records already queued are kept, not overwritten
+    assert [record[2] for record in ring.pop_many()] == [b"\x00", b"\x01", b"\x02", b"\x03"]
+    assert ring.push(HEART_RATE, ADDRESS, b"\x06", received=6)
+
+
+def test_order_is_kept_across_wrap_around(ring):
+    expected = []
+    popped = []
+    for i in range(11):
+        assert ring.push(HEART_RATE, ADDRESS, bytes([i]), received=i)
+        expected.append(bytes([i]))
+        if len(ring) == 3:
+            popped += [record[2] for record in ring.pop_many(limit=2)]
+    popped += [record[2] for record in ring.pop_many()]
+    assert popped == expected
+    assert ring.dropped == 0
+
+
+def test_pop_many_respects_the_limit(ring):
+    for i in range(4):
+        ring.push(HEART_RATE, ADDRESS, bytes([i]), received=i)
+    assert [record[3] for record in ring.pop_many(limit=3)] == [0, 1, 2]
+    assert [record[3] for record in ring.pop_many(limit=3)] == [3]
+
+
+def test_attached_ring_sees_the_producer_records(ring):
+    consumer = ShmRing.attach(ring.name)
+    try:
+        ring.push(HEART_RATE, ADDRESS, b"\x00\x50", received=1.5)
+        assert consumer.pop_many() == [(HEART_RATE, ADDRESS, b"\x00\x50", 1.5)]
+        # The producer sees the consumer's tail, so the ring has room again
+        assert len(ring) == 0
+    finally:
+        consumer.close()
+
+
+def test_long_payloads_are_truncated(ring):
+    ring.push(HEART_RATE, ADDRESS, bytes(range(40)), received=0)
+    assert ring.pop_many()[0][2] == bytes(range(PAYLOAD_SIZE))
+
+
+def test_long_addresses_are_rejected(ring):
+    with pytest.raises(ValueError):
+        ring.push(HEART_RATE, "6F0C1A2B-3C4D-5E6F-7081-92A3B4C5D6E7", b"\x00")
+    assert len(ring) == 0
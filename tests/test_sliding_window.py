@@ -0,0 +1,108 @@
+import pytest
+
+from backend.app.services.sliding_window import SlidingWindow, WindowRegistry, analyze_window
+
+
+def brute_force_stats(samples):
+    times = [t for t, _, _ in samples]
+    heart_rates = [hr for _, hr, _ in samples]
+    n = len(samples)
+    mean_t = sum(times) / n
+    mean_hr = sum(heart_rates) / n
+    slope = (sum((t - mean_t) * (hr - mean_hr) for t, hr in zip(times, heart_rates))
+             / sum((t - mean_t) ** 2 for t in times))
+    return mean_hr, min(heart_rates), max(heart_rates), slope, int(samples[-1][2] - samples[0][2])
+
+
+def test_empty_window():
+    window = SlidingWindow()
+    assert len(window) == 0
+    assert window.stats() == {
+        "samples": 0, "mean_heart_rate": None, "min_heart_rate": None, "max_heart_rate": None,
+        "heart_rate_slope": None, "step_delta": None,
+    }
+
+
+def test_statistics_of_the_samples_in_the_window():
+    window = SlidingWindow(seconds=30)
+    for t, heart_rate, steps in ((0, 70, 100), (1, 90, 104), (2, 80, 110), (3, 60, 111)):
+        window.add(heart_rate, steps, now=t)
+    assert len(window) == 4
+    assert window.mean_heart_rate == 75
+    assert window.min_heart_rate == 60
+    assert window.max_heart_rate == 90
+    assert window.step_delta == 11
+
+
+def test_slope_of_a_linear_trend():
+    window = SlidingWindow(seconds=30)
+    for t in range(10):
+        window.add(60 + 2 * t, 0, now=1000 + t)
+    assert window.heart_rate_slope == pytest.approx(2.0)
+
+
+def test_slope_needs_two_distinct_times():
+    window = SlidingWindow()
+    window.add(70, 0, now=5)
+    assert window.heart_rate_slope is None
+    window.add(80, 0, now=5)
+    assert window.heart_rate_slope is None
+
+
+def test_old_samples_expire():
+    window = SlidingWindow(seconds=30)
+    window.add(150, 0, now=0)
+    window.add(70, 10, now=20)
+    window.add(80, 30, now=31)
+    # The sample from t=0 is older than 30 s at t=31
+    assert len(window) == 2
+    assert window.max_heart_rate == 80
+    assert window.min_heart_rate == 70
+    assert window.step_delta == 20
+    window.expire(now=100)
+    assert len(window) == 0
+    assert window.mean_heart_rate is None
+
+
+def test_capacity_keeps_the_newest_samples():
+    window = SlidingWindow(seconds=1000, capacity=4)
+    for t, heart_rate in enumerate((200, 10, 70, 71, 72, 73)):
+        window.add(heart_rate, t, now=t)
+    assert len(window) == 4
+    assert window.samples() == ([2, 3, 4, 5], [70, 71, 72, 73], [2, 3, 4, 5])
+    assert window.samples(limit=2) == ([4, 5], [72, 73], [4, 5])
+    assert (window.min_heart_rate, window.max_heart_rate) == (70, 73)
+
+
+def test_running_sums_match_a_recomputation_over_a_long_run():
+    window = SlidingWindow(seconds=30, capacity=64)
+    samples = []
+    for i in range(2000):
+        t = i * 0.7
+        sample = (t, 60 + (i * 37) % 50, i * 3)
+        samples.append(sample)
+        window.add(sample[1], sample[2], now=t)
+    in_window = [sample for sample in samples if sample[0] >= samples[-1][0] - 30][-64:]
+    mean, low, high, slope, step_delta = brute_force_stats(in_window)
+    assert len(window) == len(in_window)
+    assert window.mean_heart_rate == pytest.approx(mean)
+    assert (window.min_heart_rate, window.max_heart_rate) == (low, high)
+    assert window.heart_rate_slope == pytest.approx(slope)
+    assert window.step_delta == step_delta
+
+
+def test_registry_keeps_one_window_per_device():
+    registry = WindowRegistry(seconds=30)
+    registry.add("watch-1", 70, 0, now=0)
+    registry.add("watch-2", 100, 0, now=0)
+    registry.add("watch-1", 80, 5, now=1)
+    assert len(registry.get("watch-1")) == 2
+    assert registry.get("watch-2").mean_heart_rate == 100
+
+
+def test_analyze_window_classifies_from_the_window():
+    window = SlidingWindow(seconds=30)
+    assert analyze_window(window) == (None, None, "Insufficient Data")
+    window.add(135, 100, now=0)
+    window.add(145, 120, now=1)
+    assert analyze_window(window) == (140, "Anxious/Stressed", "Running")